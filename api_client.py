@@ -1,46 +1,148 @@
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from config import LOL_LOCKFILE_PATH
+from recorder import Recorder
+from metrics import HTTP_REQUEST_SECONDS, HTTP_ERRORS
+from config import (
+    LOL_LOCKFILE_PATH, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_SIZE,
+    LOCAL_API_HOST, LIVE_CLIENT_PORT, LIVE_CLIENT_PROTOCOL, RECORD_PATH,
+)
+
+# (connect, read) timeouts shared by every request to the local APIs.
+TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+def make_session(auth=None):
+    """
+    Creates a keep-alive session with a connection pool, so repeated polls reuse
+    the same TCP/TLS connection instead of paying a new handshake every time.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The local APIs use a self-signed certificate. Requests also pass verify=False,
+    # because REQUESTS_CA_BUNDLE in the environment would override the session setting.
+    session.verify = False
+    session.auth = auth
+    return session
 
 # --- LCU (League Client Update) API Communication ---
 def read_lockfile(path=LOL_LOCKFILE_PATH):
     """
-    Reads the lockfile created by the League Client to get the port and
-    authentication password for the LCU API.
+    Reads the lockfile created by the League Client to get the port,
+    authentication password and protocol for the LCU API.
     """
     with open(path, "r") as f:
-        name, pid, port, password, protocol = f.read().split(":")
-    return port, password
-
-# Read the lockfile to get connection details
-try:
-    port, password = read_lockfile()
-    lcu_auth = HTTPBasicAuth("riot", password)
-except (FileNotFoundError, ValueError) as e:
-    print(f"Error reading lockfile: {e}. LCU API functions will not work.")
-    port, lcu_auth = None, None
-
-def lcu_request(endpoint):
-    """Generic GET request to the LCU API."""
-    if not port or not lcu_auth:
-        return {}
-    lcu_url = f"https://127.0.0.1:{port}{endpoint}"
-    # The 'verify=False' flag is necessary because the LCU API uses a self-signed certificate.
-    try:
-        resp = requests.get(lcu_url, auth=lcu_auth, verify=False)
-        return resp.json()
-    except requests.exceptions.RequestException as e:
-        print(f"LCU API request failed: {e}")
-        return {}
-
-# --- Live Client API Communication ---
-def live_request(endpoint):
-    """Generic GET request to the Live Client API."""
-    # The Live Client API uses a fixed port (2999) and no authentication.
-    url = f"https://127.0.0.1:2999{endpoint}"
-    try:
-        resp = requests.get(url, verify=False)
-        return resp.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Live Client API request failed: {e}")
-        return {}
\ No newline at end of file
+        name, pid, port, password, protocol = f.read().strip().split(":")
+    return port, password, protocol
+
+# --- Client Connection ---
+class LeagueClient:
+    """
+    Connection to one League client: the LCU API found through its lockfile
+    and the Live Client API, each with its own keep-alive session. With a
+    Recorder, every response is also written to a capture file.
+    """
+    def __init__(self, lockfile_path=LOL_LOCKFILE_PATH, host=LOCAL_API_HOST, live_port=LIVE_CLIENT_PORT,
+                 live_protocol=LIVE_CLIENT_PROTOCOL, recorder=None):
+        self.host = host
+        self.live_port = live_port
+        self.live_protocol = live_protocol
+        self.recorder = recorder
+        # Whether the last request to each API got a response, so callers can tell "offline" from "empty".
+        self.reachable = {"lcu": False, "live": False}
+
+        # Read the lockfile to get connection details
+        try:
+            self.port, self.password, self.protocol = read_lockfile(lockfile_path)
+            self.lcu_auth = HTTPBasicAuth("riot", self.password)
+        except (FileNotFoundError, ValueError, TypeError) as e:
+            print(f"Error reading lockfile: {e}. LCU API functions will not work.")
+            self.port, self.password, self.protocol, self.lcu_auth = None, None, "https", None
+
+        self.lcu_session = make_session(self.lcu_auth)
+        self.live_session = make_session()
+
+    def lcu_request(self, endpoint):
+        """Generic GET request to the LCU API."""
+        if not self.port or not self.lcu_auth:
+            return {}
+        lcu_url = f"{self.protocol}://{self.host}:{self.port}{endpoint}"
+        started = time.monotonic()
+        try:
+            resp = self.lcu_session.get(lcu_url, timeout=TIMEOUT, verify=False)
+            self.reachable["lcu"] = True
+            return self._record("lcu", endpoint, resp, started)
+        except requests.exceptions.ConnectionError as e:
+            self.reachable["lcu"] = False
+            HTTP_ERRORS.inc(api="lcu")
+            print(f"LCU API request failed: {e}")
+            return {}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            HTTP_ERRORS.inc(api="lcu")
+            print(f"LCU API request failed: {e}")
+            return {}
+
+    def lcu_websocket_url(self):
+        """URL of the LCU WebSocket, or None if the lockfile could not be read."""
+        if not self.port:
+            return None
+        scheme = "wss" if self.protocol == "https" else "ws"
+        return f"{scheme}://{self.host}:{self.port}/"
+
+    def live_request(self, endpoint):
+        """Generic GET request to the Live Client API."""
+        # The Live Client API uses a fixed port (2999) and no authentication.
+        url = f"{self.live_protocol}://{self.host}:{self.live_port}{endpoint}"
+        started = time.monotonic()
+        try:
+            resp = self.live_session.get(url, timeout=TIMEOUT, verify=False)
+            self.reachable["live"] = True
+            return self._record("live", endpoint, resp, started)
+        except requests.exceptions.ConnectionError as e:
+            self.reachable["live"] = False
+            HTTP_ERRORS.inc(api="live")
+            print(f"Live Client API request failed: {e}")
+            return {}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            HTTP_ERRORS.inc(api="live")
+            print(f"Live Client API request failed: {e}")
+            return {}
+
+    def warm_up(self):
+        """Opens the keep-alive connections ahead of the first poll. The Live Client API only answers during a game."""
+        phase = self.lcu_request("/lol-gameflow/v1/gameflow-phase") if self.port else "InProgress"
+        if phase == "InProgress":
+            self.live_request("/liveclientdata/gamestats")
+
+    def _record(self, api, endpoint, resp, started):
+        """Parses a response, times it and, when recording, appends it to the capture."""
+        data = resp.json()
+        # Query strings are left out so each endpoint is one series.
+        HTTP_REQUEST_SECONDS.observe(time.monotonic() - started, api=api, endpoint=endpoint.split("?")[0])
+        if self.recorder is not None:
+            self.recorder.record(api, endpoint, resp.status_code, data)
+        return data
+
+# The connection configured in .env, used whenever no other client is given.
+# Created on first use, so importing this module does not touch the lockfile.
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client():
+    """Returns the LeagueClient configured in .env, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LeagueClient(recorder=Recorder(RECORD_PATH) if RECORD_PATH else None)
+        return _default_client
+
+def lcu_request(endpoint, client=None):
+    """Generic GET request to the LCU API of client, or of the default client."""
+    return (client or get_default_client()).lcu_request(endpoint)
+
+def live_request(endpoint, client=None):
+    """Generic GET request to the Live Client API of client, or of the default client."""
+    return (client or get_default_client()).live_request(endpoint)
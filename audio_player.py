@@ -1,61 +1,413 @@
-import os
+import heapq
+import itertools
+import queue
+import threading
 import time
-import uuid
-import pygame
-from mutagen.mp3 import MP3
-from elevenlabs.client import ElevenLabs
-from config import ELEVENLABS_API_KEY, VOICE_ID
+from concurrent.futures import Future, CancelledError
+from config import ELEVENLABS_API_KEY, VOICE_ID, PREEMPT_MIN_PRIORITY, PREEMPT_FADE_MS
+from tts_cache import AudioCache, cache_key
+from rate_limit import elevenlabs_limiter
+from metrics import (
+    TTS_FIRST_BYTE_SECONDS, TTS_AUDIO_SECONDS, TTS_REQUESTS, AUDIO_PREEMPTED, AUDIO_DROPPED, AUDIO_SECONDS_SAVED,
+)
 
 # --- Audio Generation and Playback (ElevenLabs) ---
-# Initialize the ElevenLabs client if API keys are available.
-if ELEVENLABS_API_KEY and VOICE_ID:
-    elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-else:
-    elevenlabs_client = None
+# The ElevenLabs client is created on first use, so importing this module stays fast.
+elevenlabs_client = None
+_elevenlabs_lock = threading.Lock()
+if not (ELEVENLABS_API_KEY and VOICE_ID):
     print("Warning: ElevenLabs API key or voice ID not found. Audio generation will be skipped.")
 
-def get_audio_from_elevenlabs(text_to_speak):
+def get_elevenlabs_client():
+    """Returns the ElevenLabs client, or None if no API key or voice ID is configured."""
+    global elevenlabs_client
+    with _elevenlabs_lock:
+        if elevenlabs_client is None and ELEVENLABS_API_KEY and VOICE_ID:
+            from elevenlabs.client import ElevenLabs
+            elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+        return elevenlabs_client
+
+def warm_tts_connection():
+    """Creates the ElevenLabs client and opens its connection with a free voice lookup."""
+    client = get_elevenlabs_client()
+    if client is None:
+        return
+    try:
+        client.voices.get(VOICE_ID)
+    except Exception as e:
+        print(f"ElevenLabs warm-up failed: {e}")
+
+# Audio is requested as raw 16-bit mono PCM so chunks can be played as soon as they arrive.
+TTS_MODEL_ID = "eleven_flash_v2"
+PCM_OUTPUT_FORMAT = "pcm_22050"
+PCM_SAMPLE_RATE = 22050
+PCM_SAMPLE_WIDTH = 2
+# Small chunks are merged until they hold at least this much audio (0.1 s) to avoid underruns.
+MIN_CHUNK_BYTES = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH // 10
+
+class AudioStream:
     """
-    Generates audio from text, saves it as an MP3, plays it, and cleans up the file.
+    In-memory buffer that receives PCM chunks from ElevenLabs in a background
+    thread and hands them to playback as they arrive. on_complete is called
+    with the whole clip once it has arrived without errors.
     """
-    if not elevenlabs_client:
-        return
+    def __init__(self, chunks, on_complete=None, text=None):
+        self._chunks = queue.Queue()
+        self._on_complete = on_complete
+        # The line being spoken, for caption feeds.
+        self.text = text
+        self._done = threading.Event()
+        self.requested_at = time.monotonic()
+        self.first_chunk_at = None
+        self.playback_started_at = None
+        # Set when the clip is cut short or dropped in favour of a more important one.
+        self.interrupted = False
+        self.total_bytes = 0
+        threading.Thread(target=self._fill, args=(chunks,), daemon=True).start()
 
-    try:
-        # Generate audio from the provided text.
-        audio = elevenlabs_client.text_to_speech.convert(
-            text=text_to_speak,
-            voice_id=VOICE_ID,
-            model_id="eleven_flash_v2",
-            output_format="mp3_44100_128",
-        )
-        
-        # Save the audio stream to a temporary file.
-        filename = str(uuid.uuid4())
-        save_file_path = f"{filename}.mp3"
+    @classmethod
+    def from_bytes(cls, data, text=None):
+        """Wraps audio that is already in memory, e.g. from the cache."""
+        return cls(iter([data]), text=text)
 
-        with open(save_file_path, "wb") as f:
-            for chunk in audio:
+    def _fill(self, chunks):
+        """Copies the ElevenLabs iterator into the buffer."""
+        received = []
+        try:
+            for chunk in chunks:
                 if chunk:
-                    f.write(chunk)
-        
-        # Get the audio duration to know how long to sleep.
-        audio_file = MP3(save_file_path)
-        audio_duration = audio_file.info.length
-
-        # Initialize the pygame mixer for playback.
-        pygame.mixer.init()
-        pygame.mixer.music.load(save_file_path)
-        pygame.mixer.music.play()
-
-        # Wait for the audio to finish playing.
-        if audio_duration > 0:
-            time.sleep(audio_duration)
-
-        # Stop the mixer and delete the temporary file.
-        pygame.mixer.music.stop()
-        pygame.mixer.quit()
-        os.remove(save_file_path)
-        
+                    if self.first_chunk_at is None:
+                        self.first_chunk_at = time.monotonic()
+                    self.total_bytes += len(chunk)
+                    self._chunks.put(chunk)
+                    if self._on_complete:
+                        received.append(chunk)
+            if self._on_complete and received:
+                self._on_complete(b"".join(received))
+        except Exception as e:
+            print(f"Error during audio generation: {e}")
+        finally:
+            self._chunks.put(None)
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the whole clip has arrived. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def read_nowait(self):
+        """Returns the next chunk if one has arrived, b"" if none has yet, or None once the stream is complete."""
+        try:
+            chunk = self._chunks.get_nowait()
+        except queue.Empty:
+            return b""
+        if chunk is None:
+            # Leave the end marker for later reads.
+            self._chunks.put(None)
+        return chunk
+
+    def __iter__(self):
+        """Yields chunks as they arrive until the stream is complete."""
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    @property
+    def duration(self):
+        """Length in seconds of the audio received so far."""
+        return self.total_bytes / (PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH)
+
+# Cache of synthesized lines, so repeated lines cost no network round trip or TTS credits.
+audio_cache = AudioCache()
+
+def synthesize_audio(text_to_speak):
+    """
+    Starts streaming speech for the given text and returns an AudioStream right away,
+    or None if audio generation is unavailable. Cached lines are served from memory or disk.
+    """
+    key = cache_key(text_to_speak, VOICE_ID, TTS_MODEL_ID, PCM_OUTPUT_FORMAT)
+    cached = audio_cache.get(key)
+    if cached is not None:
+        TTS_REQUESTS.inc(source="cache")
+        return AudioStream.from_bytes(cached, text=text_to_speak)
+
+    client = get_elevenlabs_client()
+    if not client:
+        return None
+
+    try:
+        TTS_REQUESTS.inc(source="elevenlabs")
+        # The request is sent when the stream is first read, within the shared rate limits,
+        # and a stream slot is held until the whole clip has arrived.
+        audio = elevenlabs_limiter.stream(
+            lambda: client.text_to_speech.stream(
+                text=text_to_speak,
+                voice_id=VOICE_ID,
+                model_id=TTS_MODEL_ID,
+                output_format=PCM_OUTPUT_FORMAT,
+            ),
+            units=len(text_to_speak),
+        )
+        return AudioStream(_timed_chunks(audio, time.monotonic()), on_complete=lambda data: _synthesized(key, data), text=text_to_speak)
     except Exception as e:
-        print(f"Error during audio generation or playback: {e}")
\ No newline at end of file
+        print(f"Error during audio generation: {e}")
+        return None
+
+def _timed_chunks(chunks, started):
+    """Passes ElevenLabs chunks through, recording the time to the first one."""
+    first = True
+    for chunk in chunks:
+        if first and chunk:
+            TTS_FIRST_BYTE_SECONDS.observe(time.monotonic() - started)
+            first = False
+        yield chunk
+
+def _synthesized(key, data):
+    """Caches a completed clip and records its length."""
+    TTS_AUDIO_SECONDS.observe(len(data) / (PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH))
+    audio_cache.put(key, data)
+
+def warm_audio_cache(lines):
+    """Synthesizes the given stock lines into the cache, skipping those already cached."""
+    for line in lines:
+        if cache_key(line, VOICE_ID, TTS_MODEL_ID, PCM_OUTPUT_FORMAT) in audio_cache:
+            continue
+        stream = synthesize_audio(line)
+        if stream is None:
+            return
+        # Draining the stream stores it in the cache.
+        for _ in stream:
+            pass
+
+def _pcm_blocks(stream):
+    """Regroups streamed chunks into whole-sample blocks of at least MIN_CHUNK_BYTES."""
+    pending = b""
+    first = True
+    for chunk in stream:
+        pending += chunk
+        # The first block is played immediately; later ones are merged to a minimum size.
+        if len(pending) < (PCM_SAMPLE_WIDTH if first else MIN_CHUNK_BYTES):
+            continue
+        cut = len(pending) - len(pending) % PCM_SAMPLE_WIDTH
+        block, pending = pending[:cut], pending[cut:]
+        first = False
+        yield block
+    cut = len(pending) - len(pending) % PCM_SAMPLE_WIDTH
+    if cut:
+        yield pending[:cut]
+
+class AudioEngine:
+    """
+    Long-lived audio output that owns the pygame mixer for the whole process.
+    Clips are queued and played back to back on one channel without gaps, and
+    each submission returns a Future that resolves when its clip has finished.
+
+    Clips wait in priority order. A clip of at least preempt_min_priority that
+    outranks the audio being played fades that audio out and starts right away;
+    waiting clips that rank below it are dropped. stats and the audio_* metrics
+    count interrupted and dropped clips and the seconds of audio skipped that way.
+    """
+    def __init__(self, preempt_min_priority=PREEMPT_MIN_PRIORITY, fade_ms=PREEMPT_FADE_MS):
+        self.preempt_min_priority = preempt_min_priority
+        self.fade_ms = fade_ms
+        # (-priority, sequence, stream, future); a None stream is the shutdown marker.
+        self._clips = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._mixer = None
+        self._channel = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # (last sound, future, stream, priority) for clips that are fully queued but still audible.
+        self._pending = []
+        self.stats = {"preempted": 0, "dropped": 0, "seconds_saved": 0.0}
+
+    def start(self):
+        """Opens the audio device and starts the playback thread, once per process."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            # pygame is only imported once audio is actually needed.
+            import pygame
+            self._mixer = pygame.mixer
+            self._mixer.init(frequency=PCM_SAMPLE_RATE, size=-16, channels=1)
+            self._channel = self._mixer.Channel(0)
+            self._thread = threading.Thread(target=self._run, name="audio-engine", daemon=True)
+            self._thread.start()
+
+    def submit(self, stream, on_done=None, priority=0):
+        """
+        Queues an AudioStream for playback and returns a Future resolved with the
+        stream once it has been played or interrupted, or cancelled if the clip is
+        dropped. on_done is called with that Future.
+        """
+        self.start()
+        future = Future()
+        if on_done:
+            future.add_done_callback(on_done)
+        self._clips.put((-priority, next(self._seq), stream, future))
+        return future
+
+    def close(self):
+        """Stops the playback thread after the queued clips and releases the audio device."""
+        if self._thread is None:
+            return
+        self._clips.put((float("inf"), next(self._seq), None, None))
+        self._thread.join()
+        self._thread = None
+        self._mixer.quit()
+
+    def _run(self):
+        """Feeds clip blocks into the channel queue so consecutive clips play seamlessly."""
+        while True:
+            try:
+                neg_priority, _, stream, future = self._clips.get(timeout=0.01)
+            except queue.Empty:
+                self._settle()
+                continue
+            if stream is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            priority = -neg_priority
+            if self._outranks(priority, self._playing_priority()):
+                self._preempt(priority)
+            try:
+                self._play_clip(stream, future, priority)
+            except Exception as e:
+                print(f"Error during audio playback: {e}")
+                future.set_exception(e)
+
+        # Let the remaining audio play out before shutting down.
+        while self._pending:
+            self._settle()
+            time.sleep(0.01)
+
+    def _play_clip(self, stream, future, priority):
+        """Queues a clip block by block, giving way if a more important clip arrives meanwhile."""
+        last_sound = None
+        for block in _pcm_blocks(stream):
+            if not self._wait_for_slot(priority):
+                self._preempt(self._waiting_priority(), (stream, future))
+                return
+            last_sound = self._mixer.Sound(buffer=block)
+            if self._channel.get_busy():
+                self._channel.queue(last_sound)
+            else:
+                self._channel.play(last_sound)
+            if stream.playback_started_at is None:
+                stream.playback_started_at = time.monotonic()
+            self._settle()
+        if last_sound is None:
+            future.set_result(stream)
+        else:
+            self._pending.append((last_sound, future, stream, priority))
+
+    def _wait_for_slot(self, priority):
+        """
+        Waits until the channel can take another sound. Returns False if a clip
+        that should interrupt the current one arrives while waiting.
+        """
+        # A channel holds one queued sound; wait for the slot to free up.
+        while self._channel.get_queue() is not None:
+            if self._outranks(self._waiting_priority(), priority):
+                return False
+            self._settle()
+            time.sleep(0.005)
+        return True
+
+    def _settle(self):
+        """Resolves the futures of clips whose last sound is neither playing nor queued."""
+        playing = (self._channel.get_sound(), self._channel.get_queue())
+        while self._pending and self._pending[0][0] not in playing:
+            _, future, stream, _ = self._pending.pop(0)
+            future.set_result(stream)
+
+    # --- Preemption ---
+    def _outranks(self, challenger, playing):
+        """Whether a clip of priority challenger should interrupt audio of priority playing."""
+        return (
+            challenger is not None and playing is not None
+            and challenger >= self.preempt_min_priority and challenger > playing
+        )
+
+    def _playing_priority(self):
+        """Highest priority among clips that are still audible, or None if the channel is idle."""
+        self._settle()
+        return max((p for *_, p in self._pending), default=None)
+
+    def _waiting_priority(self):
+        """Priority of the most important clip waiting in the queue, or None."""
+        with self._clips.mutex:
+            if not self._clips.queue or self._clips.queue[0][2] is None:
+                return None
+            return -self._clips.queue[0][0]
+
+    def _preempt(self, winner, current=None):
+        """
+        Fades out all audible clips (and current, the (stream, future) being queued),
+        resolves them as interrupted, and drops waiting clips that rank below winner.
+        """
+        self._channel.fadeout(self.fade_ms)
+        now = time.monotonic()
+        interrupted = [(stream, future) for _, future, stream, _ in self._pending]
+        if current is not None:
+            interrupted.append(current)
+        self._pending = []
+        for stream, future in interrupted:
+            stream.interrupted = True
+            played = now - stream.playback_started_at if stream.playback_started_at else 0.0
+            saved = max(0.0, stream.duration - played)
+            self.stats["seconds_saved"] += saved
+            self.stats["preempted"] += 1
+            AUDIO_SECONDS_SAVED.inc(saved)
+            AUDIO_PREEMPTED.inc()
+            future.set_result(stream)
+
+        with self._clips.mutex:
+            losers = [item for item in self._clips.queue if item[2] is not None and -item[0] < winner]
+            self._clips.queue[:] = [item for item in self._clips.queue if item not in losers]
+            heapq.heapify(self._clips.queue)
+        for _, _, stream, future in losers:
+            stream.interrupted = True
+            self.stats["seconds_saved"] += stream.duration
+            self.stats["dropped"] += 1
+            AUDIO_SECONDS_SAVED.inc(stream.duration)
+            AUDIO_DROPPED.inc()
+            future.cancel()
+
+        # Let the fade finish so the winner starts on a silent channel.
+        deadline = now + self.fade_ms / 1000
+        while self._channel.get_busy() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self._channel.stop()
+
+# The process-wide audio engine, started on first use.
+audio_engine = AudioEngine()
+
+def queue_audio(stream, on_done=None, priority=0):
+    """
+    Queues an AudioStream on the shared audio engine and returns a Future for its playback,
+    or None if there is nothing to play. Higher-priority clips can interrupt lower ones.
+    """
+    if not stream:
+        return None
+    return audio_engine.submit(stream, on_done, priority)
+
+def play_audio(stream, priority=0):
+    """
+    Plays an AudioStream on the shared audio engine and blocks until playback is finished.
+    """
+    future = queue_audio(stream, priority=priority)
+    if future is None:
+        return
+    try:
+        future.result()
+    except (Exception, CancelledError):
+        pass
+
+def get_audio_from_elevenlabs(text_to_speak):
+    """
+    Generates audio from text, plays it while it streams in, and blocks until playback is finished.
+    """
+    play_audio(synthesize_audio(text_to_speak))
@@ -0,0 +1,288 @@
+import argparse
+import bisect
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from audio_player import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH, synthesize_audio
+from config import BATCH_WORKERS, KILL_BURST_WINDOW
+from data_fetcher import GameSnapshot
+from event_scheduler import EventScheduler, PRIORITY_LOW
+from game_state import DeltaTracker
+from llm_commentator import LeagueCommentator
+from recorder import load_capture
+from template_captions import TemplateCaptioner
+from utils import event_to_text
+
+BYTES_PER_SECOND = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH
+# Live Client API responses that carry events, and where in the body they are.
+EVENT_PATHS = {"/liveclientdata/eventdata": lambda body: body.get("Events"),
+               "/liveclientdata/allgamedata": lambda body: (body.get("events") or {}).get("Events")}
+# Earlier lines handed to Gemini with each prompt, so parallel segments still read as one story.
+STORY_LINES = 4
+
+# --- Recorded Games ---
+class RecordedGame:
+    """The events and allgamedata snapshots of one game in a capture, in game-time order."""
+    def __init__(self):
+        self.events = {}
+        self.snapshots = []
+
+    @property
+    def duration(self):
+        """Game seconds covered by the recording."""
+        times = [e.get("EventTime", 0) for e in self.events.values()] + [s.game_time for s in self.snapshots]
+        return max(times, default=0.0)
+
+    def sorted_events(self):
+        return sorted(self.events.values(), key=lambda e: (e.get("EventTime", 0), e.get("EventID", 0)))
+
+def split_games(records):
+    """
+    Splits capture records into RecordedGames. A game clock or event clock
+    that runs backwards means the next game started.
+    """
+    games = [RecordedGame()]
+    last_time = 0.0
+    for r in records:
+        body = r.get("body")
+        if r.get("api") != "live" or r.get("status") != 200 or not isinstance(body, dict):
+            continue
+        path = urlsplit(r["path"]).path
+        events = EVENT_PATHS[path](body) if path in EVENT_PATHS else None
+        game_time = (body.get("gameData") or {}).get("gameTime") if path == "/liveclientdata/allgamedata" else None
+        clock = game_time if game_time is not None else max((e.get("EventTime", 0) for e in events or []), default=None)
+        if clock is not None:
+            if clock < last_time - 5 and (games[-1].events or games[-1].snapshots):
+                games.append(RecordedGame())
+            last_time = clock
+        for e in events or []:
+            games[-1].events.setdefault(e.get("EventID"), e)
+        if game_time is not None:
+            games[-1].snapshots.append(GameSnapshot(body.get("activePlayer"), body.get("allPlayers"), events, body.get("gameData")))
+    return [game for game in games if game.events or game.snapshots]
+
+# --- Segments ---
+class Segment:
+    """One line of the commentary track: what to narrate, from when, and the result."""
+    __slots__ = ("start", "priority", "events", "prompt", "caption", "source", "audio", "placed_at")
+
+    def __init__(self, start, priority, events=(), prompt=None):
+        self.start = start
+        self.priority = priority
+        self.events = list(events)
+        self.prompt = prompt
+        self.caption = None
+        # "template", "gemini" or "fallback".
+        self.source = None
+        self.audio = b""
+        self.placed_at = None
+
+def plan_segments(game, min_priority=PRIORITY_LOW, idle_gap=45.0, burst_window=KILL_BURST_WINDOW):
+    """
+    Turns a recorded game into segments: events close together are grouped and
+    merged like in live play, and stretches of idle_gap seconds without events
+    get a line on what changed, from the snapshot at that point.
+    """
+    scheduler = EventScheduler(burst_window=burst_window)
+    segments = []
+    cluster = []
+    for event in game.sorted_events() + [None]:
+        if cluster and (event is None or event.get("EventTime", 0) - cluster[-1].get("EventTime", 0) > burst_window):
+            for priority, events in scheduler.plan(cluster):
+                start = min(e.get("EventTime", 0) for e in events)
+                segments.append(Segment(start, priority, events))
+            cluster = []
+        if event is not None:
+            cluster.append(event)
+
+    if idle_gap and min_priority <= PRIORITY_LOW:
+        from timeline import GameTimeline
+        deltas = DeltaTracker()
+        timeline = GameTimeline()
+        busy = sorted(s.start for s in segments)
+        quiet_since = 0.0
+        for snapshot in game.snapshots:
+            timeline.append(snapshot)
+            now = snapshot.game_time
+            # Time of the last event segment at or before this snapshot.
+            i = bisect.bisect_right(busy, now)
+            if i:
+                quiet_since = max(quiet_since, busy[i - 1])
+            if now - quiet_since < idle_gap:
+                continue
+            changes = deltas.update(snapshot)
+            if changes:
+                prompt = "\n".join(part for part in (changes, timeline.context()) if part)
+                segments.append(Segment(now, PRIORITY_LOW, prompt=prompt))
+                quiet_since = now
+    return sorted((s for s in segments if s.priority >= min_priority), key=lambda s: s.start)
+
+# --- Batch Narration ---
+class BatchNarrator:
+    """
+    Captions and synthesizes every segment of a recorded game on a bounded
+    worker pool. Each worker has its own commentator; the lines before a
+    segment are passed along in its prompt instead of through chat history.
+    Gemini and ElevenLabs calls share the process-wide rate limits.
+    """
+    def __init__(self, workers=BATCH_WORKERS, synthesize=synthesize_audio):
+        self.workers = workers
+        self.synthesize = synthesize
+        self.templates = TemplateCaptioner()
+        self.stats = {"template": 0, "gemini": 0, "fallback": 0, "audio_seconds": 0.0}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _commentator(self):
+        if not hasattr(self._local, "commentator"):
+            self._local.commentator = LeagueCommentator()
+        return self._local.commentator
+
+    def narrate(self, segments, on_done=None):
+        """Fills in caption and audio of every segment, in parallel. on_done is called after each one."""
+        story = [self._story_line(s) for s in segments]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            futures = [
+                pool.submit(self._narrate_one, segment, story[max(0, i - STORY_LINES):i])
+                for i, segment in enumerate(segments)
+            ]
+            for future in futures:
+                future.result()
+                if on_done:
+                    on_done()
+        return segments
+
+    def _story_line(self, segment):
+        if segment.events:
+            return " ".join(event_to_text(e) for e in segment.events[:2])
+        mm, ss = divmod(int(segment.start), 60)
+        return f"[{mm:02d}:{ss:02d}] quiet stretch"
+
+    def _narrate_one(self, segment, story):
+        segment.caption, segment.source = self._caption(segment, story)
+        with self._lock:
+            self.stats[segment.source] += 1
+        if not segment.caption:
+            return
+        stream = self.synthesize(segment.caption)
+        if stream is None:
+            return
+        segment.audio = b"".join(stream)
+        with self._lock:
+            self.stats["audio_seconds"] += len(segment.audio) / BYTES_PER_SECOND
+
+    def _caption(self, segment, story):
+        """Returns (caption, source) for a segment."""
+        if segment.events:
+            caption = self.templates.route(segment.events)
+            if caption:
+                return caption, "template"
+            prompt = "".join(event_to_text(e) + "\n" for e in segment.events)
+            fallback = self.templates.fallback(segment.events)
+        else:
+            prompt, fallback = segment.prompt, ""
+        if story:
+            prompt = "Earlier in the game:\n" + "\n".join(story) + "\n\nNow:\n" + prompt
+        commentator = self._commentator()
+        # Segments are independent; the story so far is in the prompt.
+        commentator.history.reset()
+        errors = commentator.stats["error"]
+        caption = commentator.get_caption_from_gemini(prompt, fallback=fallback)
+        return caption, "fallback" if commentator.stats["error"] > errors else "gemini"
+
+# --- Track Assembly ---
+def assemble_track(segments, path, gap=0.3):
+    """
+    Writes the segments' audio to a mono WAV file on the game clock: each clip
+    starts at its segment's game time, or gap seconds after the previous clip
+    if that one is still talking. Returns the largest delay in seconds.
+    """
+    cursor = 0
+    max_delay = 0.0
+    silence = bytes(BYTES_PER_SECOND)
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(PCM_SAMPLE_WIDTH)
+        out.setframerate(PCM_SAMPLE_RATE)
+        for segment in segments:
+            if not segment.audio:
+                continue
+            at = max(int(segment.start * BYTES_PER_SECOND), cursor + int(gap * BYTES_PER_SECOND) if cursor else 0)
+            at -= at % PCM_SAMPLE_WIDTH
+            # Silence is written a second at a time, so a long quiet stretch needs no big buffer.
+            while cursor < at:
+                chunk = silence[:min(len(silence), at - cursor)]
+                out.writeframes(chunk)
+                cursor += len(chunk)
+            out.writeframes(segment.audio)
+            cursor += len(segment.audio)
+            segment.placed_at = at / BYTES_PER_SECOND
+            max_delay = max(max_delay, segment.placed_at - segment.start)
+    return max_delay
+
+def mux_video(video_path, track_path, output_path, offset=0.0):
+    """
+    Lays the commentary track over a video with moviepy, mixed with the video's
+    own sound. offset is the video time at which the game clock reads 0:00.
+    """
+    try:
+        from moviepy import VideoFileClip, AudioFileClip, CompositeAudioClip
+    except ImportError:
+        from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip
+    video = VideoFileClip(video_path)
+    commentary = AudioFileClip(track_path)
+    # moviepy 2 renamed set_* to with_*.
+    shift = getattr(commentary, "with_start", None) or commentary.set_start
+    commentary = shift(offset)
+    audio = CompositeAudioClip([video.audio, commentary]) if video.audio is not None else commentary
+    audio = audio.with_duration(video.duration) if hasattr(audio, "with_duration") else audio.set_duration(video.duration)
+    video = video.with_audio(audio) if hasattr(video, "with_audio") else video.set_audio(audio)
+    video.write_videofile(output_path, audio_codec="aac")
+    video.close()
+    commentary.close()
+
+# --- Program Entry Point ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Narrate a recorded game offline into a commentary track")
+    parser.add_argument("capture", help="capture file written with RECORD_PATH")
+    parser.add_argument("-o", "--output", default="commentary.wav", help="WAV file for the commentary track")
+    parser.add_argument("--game", type=int, default=-1, help="which game of the capture to narrate (default: the last)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="segments captioned and synthesized at once")
+    parser.add_argument("--min-priority", type=int, default=PRIORITY_LOW,
+                        help="only narrate segments of at least this priority, e.g. 2 for a highlight reel")
+    parser.add_argument("--idle-gap", type=float, default=45.0, help="game seconds without events before an idle line (0 for none)")
+    parser.add_argument("--video", help="video of the game to lay the commentary over")
+    parser.add_argument("--video-offset", type=float, default=0.0, help="video time in seconds at which the game clock reads 0:00")
+    parser.add_argument("--video-output", default="commentated.mp4")
+    args = parser.parse_args()
+
+    games = split_games(load_capture(args.capture))
+    if not games:
+        parser.error(f"{args.capture} holds no Live Client data")
+    game = games[args.game]
+    segments = plan_segments(game, args.min_priority, args.idle_gap)
+    print(f"🎬 {len(segments)} segments over {game.duration / 60:.1f} game minutes, {args.workers} workers")
+
+    started = time.monotonic()
+    done = [0]
+
+    def progress():
+        done[0] += 1
+        print(f"\r   narrated {done[0]}/{len(segments)}", end="", flush=True)
+
+    narrator = BatchNarrator(args.workers)
+    narrator.narrate(segments, on_done=progress)
+    print()
+    max_delay = assemble_track(segments, args.output)
+    wall_minutes = (time.monotonic() - started) / 60
+    print(f"💾 Wrote {args.output}: {narrator.stats['audio_seconds']:.0f}s of speech, largest delay behind the game clock {max_delay:.1f}s")
+    print(f"   captions: {narrator.stats['template']} template, {narrator.stats['gemini']} Gemini, {narrator.stats['fallback']} fallback")
+    print(f"⏱️ {game.duration / 60:.1f} game minutes in {wall_minutes:.2f} wall minutes "
+          f"({game.duration / 60 / max(wall_minutes, 1e-9):.1f} game minutes per minute)")
+
+    if args.video:
+        mux_video(args.video, args.output, args.video_output, args.video_offset)
+        print(f"🎞️ Wrote {args.video_output}")
@@ -0,0 +1,452 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import Future
+
+import audio_player
+from audio_player import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH, synthesize_audio
+from chat_history import ChatHistory
+from config import POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_OFFLINE_INTERVAL
+from llm_commentator import caption_deadline
+from mock_server import Replay
+from pipeline import CommentaryPipeline
+from poll_scheduler import PollScheduler
+from tts_cache import AudioCache
+from utils import percentile
+
+BYTES_PER_SECOND = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH
+
+# --- Latency Models ---
+class LatencyModel:
+    """
+    Log-normal delay around a median, in seconds. spread is the standard
+    deviation of the log, so 0 gives a constant delay. Seeded, so a run
+    draws the same delays every time.
+    """
+    def __init__(self, median, spread=0.0, seed=0, scale=1.0):
+        self.median = median
+        self.spread = spread
+        # Divides every delay, to compress a whole run in time.
+        self.scale = scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=0, scale=1.0):
+        """Builds a model from "MEDIAN" or "MEDIAN:SPREAD"."""
+        median, _, spread = spec.partition(":")
+        return cls(float(median), float(spread or 0), seed, scale)
+
+    def sample(self):
+        with self._lock:
+            noise = self._rng.gauss(0, 1)
+        return self.median * math.exp(self.spread * noise) / self.scale
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+# --- Stub Backends ---
+class StubCommentator:
+    """
+    Stands in for LeagueCommentator: answers after a first-token delay, one
+    sentence at a time. A first token later than the deadline gives the
+    fallback caption instead, like a slow Gemini call would.
+    """
+    def __init__(self, first_token, per_sentence, sentences=2):
+        self.first_token = first_token
+        self.per_sentence = per_sentence
+        self.sentences = sentences
+        self.history = ChatHistory()
+        self.calls = 0
+        self.stats = {"answered": 0, "deadline": 0, "error": 0}
+
+    def _lines(self):
+        self.calls += 1
+        return [f"Stub line {self.calls}, sentence {i + 1}, and what a moment on the Rift." for i in range(self.sentences)]
+
+    def _first_token(self, deadline):
+        """Waits for the first token. Returns False if the deadline passed first."""
+        delay = self.first_token.sample()
+        if deadline is not None and delay > deadline:
+            time.sleep(max(0.0, deadline))
+            self.stats["deadline"] += 1
+            return False
+        time.sleep(delay)
+        self.stats["answered"] += 1
+        return True
+
+    def get_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
+        self.history.contents(event_or_context_text)
+        lines = self._lines()
+        if not self._first_token(deadline):
+            return fallback
+        for _ in lines[1:]:
+            self.per_sentence.sleep()
+        caption = " ".join(lines)
+        self.history.add_turn(event_or_context_text, caption)
+        return caption
+
+    def stream_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
+        self.history.contents(event_or_context_text)
+        lines = self._lines()
+        if not self._first_token(deadline):
+            if fallback:
+                yield fallback
+            return
+        for i, line in enumerate(lines):
+            if i:
+                self.per_sentence.sleep()
+            yield line
+        self.history.add_turn(event_or_context_text, " ".join(lines))
+
+class StubElevenLabs:
+    """
+    Stands in for the ElevenLabs client: streams silent PCM for a line after a
+    time-to-first-byte delay, generating audio faster than real time.
+    """
+    def __init__(self, first_byte, chars_per_second=15.0, realtime_factor=4.0, chunk_seconds=0.25, scale=1.0):
+        self.first_byte = first_byte
+        self.chars_per_second = chars_per_second
+        self.realtime_factor = realtime_factor
+        self.chunk_seconds = chunk_seconds
+        self.scale = scale
+        self.text_to_speech = self
+
+    def stream(self, text, voice_id=None, model_id=None, output_format=None):
+        seconds = len(text) / self.chars_per_second
+        chunk = bytes(int(self.chunk_seconds * BYTES_PER_SECOND) // PCM_SAMPLE_WIDTH * PCM_SAMPLE_WIDTH)
+        self.first_byte.sleep()
+        for _ in range(max(1, math.ceil(seconds / self.chunk_seconds))):
+            yield chunk
+            time.sleep(self.chunk_seconds / self.realtime_factor / self.scale)
+
+class SimulatedPlayer:
+    """Plays clips one after another in (scaled) real time without a sound device."""
+    def __init__(self, scale=1.0):
+        self.scale = scale
+        self._clips = deque()
+        self._ready = threading.Condition()
+        threading.Thread(target=self._run, name="simulated-player", daemon=True).start()
+
+    def play(self, stream, priority=0):
+        future = Future()
+        if not stream:
+            future.set_result(False)
+            return future
+        with self._ready:
+            self._clips.append((stream, future))
+            self._ready.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._clips:
+                    self._ready.wait()
+                stream, future = self._clips.popleft()
+            for chunk in stream:
+                if stream.playback_started_at is None:
+                    stream.playback_started_at = time.monotonic()
+                time.sleep(len(chunk) / BYTES_PER_SECOND / self.scale)
+            future.set_result(True)
+
+# --- Scripted Games ---
+def script_game(minutes, seed=0, kill_every=40.0, burst_every=0.0, burst_size=5, first_kill=90.0):
+    """
+    Builds a capture (see recorder.py) for a synthetic game: kills at random,
+    turrets, dragons and barons on a plausible schedule, and optionally
+    teamfight bursts of burst_size kills every burst_every seconds.
+    """
+    rng = random.Random(seed)
+    duration = minutes * 60
+    events = [(0.0, {"EventName": "GameStart"}), (65.0, {"EventName": "MinionsSpawning"})]
+    names = [f"Player{i}" for i in range(10)]
+
+    t = first_kill
+    while kill_every and t < duration:
+        killer, victim = rng.sample(names, 2)
+        events.append((t, {"EventName": "ChampionKill", "KillerName": killer, "VictimName": victim}))
+        t += rng.expovariate(1 / kill_every)
+    for t in range(300, int(duration), 300):
+        events.append((t, {"EventName": "DragonKill", "KillerName": rng.choice(names), "DragonType": "Fire"}))
+    for t in range(840, int(duration), 420):
+        events.append((t + 30, {"EventName": "TurretKilled", "KillerName": rng.choice(names), "TurretKilled": "Turret_T2_C_03_A"}))
+    for t in range(1200, int(duration), 600):
+        events.append((t + 60, {"EventName": "BaronKill", "KillerName": rng.choice(names)}))
+    if burst_every:
+        for t in range(int(burst_every), int(duration), int(burst_every)):
+            for i in range(burst_size):
+                killer, victim = rng.choice(names[:5]), names[5 + i % 5]
+                events.append((t + i * 0.8, {"EventName": "ChampionKill", "KillerName": killer, "VictimName": victim}))
+
+    events.sort(key=lambda item: item[0])
+    records = [{"t": 0.0, "api": "lcu", "path": "/lol-gameflow/v1/gameflow-phase", "status": 200, "body": "InProgress"}]
+    for event_id, (t, event) in enumerate(events):
+        event.update(EventID=event_id, EventTime=float(t))
+        records.append({"t": float(t), "api": "live", "path": "/liveclientdata/eventdata", "status": 200, "body": {"Events": [event]}})
+    for second in range(0, int(duration) + 1):
+        records.append({"t": float(second), "api": "live", "path": "/liveclientdata/gamestats", "status": 200, "body": {"gameTime": float(second)}})
+        if second % 5 == 0:
+            records.append({"t": float(second), "api": "live", "path": "/liveclientdata/allgamedata", "status": 200,
+                            "body": _all_game_data(names, second, rng)})
+    records.sort(key=lambda r: r["t"])
+    return records
+
+def _all_game_data(names, second, rng):
+    """A small allgamedata body whose levels, scores and items grow with the clock."""
+    minute = second / 60
+    players = [
+        {
+            "riotIdGameName": name, "championName": f"Champ{i}", "team": "ORDER" if i < 5 else "CHAOS",
+            "level": min(18, 1 + int(minute / 2)),
+            "scores": {"kills": int(minute / 6) + i % 3, "deaths": int(minute / 7), "assists": int(minute / 5)},
+            "items": [{"price": 400, "count": 1}] * min(6, int(minute / 4) + rng.randint(0, 1)),
+        }
+        for i, name in enumerate(names)
+    ]
+    health = rng.uniform(200, 1500)
+    return {
+        "activePlayer": {"riotIdGameName": names[0], "championStats": {"currentHealth": health, "maxHealth": 1500}},
+        "allPlayers": players,
+        "events": {"Events": []},
+        "gameData": {"gameTime": float(second)},
+    }
+
+class ScriptedClient:
+    """LeagueClient stand-in answering every request from a Replay, without any network."""
+    def __init__(self, replay):
+        self.replay = replay
+        self.port = "scripted"
+        self.reachable = {"lcu": True, "live": True}
+
+    def lcu_request(self, endpoint):
+        return self.replay.respond("lcu", endpoint)[1]
+
+    def live_request(self, endpoint):
+        return self.replay.respond("live", endpoint)[1]
+
+    def appeared_at(self, event):
+        """Monotonic time at which an event became visible in eventdata."""
+        return self.replay.started_at + event.get("EventTime", 0) / self.replay.speed
+
+# --- Instrumented Pipeline ---
+class BenchmarkPipeline(CommentaryPipeline):
+    """
+    CommentaryPipeline that also measures detection (event visible to job
+    created) and end-to-end latency (event visible to first audio sample).
+    """
+    def __init__(self, *args, speed=1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Replay speed, which also compresses the Gemini deadlines.
+        self.speed = speed
+        # Keep every measurement, not just the recent window.
+        self.latencies = deque()
+        self.stage_latencies = {stage: deque() for stage in self.stage_latencies}
+        self.detect_latencies = deque()
+        self.end_to_end = deque()
+        self.events_seen = 0
+        self.max_in_flight = 0
+        # (poll start, poll end, earliest appearance) of recent polls that found events.
+        self._polls = deque(maxlen=64)
+        self._found = []
+        get_new_events = self.ctx.get_new_events
+
+        def tracked_get_new_events():
+            events = get_new_events()
+            self._found.extend(events)
+            return events
+        self.ctx.get_new_events = tracked_get_new_events
+
+    def poll_once(self):
+        started = time.monotonic()
+        self._found = []
+        result = super().poll_once()
+        if self._found:
+            appeared = min(self.client.appeared_at(e) for e in self._found)
+            self._polls.append((started, time.monotonic(), appeared))
+            self.events_seen += len(self._found)
+            self.detect_latencies.append(started - appeared)
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return result
+
+    def _deadline(self, job):
+        deadline = caption_deadline(job.priority)
+        if deadline is None:
+            return None
+        return deadline / self.speed - (time.monotonic() - job.created_at)
+
+    def _record_latency(self, job):
+        super()._record_latency(job)
+        started = getattr(job.payload, "playback_started_at", None)
+        if started is None:
+            return
+        for poll_start, poll_end, appeared in reversed(self._polls):
+            if poll_start <= job.created_at <= poll_end:
+                self.end_to_end.append(started - appeared)
+                return
+
+# --- Scenarios ---
+def build(records, args, speed):
+    """Wires a BenchmarkPipeline to stub backends for a scripted game replayed at speed."""
+    replay = Replay(records, speed=speed)
+    client = ScriptedClient(replay)
+    commentator = StubCommentator(
+        LatencyModel.parse(args.llm_first_token, args.seed, speed),
+        LatencyModel.parse(args.llm_per_sentence, args.seed + 1, speed),
+    )
+    audio_player.elevenlabs_client = StubElevenLabs(LatencyModel.parse(args.tts_first_byte, args.seed + 2, speed), scale=speed)
+    # Memory-only cache: stub lines are unique, so this only adds the bookkeeping cost.
+    audio_player.audio_cache = AudioCache(directory="")
+    player = SimulatedPlayer(scale=speed)
+    pipeline = BenchmarkPipeline(
+        commentator, synthesize_audio, player.play, client=client, speed=speed,
+        scheduler=PollScheduler(POLL_MIN_INTERVAL / speed, POLL_MAX_INTERVAL / speed, POLL_OFFLINE_INTERVAL / speed),
+    )
+    return replay, pipeline
+
+def run_game(records, args, speed, seconds, on_tick=None, tick=1.0):
+    """Replays records through a fresh pipeline for the given number of game seconds."""
+    replay, pipeline = build(records, args, speed)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        replay.start()
+        pipeline.start()
+        end = time.monotonic() + seconds / speed
+        while time.monotonic() < end:
+            time.sleep(min(tick, max(0.0, end - time.monotonic())))
+            if on_tick:
+                on_tick(replay.now())
+        pipeline.stop()
+    return pipeline
+
+def summarize(values, scale=1.0):
+    """p50/p95/p99/max of a list of seconds, scaled back to game seconds."""
+    values = [v * scale for v in values]
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(max(values), 3) if values else 0,
+    }
+
+def latency_report(pipeline, speed):
+    report = {"detect": summarize(pipeline.detect_latencies, speed)}
+    for stage, values in pipeline.stage_latencies.items():
+        report[stage] = summarize(values, speed)
+    report["pipeline"] = summarize(pipeline.latencies, speed)
+    report["end_to_end"] = summarize(pipeline.end_to_end, speed)
+    return report
+
+def scenario_latency(args):
+    """Steady play: per-stage and end-to-end latency."""
+    minutes = args.duration / 60
+    records = script_game(minutes + 1, args.seed, kill_every=args.kill_every, first_kill=5.0)
+    pipeline = run_game(records, args, args.speed, args.duration)
+    return {"latency": latency_report(pipeline, args.speed), "stats": pipeline.stats, "gemini": pipeline.commentator.stats}
+
+def scenario_burst(args):
+    """Repeated teamfights: throughput and latency while the pipeline is saturated."""
+    records = script_game(args.duration / 60 + 1, args.seed, kill_every=0, burst_every=args.burst_every, burst_size=args.burst_size, first_kill=5.0)
+    pipeline = run_game(records, args, args.speed, args.duration)
+    minutes = args.duration / 60
+    return {
+        "events": pipeline.events_seen,
+        "lines_spoken": pipeline.stats["spoken"],
+        "lines_per_minute": round(pipeline.stats["spoken"] / minutes, 2),
+        "max_in_flight": pipeline.max_in_flight,
+        "scheduler": pipeline.events.stats,
+        "stats": pipeline.stats,
+        "gemini": pipeline.commentator.stats,
+        "latency": latency_report(pipeline, args.speed),
+    }
+
+def scenario_soak(args):
+    """A whole game compressed in time: memory growth over the simulated minutes."""
+    records = script_game(args.game_minutes, args.seed, kill_every=args.kill_every, burst_every=300)
+    samples = []
+    next_sample = [60.0]
+
+    def on_tick(game_seconds):
+        if game_seconds >= next_sample[0]:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append((round(game_seconds / 60, 1), round(current / 1024 / 1024, 2)))
+            next_sample[0] += args.sample_every
+
+    tracemalloc.start()
+    try:
+        pipeline = run_game(records, args, args.soak_speed, args.game_minutes * 60, on_tick)
+    finally:
+        tracemalloc.stop()
+    # Growth after the first simulated minute, once imports and warm-up are done.
+    growth = samples[-1][1] - samples[0][1] if len(samples) > 1 else 0.0
+    return {
+        "speed": args.soak_speed,
+        "memory_mb": samples,
+        "growth_mb": round(growth, 2),
+        "lines_spoken": pipeline.stats["spoken"],
+        "history_tokens": pipeline.commentator.history.history_tokens(),
+        # The in-memory TTS cache fills up to TTS_CACHE_MEMORY_MB and then stays flat.
+        "tts_cache_mb": round(audio_player.audio_cache._memory_used / 1024 / 1024, 2),
+    }
+
+SCENARIOS = {"latency": scenario_latency, "burst": scenario_burst, "soak": scenario_soak}
+
+def print_report(name, result):
+    print(f"\n=== {name} ===")
+    for stage, stats in result.get("latency", {}).items():
+        print(f"  {stage:<11} n={stats['count']:<4} p50={stats['p50']:.2f}s p95={stats['p95']:.2f}s p99={stats['p99']:.2f}s max={stats['max']:.2f}s")
+    for key, value in result.items():
+        if key != "latency":
+            print(f"  {key}: {value}")
+
+# --- Program Entry Point ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the commentary pipeline with stub Gemini and ElevenLabs backends")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run, from {', '.join(sorted(SCENARIOS))} (default: latency burst)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=120, help="game seconds for the latency and burst scenarios")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression for the latency and burst scenarios")
+    parser.add_argument("--kill-every", type=float, default=20.0, help="mean seconds between scripted kills")
+    parser.add_argument("--burst-every", type=float, default=30.0, help="seconds between teamfights in the burst scenario")
+    parser.add_argument("--burst-size", type=int, default=5, help="kills per teamfight")
+    parser.add_argument("--game-minutes", type=float, default=60, help="simulated game length for the soak scenario")
+    parser.add_argument("--soak-speed", type=float, default=60.0, help="time compression for the soak scenario")
+    parser.add_argument("--sample-every", type=float, default=300, help="game seconds between memory samples")
+    parser.add_argument("--llm-first-token", default="0.6:0.3", help="Gemini time to first sentence, MEDIAN[:SPREAD] seconds")
+    parser.add_argument("--llm-per-sentence", default="0.3:0.2", help="Gemini time per further sentence")
+    parser.add_argument("--tts-first-byte", default="0.35:0.25", help="ElevenLabs time to first audio chunk")
+    parser.add_argument("--max-p95", type=float, help="fail if any end-to-end p95 exceeds this many seconds")
+    parser.add_argument("--max-growth-mb", type=float, help="fail if soak memory grows by more than this")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or ["latency", "burst"]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = SCENARIOS[name](args)
+        print_report(name, results[name])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    for name, result in results.items():
+        p95 = result.get("latency", {}).get("end_to_end", {}).get("p95", 0)
+        if args.max_p95 is not None and p95 > args.max_p95:
+            failures.append(f"{name}: end-to-end p95 {p95:.2f}s > {args.max_p95:.2f}s")
+        if args.max_growth_mb is not None and result.get("growth_mb", 0) > args.max_growth_mb:
+            failures.append(f"{name}: memory grew {result['growth_mb']:.2f} MB > {args.max_growth_mb:.2f} MB")
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
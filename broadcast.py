@@ -0,0 +1,289 @@
+import heapq
+import itertools
+import json
+import queue
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_player import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH
+from config import BROADCAST_HOST, BROADCAST_PORT, BROADCAST_CLIENT_BUFFER_SECONDS, PREEMPT_MIN_PRIORITY
+from metrics import BROADCAST_LISTENERS, BROADCAST_DROPPED
+
+# Audio goes out in blocks of this many seconds, paced to real time.
+BLOCK_SECONDS = 0.1
+BLOCK_BYTES = int(PCM_SAMPLE_RATE * BLOCK_SECONDS) * PCM_SAMPLE_WIDTH
+SILENCE = bytes(BLOCK_BYTES)
+# Captions kept per listener before the oldest are dropped.
+CAPTION_BUFFER = 32
+
+def wav_stream_header():
+    """WAV header for a stream of unknown length, which browsers, OBS and ffmpeg play as it arrives."""
+    unknown = 0xFFFFFFFF
+    return (
+        b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, PCM_SAMPLE_RATE, PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH,
+                                PCM_SAMPLE_WIDTH, PCM_SAMPLE_WIDTH * 8)
+        + b"data" + struct.pack("<I", unknown)
+    )
+
+OVERLAY_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>LoL Commentary</title>
+<style>
+body { margin: 0; background: transparent; font: 600 28px sans-serif; color: #fff; }
+#caption { position: fixed; bottom: 5%; width: 100%; text-align: center; text-shadow: 0 0 6px #000; }
+</style></head>
+<body>
+<audio src="/audio" autoplay controls></audio>
+<div id="caption"></div>
+<script>
+const caption = document.getElementById("caption");
+const feed = new EventSource("/captions");
+feed.addEventListener("caption", e => { caption.textContent = JSON.parse(e.data).text; });
+feed.addEventListener("end", e => { caption.textContent = ""; });
+</script>
+</body></html>
+"""
+
+# --- Listeners ---
+class _Listener:
+    """
+    One connected client's bounded queue. The broadcaster never waits for a
+    listener: when the queue is full, its oldest item is dropped instead.
+    """
+    def __init__(self, feed, size):
+        self.feed = feed
+        self.items = queue.Queue(maxsize=size)
+        self.dropped = 0
+
+    def offer(self, item):
+        while True:
+            try:
+                self.items.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.items.get_nowait()
+                    self.dropped += 1
+                    BROADCAST_DROPPED.inc(feed=self.feed)
+                except queue.Empty:
+                    pass
+
+# --- Broadcaster ---
+class Broadcaster:
+    """
+    Streams commentary to any number of local listeners: one continuous WAV
+    stream at /audio, paced to real time with silence between lines, and a
+    server-sent-events caption feed at /captions with stream positions and
+    timestamps for overlays. / serves a small overlay page using both.
+
+    Each block of audio is cut once and the same bytes go to every listener.
+    Listeners that fall behind lose their oldest audio, so a slow client can
+    never hold up the pipeline or the other listeners.
+
+    play(stream, priority=...) can be used as the pipeline's player: it
+    returns a Future resolved once the clip has gone out on the stream.
+    """
+    def __init__(self, host=BROADCAST_HOST, port=BROADCAST_PORT, buffer_seconds=BROADCAST_CLIENT_BUFFER_SECONDS,
+                 preempt_min_priority=PREEMPT_MIN_PRIORITY):
+        self.host = host
+        self.port = port
+        self.buffer_blocks = max(1, int(buffer_seconds / BLOCK_SECONDS))
+        self.preempt_min_priority = preempt_min_priority
+        # (-priority, sequence, stream, future), like the speakers' audio engine.
+        self._clips = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._listeners = {"audio": set(), "captions": set()}
+        self._lock = threading.Lock()
+        self._caption_ids = itertools.count(1)
+        # Clip being streamed: (stream, future, priority), and its audio not yet sent.
+        self._current = None
+        self._pending = b""
+        # Seconds of audio streamed so far, the clock captions are positioned on.
+        self.position = 0.0
+        self.stats = {"clips": 0, "preempted": 0, "dropped": 0, "underruns": 0}
+        self._stop_event = threading.Event()
+        self._server = None
+
+    def start(self):
+        """Starts the HTTP server and the real-time audio clock in background threads."""
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="broadcast-http", daemon=True).start()
+        threading.Thread(target=self._run, name="broadcast", daemon=True).start()
+        print(f"📡 Broadcasting on http://{self.host}:{self._server.server_address[1]}/ (audio at /audio, captions at /captions)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def play(self, stream, priority=0):
+        """Queues an AudioStream for the broadcast and returns a Future resolved when it has gone out."""
+        if not stream:
+            return None
+        future = Future()
+        self._clips.put((-priority, next(self._seq), stream, future))
+        return future
+
+    # --- Listeners ---
+    def subscribe(self, feed):
+        listener = _Listener(feed, self.buffer_blocks if feed == "audio" else CAPTION_BUFFER)
+        with self._lock:
+            self._listeners[feed].add(listener)
+            BROADCAST_LISTENERS.set(len(self._listeners[feed]), feed=feed)
+        return listener
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners[listener.feed].discard(listener)
+            BROADCAST_LISTENERS.set(len(self._listeners[listener.feed]), feed=listener.feed)
+
+    def _publish(self, feed, item):
+        with self._lock:
+            listeners = list(self._listeners[feed])
+        for listener in listeners:
+            listener.offer(item)
+
+    def _caption(self, event, **fields):
+        """Sends a caption feed event to every caption listener."""
+        fields.update(time=round(time.time(), 3), position=round(self.position, 3))
+        data = f"id: {next(self._caption_ids)}\nevent: {event}\ndata: {json.dumps(fields)}\n\n"
+        self._publish("captions", data.encode("utf-8"))
+
+    # --- Audio Clock ---
+    def _run(self):
+        """Sends one block of audio every BLOCK_SECONDS, whether anyone is listening or not."""
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            block = self._next_block()
+            self._publish("audio", block)
+            self.position += BLOCK_SECONDS
+            next_tick += BLOCK_SECONDS
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -1.0:
+                # Fell far behind (e.g. the machine was suspended): pick up from now.
+                next_tick = time.monotonic()
+
+    def _next_block(self):
+        """The next BLOCK_BYTES of the clip being streamed, padded with silence."""
+        self._preempt_if_outranked()
+        if self._current is None and not self._start_next_clip():
+            return SILENCE
+        stream, future, priority = self._current
+        ended = False
+        while len(self._pending) < BLOCK_BYTES:
+            chunk = stream.read_nowait()
+            if chunk is None:
+                ended = True
+                break
+            if not chunk:
+                break
+            self._pending += chunk
+        # Whole samples only, so padding never shifts the rest of the clip by a byte.
+        size = min(BLOCK_BYTES, len(self._pending) - len(self._pending) % PCM_SAMPLE_WIDTH)
+        block, self._pending = self._pending[:size], self._pending[size:]
+        if ended and len(self._pending) < PCM_SAMPLE_WIDTH:
+            self._pending = b""
+        if ended and not self._pending:
+            self._finish_clip()
+        elif len(block) < BLOCK_BYTES:
+            # Speech is arriving slower than it plays: fill in silence rather than wait.
+            self.stats["underruns"] += 1
+        return block + SILENCE[len(block):]
+
+    def _start_next_clip(self):
+        try:
+            neg_priority, _, stream, future = self._clips.get_nowait()
+        except queue.Empty:
+            return False
+        if not future.set_running_or_notify_cancel():
+            return False
+        self._current = (stream, future, -neg_priority)
+        self._pending = b""
+        stream.playback_started_at = time.monotonic()
+        self.stats["clips"] += 1
+        self._caption("caption", text=stream.text or "", priority=-neg_priority)
+        return True
+
+    def _finish_clip(self, interrupted=False):
+        stream, future, priority = self._current
+        self._current = None
+        self._pending = b""
+        stream.interrupted = interrupted
+        self._caption("end", text=stream.text or "", interrupted=interrupted)
+        future.set_result(stream)
+
+    def _preempt_if_outranked(self):
+        """
+        Cuts the current clip short when a clip that may interrupt it is waiting,
+        and drops the waiting clips that rank below the winner, like the
+        speakers' audio engine, so they don't play stale after it.
+        """
+        if self._current is None:
+            return
+        with self._clips.mutex:
+            winner = -self._clips.queue[0][0] if self._clips.queue else None
+            if winner is None or winner < self.preempt_min_priority or winner <= self._current[2]:
+                return
+            losers = [item for item in self._clips.queue if -item[0] < winner]
+            self._clips.queue[:] = [item for item in self._clips.queue if -item[0] >= winner]
+            heapq.heapify(self._clips.queue)
+        self.stats["preempted"] += 1
+        self._finish_clip(interrupted=True)
+        for _, _, stream, future in losers:
+            self.stats["dropped"] += 1
+            stream.interrupted = True
+            if future.set_running_or_notify_cancel():
+                future.set_result(stream)
+
+# --- HTTP Endpoints ---
+def _make_handler(broadcaster):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/audio":
+                self._stream("audio", "audio/wav", wav_stream_header())
+            elif self.path == "/captions":
+                self._stream("captions", "text/event-stream", b"retry: 1000\n\n")
+            elif self.path == "/":
+                payload = OVERLAY_PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            else:
+                self.send_error(404, "Try /, /audio or /captions")
+
+        def _stream(self, feed, content_type, preamble):
+            """Writes the feed to this client until it disconnects."""
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            listener = broadcaster.subscribe(feed)
+            try:
+                self.wfile.write(preamble)
+                while not broadcaster._stop_event.is_set():
+                    try:
+                        item = listener.items.get(timeout=1.0)
+                    except queue.Empty:
+                        # Keeps idle caption connections from timing out.
+                        item = b": keep-alive\n\n" if feed == "captions" else None
+                    if item:
+                        self.wfile.write(item)
+                        self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                broadcaster.unsubscribe(listener)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
@@ -0,0 +1,85 @@
+import re
+import threading
+from config import CHAT_HISTORY_MAX_TOKENS, CHAT_HISTORY_MAX_TURNS, CHAT_SUMMARY_MAX_CHARS
+
+# Rough conversion used to estimate prompt size without a round trip to the API.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def first_sentence(text):
+    """Returns the first sentence of a piece of text."""
+    return re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+
+# --- Bounded Chat History ---
+class ChatHistory:
+    """
+    Keeps the most recent commentary turns verbatim within a token and turn budget,
+    and folds older turns into a short running summary of the game so far.
+    Safe to share between threads: the poller, caption stage and filler all write to it.
+    """
+    def __init__(self, max_tokens=CHAT_HISTORY_MAX_TOKENS, max_turns=CHAT_HISTORY_MAX_TURNS,
+                 summary_max_chars=CHAT_SUMMARY_MAX_CHARS):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.summary_max_chars = summary_max_chars
+        # (user prompt, model reply) pairs, oldest first.
+        self.turns = []
+        self.summary_lines = []
+        # Estimated size in tokens of the last prompt built with contents().
+        self.prompt_size = 0
+        # Reentrant, as add_turn() compacts while holding it.
+        self._lock = threading.RLock()
+
+    def add_turn(self, user_text, model_text):
+        """Records a completed exchange and compacts the history if it is over budget."""
+        with self._lock:
+            self.turns.append((user_text, model_text))
+            self.compact()
+
+    def compact(self):
+        """Folds the oldest turns into the summary until the history fits its budget."""
+        with self._lock:
+            while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.history_tokens() > self.max_tokens):
+                _, model_text = self.turns.pop(0)
+                self._fold(model_text)
+
+    def _fold(self, model_text):
+        """Adds the gist of an old reply to the running summary, dropping the oldest lines if it grows too long."""
+        line = first_sentence(model_text)
+        if line:
+            self.summary_lines.append(line)
+        while self.summary_lines and len(" ".join(self.summary_lines)) > self.summary_max_chars:
+            self.summary_lines.pop(0)
+
+    @property
+    def summary(self):
+        """The running summary of turns that are no longer kept verbatim."""
+        return " ".join(self.summary_lines)
+
+    def history_tokens(self):
+        """Estimated size in tokens of the summary and the verbatim turns."""
+        return estimate_tokens(self.summary) + sum(estimate_tokens(u) + estimate_tokens(m) for u, m in self.turns)
+
+    def contents(self, user_text):
+        """Builds the Gemini contents list for a new prompt: summary, recent turns, then the prompt itself."""
+        with self._lock:
+            contents = []
+            if self.summary_lines:
+                contents.append({"role": "user", "parts": [f"Summary of the commentary so far: {self.summary}"]})
+                contents.append({"role": "model", "parts": ["Understood."]})
+            for user, model in self.turns:
+                contents.append({"role": "user", "parts": [user]})
+                contents.append({"role": "model", "parts": [model]})
+            contents.append({"role": "user", "parts": [user_text]})
+            self.prompt_size = self.history_tokens() + estimate_tokens(user_text)
+        return contents
+
+    def reset(self):
+        """Forgets the whole history, e.g. when a new game starts."""
+        with self._lock:
+            self.turns = []
+            self.summary_lines = []
+            self.prompt_size = 0
@@ -12,5 +12,141 @@ VOICE_ID = os.getenv("VOICE_ID")
 GEMINI_LLM_MODEL = os.getenv("GEMINI_LLM_MODEL")
 LOL_LOCKFILE_PATH = os.getenv("LOL_LOCKFILE_PATH")
 
+# --- Local API Settings ---
+# Host of the LCU and Live Client APIs, and the Live Client API port. Override to point at a stand-in server.
+LOCAL_API_HOST = os.getenv("LOCAL_API_HOST", "127.0.0.1")
+LIVE_CLIENT_PORT = int(os.getenv("LIVE_CLIENT_PORT", "2999"))
+# "https" for the real game client; mock_server.py may serve plain "http".
+LIVE_CLIENT_PROTOCOL = os.getenv("LIVE_CLIENT_PROTOCOL", "https")
+# Append every LCU and Live Client API response to this capture file, for replay with mock_server.py.
+RECORD_PATH = os.getenv("RECORD_PATH")
+# Listen for gameflow and champ select changes on the LCU WebSocket instead of polling them.
+USE_LCU_WEBSOCKET = os.getenv("USE_LCU_WEBSOCKET", "true").lower() == "true"
+# Connect and read timeouts in seconds for requests to the LCU and Live Client APIs.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "1.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "2.0"))
+# Number of keep-alive connections kept open per API.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "4"))
+
+# --- Pipeline Settings ---
+# Seconds between Live Client polls: fastest during busy stretches, slowest when quiet,
+# and the back-off ceiling while the client is unreachable.
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "0.25"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "2.0"))
+POLL_OFFLINE_INTERVAL = float(os.getenv("POLL_OFFLINE_INTERVAL", "10.0"))
+# Maximum number of items waiting between two pipeline stages.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+# Send captions to TTS sentence by sentence while Gemini is still generating.
+STREAM_CAPTIONS = os.getenv("STREAM_CAPTIONS", "true").lower() == "true"
+
+# --- Gemini Deadline Settings ---
+# Seconds Gemini gets to answer (to its first sentence when streaming) before a caption is built
+# locally from the event data, by priority: filler, kills, dragons/turrets, Baron/Elder. 0 means no deadline.
+GEMINI_DEADLINES = [float(s) for s in os.getenv("GEMINI_DEADLINES", "6,4,3,2.5").split(",") if s.strip()]
+# Seconds a streamed reply may go without a new sentence (or a first one, with no deadline) before it is cut short.
+GEMINI_STREAM_IDLE_TIMEOUT = float(os.getenv("GEMINI_STREAM_IDLE_TIMEOUT", "8"))
+
+# --- Rate Limit Settings ---
+# Per-minute quotas of the API keys; 0 means unlimited. Gemini usage is counted in prompt tokens,
+# ElevenLabs usage in characters. Requests wait for quota instead of running into it.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+ELEVENLABS_RPM = int(os.getenv("ELEVENLABS_RPM", "0"))
+ELEVENLABS_CHARS_PER_MINUTE = int(os.getenv("ELEVENLABS_CHARS_PER_MINUTE", "0"))
+# Most requests in flight at once. Halved on every quota error and grown back slowly after.
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+ELEVENLABS_MAX_CONCURRENCY = int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "2"))
+# Attempts per request for quota and transient errors, and the longest pause between attempts in seconds.
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", "4"))
+API_RETRY_MAX_BACKOFF = float(os.getenv("API_RETRY_MAX_BACKOFF", "8"))
+
+# --- Server Mode Settings ---
+# Worker threads shared by all game sessions for Gemini and ElevenLabs calls.
+GEMINI_WORKERS = int(os.getenv("GEMINI_WORKERS", "4"))
+ELEVENLABS_WORKERS = int(os.getenv("ELEVENLABS_WORKERS", "4"))
+# Seconds between throughput and latency reports.
+SERVER_REPORT_INTERVAL = float(os.getenv("SERVER_REPORT_INTERVAL", "30"))
+
+# --- Batch Mode Settings ---
+# Segments of a recorded game captioned and synthesized at once by batch_commentary.py.
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+
+# --- Metrics Settings ---
+# Local endpoint serving Prometheus metrics and the sampling profiler. Set METRICS_PORT to 0 to disable it.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+# Milliseconds between stack samples while the profiler is running.
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+
+# --- Broadcast Settings ---
+# Address of the audio and caption stream started with main.py --broadcast.
+BROADCAST_HOST = os.getenv("BROADCAST_HOST", "127.0.0.1")
+BROADCAST_PORT = int(os.getenv("BROADCAST_PORT", "8090"))
+# Seconds of audio buffered per listener; a listener further behind loses its oldest audio.
+BROADCAST_CLIENT_BUFFER_SECONDS = float(os.getenv("BROADCAST_CLIENT_BUFFER_SECONDS", "5"))
+
+# --- Dashboard Settings ---
+# Lines of commentator output kept in the ui.py log box.
+UI_SCROLLBACK_LINES = int(os.getenv("UI_SCROLLBACK_LINES", "2000"))
+# Milliseconds between log and panel refreshes, and the most log lines added per refresh.
+UI_REFRESH_MS = int(os.getenv("UI_REFRESH_MS", "250"))
+UI_MAX_LINES_PER_REFRESH = int(os.getenv("UI_MAX_LINES_PER_REFRESH", "200"))
+# Seconds between reads of the commentator's metrics endpoint.
+UI_METRICS_INTERVAL = float(os.getenv("UI_METRICS_INTERVAL", "1.0"))
+
+# --- Event Scheduling Settings ---
+# Events this many in-game seconds behind the game clock are dropped.
+EVENT_MAX_LAG = float(os.getenv("EVENT_MAX_LAG", "20"))
+# Baron and Elder are worth a late call, but not one from a minute ago (e.g. after a reconnect).
+EVENT_MAX_LAG_CRITICAL = float(os.getenv("EVENT_MAX_LAG_CRITICAL", "60"))
+# Kills by the same champion this close together are announced as one multikill.
+KILL_BURST_WINDOW = float(os.getenv("KILL_BURST_WINDOW", "10"))
+
+# --- Playback Preemption Settings ---
+# Clips of at least this priority (0 filler, 1 kills, 2 dragons/turrets, 3 Baron/Elder)
+# interrupt lower-priority audio that is already playing.
+PREEMPT_MIN_PRIORITY = int(os.getenv("PREEMPT_MIN_PRIORITY", "2"))
+# Fade-out applied to interrupted audio, in milliseconds.
+PREEMPT_FADE_MS = int(os.getenv("PREEMPT_FADE_MS", "150"))
+
+# --- Template Caption Settings ---
+# Event types captioned locally from templates instead of Gemini. Leave empty to send everything to Gemini.
+TEMPLATE_EVENT_TYPES = [t.strip() for t in os.getenv(
+    "TEMPLATE_EVENT_TYPES",
+    "GameStart,MinionsSpawning,FirstBrick,TurretKilled,InhibRespawningSoon,InhibRespawned",
+).split(",") if t.strip()]
+# Largest batch of routine events that is still captioned from templates.
+TEMPLATE_MAX_BATCH = int(os.getenv("TEMPLATE_MAX_BATCH", "2"))
+
+# --- Idle Commentary Settings ---
+# Item gold change (per player or in the team lead) worth mentioning.
+GOLD_SWING_THRESHOLD = int(os.getenv("GOLD_SWING_THRESHOLD", "1000"))
+# Fraction of max health the active player must lose between snapshots to be mentioned.
+HEALTH_DROP_THRESHOLD = float(os.getenv("HEALTH_DROP_THRESHOLD", "0.3"))
+
+# --- Timeline Settings ---
+# Ticks of per-player stats kept in memory for trend queries (about half an hour of idle polls).
+TIMELINE_CAPACITY = int(os.getenv("TIMELINE_CAPACITY", "1800"))
+# Keep the timeline columns in memory-mapped files with this path prefix instead of RAM.
+TIMELINE_SPILL_PATH = os.getenv("TIMELINE_SPILL_PATH")
+
+# --- Filler Settings ---
+# Pre-synthesized filler lines kept ready for quiet stretches, and seconds before an unused one is thrown away.
+FILLER_POOL_SIZE = int(os.getenv("FILLER_POOL_SIZE", "3"))
+FILLER_TTL = float(os.getenv("FILLER_TTL", "120"))
+
+# --- TTS Cache Settings ---
+# Directory for cached speech (empty to keep the cache in memory only) and size limits per level.
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+TTS_CACHE_MEMORY_BYTES = int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024)
+TTS_CACHE_DISK_BYTES = int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * 1024 * 1024)
+
+# --- Chat History Settings ---
+# Estimated token budget for the chat history sent with every prompt.
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "3000"))
+# Number of recent turns kept verbatim; older turns are folded into a summary.
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "6"))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "800"))
+
 # Suppress warnings, useful for self-signed SSL certificates.
 warnings.filterwarnings("ignore")
\ No newline at end of file
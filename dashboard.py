@@ -0,0 +1,226 @@
+import itertools
+import os
+import re
+import subprocess
+import sys
+import threading
+import urllib.request
+from collections import deque
+
+from dotenv import dotenv_values
+
+from config import METRICS_HOST, METRICS_PORT, UI_SCROLLBACK_LINES, UI_METRICS_INTERVAL
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_PATH = os.path.join(BASE_DIR, "main.py")
+ENV_PATH = os.path.join(BASE_DIR, ".env")
+
+# Latency histograms shown on the dashboard besides the per-stage times, with their labels.
+LATENCIES = (
+    ("pipeline_latency_seconds", "end to end"),
+    ("gemini_first_token_seconds", "gemini first token"),
+    ("tts_first_byte_seconds", "tts first byte"),
+)
+
+# --- Commentator Process ---
+class CommentatorProcess:
+    """
+    Runs main.py as a child process and collects its output line by line on a
+    background thread into a bounded scrollback, so the UI only ever reads
+    lines that are already there and never waits on the pipe.
+    """
+    def __init__(self, scrollback=UI_SCROLLBACK_LINES):
+        self.lines = deque(maxlen=scrollback)
+        # Lines received since the first start, including ones that left the scrollback.
+        self.received = 0
+        self._lock = threading.Lock()
+        self._process = None
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self, args=()):
+        """Starts main.py with the current .env. Does nothing if it is already running."""
+        if self.running:
+            return
+        # Values from a freshly written .env win over any stale copies in this process's environment.
+        env = dict(os.environ)
+        env.update({key: value for key, value in dotenv_values(ENV_PATH).items() if value is not None})
+        env.update(PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        self._process = subprocess.Popen(
+            [sys.executable, "-u", MAIN_PATH, *args],
+            cwd=BASE_DIR, env=env, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+        )
+        threading.Thread(target=self._read, args=(self._process,), name="commentator-output", daemon=True).start()
+
+    def stop(self, timeout=5.0):
+        """Asks main.py to exit and kills it if it is still running after timeout. Returns right away."""
+        process = self._process
+        if process is None or process.poll() is not None:
+            return
+
+        def run():
+            process.terminate()
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        threading.Thread(target=run, name="commentator-stop", daemon=True).start()
+
+    def _read(self, process):
+        for line in process.stdout:
+            self._append(line.rstrip("\r\n"))
+        process.stdout.close()
+        process.wait()
+        self._append(f"main.py exited with code {process.returncode}")
+
+    def _append(self, line):
+        with self._lock:
+            self.lines.append(line)
+            self.received += 1
+
+    def new_lines(self, seen, limit):
+        """
+        Returns up to limit lines received after the first seen ones, and the
+        new value of seen. Lines that already left the scrollback are skipped.
+        """
+        with self._lock:
+            start = max(seen, self.received - len(self.lines))
+            offset = start - (self.received - len(self.lines))
+            lines = list(itertools.islice(self.lines, offset, offset + limit))
+        return lines, start + len(lines)
+
+# --- Metrics ---
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def parse_metrics(text):
+    """{(name, ((label, value), ...)): value} from the Prometheus text format served by metrics.py."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        name, _, labels = series.partition("{")
+        try:
+            samples[(name, tuple(_LABEL.findall(labels)))] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+def _histograms(samples, name, group_by=None):
+    """{group label value: ([(le, cumulative count)], sum, count)} for one histogram."""
+    found = {}
+    for (sample, labels), value in samples.items():
+        if not sample.startswith(name + "_"):
+            continue
+        labels = dict(labels)
+        buckets, total, count = found.setdefault(labels.get(group_by, ""), ([], 0.0, 0.0))
+        if sample == name + "_bucket":
+            buckets.append((float(labels["le"]), value))
+        elif sample == name + "_sum":
+            found[labels.get(group_by, "")] = (buckets, value, count)
+        elif sample == name + "_count":
+            found[labels.get(group_by, "")] = (buckets, total, value)
+    return found
+
+def _quantile(buckets, q):
+    """Upper bound of the bucket holding the q-th quantile, like Prometheus' histogram_quantile."""
+    if not buckets or not buckets[-1][1]:
+        return None
+    target = q * buckets[-1][1]
+    for le, cumulative in buckets:
+        if cumulative >= target:
+            return le
+    return buckets[-1][0]
+
+def _latency(current, previous):
+    """(mean, p95, count) over the observations since previous, or over all of them when there are none."""
+    buckets, total, count = current
+    if previous is not None and count > previous[2]:
+        old = dict(previous[0])
+        buckets = [(le, cumulative - old.get(le, 0.0)) for le, cumulative in buckets]
+        total, count = total - previous[1], count - previous[2]
+    if not count:
+        return None
+    return total / count, _quantile(buckets, 0.95), int(count)
+
+def summarize(samples, previous=None):
+    """
+    The dashboard panels as text: latency per stage (mean and p95 since the
+    previous read), queue depths and TTS cache hits.
+    """
+    previous = previous or {}
+    latency = []
+    series = [(label or "?", values, _histograms(previous, "pipeline_stage_seconds", "stage").get(label))
+              for label, values in _histograms(samples, "pipeline_stage_seconds", "stage").items()]
+    for name, label in LATENCIES:
+        values = _histograms(samples, name).get("")
+        if values:
+            series.append((label, values, _histograms(previous, name).get("")))
+    for label, values, before in series:
+        stats = _latency(values, before)
+        if stats:
+            mean, p95, count = stats
+            p95 = "" if p95 is None else f", p95 ≤{p95:g}s"
+            latency.append(f"{label:<20} {mean:6.2f}s{p95} ({count})")
+
+    queues = [f"{dict(labels).get('queue', '?'):<10} {int(value)}"
+              for (name, labels), value in samples.items() if name == "pipeline_queue_depth"]
+    in_flight = samples.get(("pipeline_in_flight", ()))
+    if in_flight is not None:
+        queues.append(f"{'in flight':<10} {int(in_flight)}")
+
+    sources = {dict(labels).get("source"): value for (name, labels), value in samples.items() if name == "tts_requests_total"}
+    total = sum(sources.values())
+    cache = []
+    if total:
+        hits = sources.get("cache", 0)
+        cache.append(f"hit rate   {hits / total:.0%}")
+        cache += [f"{source:<10} {int(value)}" for source, value in sources.items()]
+
+    return {
+        "latency": "\n".join(latency) or "no lines spoken yet",
+        "queues": "\n".join(queues) or "pipeline idle",
+        "cache": "\n".join(cache) or "no speech yet",
+    }
+
+class MetricsPoller:
+    """
+    Reads the commentator's /metrics on a background thread every interval and
+    keeps the latest summary(). The UI picks it up when version changes.
+    """
+    def __init__(self, url=f"http://{METRICS_HOST}:{METRICS_PORT}/metrics", interval=UI_METRICS_INTERVAL):
+        self.url = url
+        self.interval = interval
+        self.summary = None
+        self.error = None
+        self.version = 0
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if not METRICS_PORT:
+            self.error = "metrics are off (METRICS_PORT=0)"
+            return
+        threading.Thread(target=self._run, name="metrics-poller", daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        previous = None
+        while not self._stop_event.wait(self.interval):
+            try:
+                with urllib.request.urlopen(self.url, timeout=self.interval) as response:
+                    samples = parse_metrics(response.read().decode("utf-8"))
+            except OSError as e:
+                # Expected while main.py is still starting up; keep the last summary.
+                self.error = f"waiting for metrics ({e})"
+                continue
+            self.summary = summarize(samples, previous)
+            self.error = None
+            self.version += 1
+            previous = samples
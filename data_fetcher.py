@@ -1,31 +1,102 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from api_client import lcu_request, live_request
+from config import HTTP_POOL_SIZE
+
+# Worker threads used to fetch several endpoints at once.
+_fetch_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="fetch")
 
 # --- Data Fetching Functions ---
 # These functions wrap the generic request functions to fetch specific game data.
-def get_current_summoner():
+# Each takes an optional LeagueClient; without one the default client from .env is used.
+def get_current_summoner(client=None):
     """Fetches the current summoner's data from the LCU API."""
-    return lcu_request("/lol-summoner/v1/current-summoner")
+    return lcu_request("/lol-summoner/v1/current-summoner", client)
 
-def get_gameflow_phase():
+def get_gameflow_phase(client=None):
     """Fetches the current phase of the game (e.g., 'ChampSelect', 'InProgress')."""
-    return lcu_request("/lol-gameflow/v1/gameflow-phase")
+    return lcu_request("/lol-gameflow/v1/gameflow-phase", client)
 
-def get_champselect_session():
+def get_champselect_session(client=None):
     """Fetches champion select session details."""
-    return lcu_request("/lol-champ-select/v1/session")
+    return lcu_request("/lol-champ-select/v1/session", client)
+
+def get_champion_summary(client=None):
+    """Fetches every champion's id and name from the LCU game data."""
+    return lcu_request("/lol-game-data/assets/v1/champion-summary.json", client)
 
-def get_active_player():
+def get_active_player(client=None):
     """Fetches detailed stats for the player currently being observed."""
-    return live_request("/liveclientdata/activeplayer")
+    return live_request("/liveclientdata/activeplayer", client)
 
-def get_player_list():
+def get_player_list(client=None):
     """Fetches a list of all players in the game with basic stats."""
-    return live_request("/liveclientdata/playerlist")
+    return live_request("/liveclientdata/playerlist", client)
 
-def get_game_stats():
+def get_game_stats(client=None):
     """Fetches general game statistics."""
-    return live_request("/liveclientdata/gamestats")
+    return live_request("/liveclientdata/gamestats", client)
+
+def get_event_data(event_id=None, client=None):
+    """
+    Fetches a list of in-game events (kills, objectives, etc.).
+    If event_id is given, only events with an EventID >= event_id are returned.
+    """
+    if event_id is None:
+        return live_request("/liveclientdata/eventdata", client)
+    return live_request(f"/liveclientdata/eventdata?eventID={event_id}", client)
+
+def get_all_game_data(client=None):
+    """Fetches the active player, all players, events and game stats in one request."""
+    return live_request("/liveclientdata/allgamedata", client)
+
+def fetch_parallel(endpoints, request=live_request, client=None):
+    """Fetches several endpoints concurrently and returns a dict of endpoint -> response."""
+    futures = {endpoint: _fetch_pool.submit(request, endpoint, client) for endpoint in endpoints}
+    return {endpoint: future.result() for endpoint, future in futures.items()}
+
+# --- Per-Tick Game Snapshot ---
+class GameSnapshot:
+    """One consistent view of the live game, shared by every consumer during a tick."""
+    def __init__(self, active_player, players, events, game_stats):
+        self.active_player = active_player if isinstance(active_player, dict) else {}
+        self.players = players if isinstance(players, list) else []
+        self.events = events if isinstance(events, list) else []
+        self.game_stats = game_stats if isinstance(game_stats, dict) else {}
+        self.taken_at = time.monotonic()
+
+    @property
+    def game_time(self):
+        """In-game clock in seconds, or 0 if unknown."""
+        return self.game_stats.get("gameTime", 0)
+
+    def __bool__(self):
+        return bool(self.players or self.active_player or self.game_stats)
+
+def get_game_snapshot(parallel=False, client=None):
+    """
+    Fetches a GameSnapshot for the current tick. By default this is a single
+    /liveclientdata/allgamedata request; with parallel=True the individual
+    endpoints are fetched concurrently instead.
+    """
+    if not parallel:
+        data = get_all_game_data(client)
+        return GameSnapshot(
+            data.get("activePlayer"),
+            data.get("allPlayers"),
+            data.get("events", {}).get("Events"),
+            data.get("gameData"),
+        )
 
-def get_event_data():
-    """Fetches a list of all in-game events (kills, objectives, etc.)."""
-    return live_request("/liveclientdata/eventdata")
\ No newline at end of file
+    data = fetch_parallel([
+        "/liveclientdata/activeplayer",
+        "/liveclientdata/playerlist",
+        "/liveclientdata/eventdata",
+        "/liveclientdata/gamestats",
+    ], client=client)
+    return GameSnapshot(
+        data["/liveclientdata/activeplayer"],
+        data["/liveclientdata/playerlist"],
+        data["/liveclientdata/eventdata"].get("Events"),
+        data["/liveclientdata/gamestats"],
+    )
\ No newline at end of file
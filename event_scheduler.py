@@ -0,0 +1,124 @@
+from config import EVENT_MAX_LAG, EVENT_MAX_LAG_CRITICAL, KILL_BURST_WINDOW
+
+# --- Event Priorities ---
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+PRIORITY_CRITICAL = 3
+
+EVENT_PRIORITIES = {
+    "BaronKill": PRIORITY_CRITICAL,
+    "DragonKill": PRIORITY_HIGH,
+    "HeraldKill": PRIORITY_HIGH,
+    "TurretKilled": PRIORITY_HIGH,
+    "InhibKilled": PRIORITY_HIGH,
+    "Ace": PRIORITY_HIGH,
+    "ChampionKill": PRIORITY_NORMAL,
+    "Multikill": PRIORITY_NORMAL,
+    "FirstBlood": PRIORITY_NORMAL,
+    "FirstBrick": PRIORITY_NORMAL,
+}
+
+MULTIKILL_NAMES = {2: "double kill", 3: "triple kill", 4: "quadra kill", 5: "penta kill"}
+
+def event_priority(event):
+    """Priority of a single event: Baron/Elder > Dragon/Turret > kill > spawn and the rest."""
+    if event.get("EventName") == "DragonKill" and event.get("DragonType") == "Elder":
+        return PRIORITY_CRITICAL
+    return event.get("Priority", EVENT_PRIORITIES.get(event.get("EventName"), PRIORITY_LOW))
+
+def _summary_event(name, events, summary, priority):
+    """Builds one event standing in for a group of merged events."""
+    last = max(events, key=lambda e: e.get("EventTime", 0))
+    return {
+        "EventName": name,
+        "EventID": max(e.get("EventID", 0) for e in events),
+        "EventTime": last.get("EventTime", 0),
+        "KillerName": last.get("KillerName") or last.get("Acer"),
+        "Summary": summary,
+        "Priority": priority,
+    }
+
+# --- Event Scheduler ---
+class EventScheduler:
+    """
+    Turns a batch of new events into prioritized groups: drops events that are
+    too far behind the game clock, collapses kill bursts into multikill, ace or
+    teamfight summaries, and orders the groups from most to least important.
+    """
+    def __init__(self, max_lag=EVENT_MAX_LAG, burst_window=KILL_BURST_WINDOW, max_lag_critical=EVENT_MAX_LAG_CRITICAL):
+        self.max_lag = max_lag
+        self.max_lag_critical = max_lag_critical
+        self.burst_window = burst_window
+        self.stats = {"scheduled": 0, "dropped_stale": 0, "coalesced": 0}
+
+    def plan(self, events, game_time=None):
+        """
+        Returns a list of (priority, events) groups, highest priority first.
+        game_time is the current in-game clock used to drop stale events.
+        """
+        fresh = [e for e in events if not self._is_stale(e, game_time)]
+        self.stats["dropped_stale"] += len(events) - len(fresh)
+        merged = self._coalesce(fresh)
+        self.stats["coalesced"] += len(fresh) - len(merged)
+        self.stats["scheduled"] += len(merged)
+
+        groups = {}
+        for e in merged:
+            groups.setdefault(event_priority(e), []).append(e)
+        return [
+            (priority, sorted(groups[priority], key=lambda e: e.get("EventTime", 0)))
+            for priority in sorted(groups, reverse=True)
+        ]
+
+    def _is_stale(self, event, game_time):
+        """Whether an event is too old to be worth narrating. Critical events are given longer."""
+        if game_time is None:
+            return False
+        max_lag = self.max_lag_critical if event_priority(event) >= PRIORITY_CRITICAL else self.max_lag
+        return game_time - event.get("EventTime", game_time) > max_lag
+
+    def _coalesce(self, events):
+        """Collapses kill bursts into single summary events."""
+        kills = [e for e in events if e.get("EventName") in ("ChampionKill", "Multikill", "Ace")]
+        if len(kills) < 2:
+            return events
+        others = [e for e in events if e not in kills]
+        champion_kills = [e for e in kills if e.get("EventName") == "ChampionKill"]
+        victims = ", ".join(e.get("VictimName", "?") for e in champion_kills)
+
+        # An ace ends the fight: narrate the whole burst as one line.
+        aces = [e for e in kills if e.get("EventName") == "Ace"]
+        if aces:
+            summary = f'Teamfight ends in an ace by {aces[-1].get("Acer", "?")} ({aces[-1].get("AcingTeam", "?")}). Down: {victims}.'
+            return others + [_summary_event("Ace", kills, summary, PRIORITY_HIGH)]
+
+        # Group kills per killer within the burst window.
+        bursts = []
+        for e in sorted(champion_kills, key=lambda e: e.get("EventTime", 0)):
+            for burst in bursts:
+                if burst[0].get("KillerName") == e.get("KillerName") and e.get("EventTime", 0) - burst[-1].get("EventTime", 0) <= self.burst_window:
+                    burst.append(e)
+                    break
+            else:
+                bursts.append([e])
+        multikillers = {burst[0].get("KillerName") for burst in bursts if len(burst) > 1}
+
+        merged = []
+        for burst in bursts:
+            if len(burst) == 1:
+                merged.append(burst[0])
+                continue
+            name = MULTIKILL_NAMES.get(len(burst), f"{len(burst)}-kill streak")
+            killed = ", ".join(e.get("VictimName", "?") for e in burst)
+            summary = f'{burst[0].get("KillerName", "?")} gets a {name} on {killed}!'
+            related = burst + [m for m in kills if m.get("EventName") == "Multikill" and m.get("KillerName") == burst[0].get("KillerName")]
+            merged.append(_summary_event("Multikill", related, summary, PRIORITY_NORMAL))
+        # Multikill events from the API are covered by the summaries above.
+        merged += [e for e in kills if e.get("EventName") == "Multikill" and e.get("KillerName") not in multikillers]
+
+        # Three or more separate kills at once are a teamfight.
+        if len(merged) >= 3:
+            lines = " ".join(e.get("Summary") or f'{e.get("KillerName", "?")} kills {e.get("VictimName", "?")}.' for e in merged)
+            return others + [_summary_event("Teamfight", kills, f"Teamfight! {lines}", PRIORITY_NORMAL)]
+        return others + merged
@@ -0,0 +1,199 @@
+import threading
+import time
+from config import FILLER_POOL_SIZE, FILLER_TTL
+
+# --- Filler Topics ---
+# Lane order used to pair up opponents for matchup notes.
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+def _player_label(player):
+    name = player.get("riotIdGameName") or player.get("summonerName", "Unknown Summoner")
+    return f"{name} ({player.get('championName', 'Unknown Champion')})"
+
+def _items(player):
+    return tuple(item.get("displayName", "?") for item in player.get("items", []))
+
+def filler_topics(snapshot=None, teams_info=None):
+    """
+    What could be talked about right now, as {key: (facts, prompt)}. facts is
+    the part of the game state a line on that topic depends on: once it
+    changes, lines written about it are out of date.
+    """
+    topics = {}
+
+    # Roster intros from champ select, before the game has loaded. Only once every pick has a name:
+    # Gemini can't tell champions apart by id.
+    for side in ("myTeam", "theirTeam"):
+        members = (teams_info or {}).get(side, [])
+        if not all(m.get("championName") for m in members):
+            continue
+        picks = tuple(sorted((m.get("assignedPosition") or "", m["championName"]) for m in members))
+        if picks:
+            lines = ", ".join(f"{position.lower() or 'flex'}: {champion}" for position, champion in picks)
+            topics[f"champselect:{side}"] = (picks, f"Champ select is locked in. Introduce this team's picks ({lines}) in one or two lines.")
+
+    players = snapshot.players if snapshot else []
+    teams = {}
+    for player in players:
+        teams.setdefault(player.get("team", "?"), []).append(player)
+
+    # Roster intros for each team in the game.
+    for team, members in teams.items():
+        facts = tuple(sorted(_player_label(p) for p in members))
+        topics[f"roster:{team}"] = (facts, f"Introduce team {team}: {', '.join(facts)}. Keep it to two sentences.")
+
+    # Lane matchup notes, from the current level and score of both players.
+    by_position = {}
+    for player in players:
+        by_position.setdefault(player.get("position"), []).append(player)
+    for position in POSITIONS:
+        pair = by_position.get(position, [])
+        if len(pair) != 2:
+            continue
+        facts = tuple((_player_label(p), p.get("level", 0), tuple(p.get("scores", {}).get(k, 0) for k in ("kills", "deaths", "assists"))) for p in pair)
+        summary = " versus ".join(f"{label} at level {level}, {k}/{d}/{a}" for label, level, (k, d, a) in facts)
+        topics[f"matchup:{position}"] = (facts, f"Quiet moment. Give a short note on the {position.lower()} matchup: {summary}.")
+
+    # Build observations, for players who have finished at least two items.
+    for player in players:
+        items = _items(player)
+        if len(items) >= 2:
+            label = _player_label(player)
+            topics[f"build:{label}"] = (items, f"Quiet moment. Comment briefly on the build of {label}: {', '.join(items)}.")
+    return topics
+
+# --- Filler Pool ---
+class FillerLine:
+    """A pre-synthesized filler line and the facts it was written from."""
+    __slots__ = ("key", "facts", "prompt", "text", "audio", "expires_at")
+
+    def __init__(self, key, facts, prompt, text, audio, ttl):
+        self.key = key
+        self.facts = facts
+        self.prompt = prompt
+        self.text = text
+        self.audio = audio
+        self.expires_at = time.monotonic() + ttl
+
+class FillerPool:
+    """
+    Uses quiet stretches to write and synthesize a few filler lines ahead of
+    time: roster intros, lane matchups and builds from the latest snapshot.
+    A line is thrown away once it expires or the facts it mentions change,
+    so an idle gap can be filled at once with a line that is still true.
+
+    The commentator should be a separate instance from the one narrating
+    events, so unspoken lines never enter that conversation.
+    """
+    def __init__(self, commentator, synthesize, size=FILLER_POOL_SIZE, ttl=FILLER_TTL):
+        self.commentator = commentator
+        self.synthesize = synthesize
+        self.size = size
+        self.ttl = ttl
+        self.stats = {"generated": 0, "used": 0, "expired": 0}
+        self._lines = []
+        self._topics = {}
+        self._next_topic = 0
+        self._cond = threading.Condition()
+        self._quiet = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="filler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def set_quiet(self, quiet):
+        """Tells the pool whether nothing else needs Gemini and ElevenLabs right now."""
+        with self._cond:
+            self._quiet = quiet
+            if quiet:
+                self._cond.notify_all()
+
+    def update(self, snapshot=None, teams_info=None):
+        """Refreshes the topics from the latest state and drops lines that are no longer true."""
+        topics = filler_topics(snapshot, teams_info)
+        with self._cond:
+            self._topics = topics
+            self._prune()
+            self._cond.notify_all()
+
+    def take(self):
+        """Returns the oldest filler line that is still valid, or None."""
+        with self._cond:
+            self._prune()
+            if not self._lines:
+                return None
+            self.stats["used"] += 1
+            line = self._lines.pop(0)
+            self._cond.notify_all()
+            return line
+
+    def clear(self):
+        """Forgets every line and topic, e.g. when a game ends."""
+        with self._cond:
+            self._lines = []
+            self._topics = {}
+
+    def _prune(self):
+        """Drops expired lines and lines whose facts changed. Caller holds the lock."""
+        now = time.monotonic()
+        fresh = [
+            line for line in self._lines
+            if line.expires_at > now and self._topics.get(line.key, (None,))[0] == line.facts
+        ]
+        self.stats["expired"] += len(self._lines) - len(fresh)
+        self._lines = fresh
+
+    def _pick_topic(self):
+        """Next topic without a line in the pool, in rotation. Caller holds the lock."""
+        covered = {line.key for line in self._lines}
+        keys = [key for key in self._topics if key not in covered]
+        if not keys:
+            return None
+        self._next_topic = (self._next_topic + 1) % len(keys)
+        key = keys[self._next_topic]
+        return key, self._topics[key]
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                topic = None
+                if self._quiet and len(self._lines) < self.size:
+                    topic = self._pick_topic()
+                if topic is None:
+                    self._cond.wait(1.0)
+                    continue
+            key, (facts, prompt) = topic
+            try:
+                line = self._generate(key, facts, prompt)
+            except Exception as e:
+                print(f"Filler generation failed: {e}")
+                line = None
+            if line is None:
+                # Back off instead of retrying a failing backend in a loop.
+                self._stop_event.wait(5.0)
+                continue
+            with self._cond:
+                # The state may have moved on while the line was being written.
+                if self._topics.get(key, (None,))[0] == facts:
+                    self._lines.append(line)
+                    self.stats["generated"] += 1
+
+    def _generate(self, key, facts, prompt):
+        text = self.commentator.get_caption_from_gemini(prompt, fallback="")
+        if not text:
+            return None
+        audio = self.synthesize(text)
+        if audio is None:
+            return None
+        # Wait for the whole clip so playing it later needs no network at all.
+        audio.wait()
+        return FillerLine(key, facts, prompt, text, audio, self.ttl)
@@ -0,0 +1,111 @@
+from config import GOLD_SWING_THRESHOLD, HEALTH_DROP_THRESHOLD
+from utils import process_player_data, process_active_player_data
+
+# --- Compact Game State ---
+class PlayerState:
+    """The handful of per-player numbers the diff engine looks at."""
+    __slots__ = ("name", "champion", "team", "level", "kills", "deaths", "assists", "item_gold")
+
+    def __init__(self, player):
+        scores = player.get("scores", {})
+        self.name = player.get("riotIdGameName") or player.get("summonerName", "Unknown Summoner")
+        self.champion = player.get("championName", "Unknown Champion")
+        self.team = player.get("team", "Unknown Team")
+        self.level = player.get("level", 0)
+        self.kills = scores.get("kills", 0)
+        self.deaths = scores.get("deaths", 0)
+        self.assists = scores.get("assists", 0)
+        # The Live Client API only exposes gold for the active player, so item value stands in for everyone.
+        self.item_gold = sum(item.get("price", 0) * item.get("count", 1) for item in player.get("items", []))
+
+    @property
+    def label(self):
+        return f"{self.name} ({self.champion})"
+
+class GameState:
+    """Compact per-tick view of the game built from a GameSnapshot."""
+    __slots__ = ("game_time", "players", "active_name", "active_health", "active_max_health")
+
+    def __init__(self, snapshot):
+        self.game_time = snapshot.game_time
+        self.players = {p.name: p for p in (PlayerState(player) for player in snapshot.players)}
+        active = snapshot.active_player
+        stats = active.get("championStats", {})
+        self.active_name = active.get("riotIdGameName") or active.get("summonerName")
+        self.active_health = stats.get("currentHealth", 0)
+        self.active_max_health = stats.get("maxHealth", 0)
+
+    def team_item_gold(self):
+        """Total item value per team."""
+        totals = {}
+        for p in self.players.values():
+            totals[p.team] = totals.get(p.team, 0) + p.item_gold
+        return totals
+
+def _team_lead(totals):
+    """Returns (leading team, lead) for a two-team gold total, or (None, 0)."""
+    if len(totals) != 2:
+        return None, 0
+    (team_a, gold_a), (team_b, gold_b) = sorted(totals.items())
+    return (team_a, gold_a - gold_b) if gold_a >= gold_b else (team_b, gold_b - gold_a)
+
+# --- Diff Engine ---
+def diff_states(prev, cur, gold_swing=GOLD_SWING_THRESHOLD, health_drop=HEALTH_DROP_THRESHOLD):
+    """
+    Lists what changed between two GameStates: KDA changes, level-ups,
+    item gold and team gold swings, and big health drops of the active player.
+    Returns an empty list when nothing worth talking about happened.
+    """
+    deltas = []
+    for name, p in cur.players.items():
+        old = prev.players.get(name)
+        if old is None:
+            continue
+        if (p.kills, p.deaths, p.assists) != (old.kills, old.deaths, old.assists):
+            deltas.append(f"{p.label} went from {old.kills}/{old.deaths}/{old.assists} to {p.kills}/{p.deaths}/{p.assists}.")
+        if p.level > old.level:
+            deltas.append(f"{p.label} reached level {p.level}.")
+        if p.item_gold - old.item_gold >= gold_swing:
+            deltas.append(f"{p.label} completed {p.item_gold - old.item_gold} gold worth of items.")
+
+    old_team, old_lead = _team_lead(prev.team_item_gold())
+    new_team, new_lead = _team_lead(cur.team_item_gold())
+    old_signed = old_lead if old_team == new_team else -old_lead
+    if new_team and abs(new_lead - old_signed) >= gold_swing:
+        deltas.append(f"Team {new_team} now leads by {new_lead} gold in items (was {old_signed:+d}).")
+
+    if cur.active_name == prev.active_name and cur.active_max_health:
+        drop = (prev.active_health - cur.active_health) / cur.active_max_health
+        if drop >= health_drop:
+            percent = int(100 * cur.active_health / cur.active_max_health)
+            deltas.append(f"{cur.active_name} just dropped to {percent}% health.")
+    return deltas
+
+class DeltaTracker:
+    """
+    Remembers the game state at the last idle commentary and turns each new
+    snapshot into a short list of changes since then.
+    """
+    def __init__(self):
+        self.last_state = None
+
+    def update(self, snapshot):
+        """
+        Returns the text to send to the LLM for this snapshot, or an empty
+        string when nothing changed. The first snapshot gets the full roster.
+        """
+        if not snapshot:
+            return ""
+        state = GameState(snapshot)
+        if self.last_state is None:
+            text = process_player_data(snapshot.players) + "\n" + process_active_player_data(snapshot.active_player)
+        else:
+            text = "\n".join(diff_states(self.last_state, state))
+        # Only move the baseline when something is said, so small changes add up.
+        if text.strip():
+            self.last_state = state
+        return text.strip()
+
+    def reset(self):
+        """Forgets the baseline, e.g. when a new game starts."""
+        self.last_state = None
@@ -0,0 +1,94 @@
+import base64
+import json
+import ssl
+import threading
+import websocket
+from api_client import get_default_client
+
+# WAMP message types used by the LCU WebSocket.
+WAMP_SUBSCRIBE = 5
+WAMP_EVENT = 8
+
+GAMEFLOW_PHASE_EVENT = "OnJsonApiEvent_lol-gameflow_v1_gameflow-phase"
+CHAMP_SELECT_EVENT = "OnJsonApiEvent_lol-champ-select_v1_session"
+
+# --- LCU WebSocket Subscription ---
+class LCUEventListener:
+    """
+    Listens for gameflow-phase and champ-select changes pushed by the LCU
+    WebSocket, so they don't have to be polled. Reconnects until stopped.
+    The address and password come from client unless url and password are given.
+    """
+    def __init__(self, client=None, url=None, password=None, on_phase=None, on_champ_select=None, reconnect_delay=2.0):
+        client = client or get_default_client()
+        self.url = url or client.lcu_websocket_url()
+        self.password = password or client.password
+        self.on_phase = on_phase
+        self.on_champ_select = on_champ_select
+        self.reconnect_delay = reconnect_delay
+        # Latest pushed values; None until the first update arrives.
+        self.phase = None
+        self.champ_select_session = None
+        self.connected = False
+        self._ws = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Connects in a background thread. Does nothing if the LCU address is unknown."""
+        if not self.url or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="lcu-websocket", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Closes the connection and stops reconnecting."""
+        self._stop_event.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def _run(self):
+        """Keeps a connection open, reconnecting after errors until stopped."""
+        token = base64.b64encode(f"riot:{self.password}".encode()).decode()
+        while not self._stop_event.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                header=[f"Authorization: Basic {token}"],
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_close=self._on_close,
+                on_error=lambda ws, e: print(f"LCU WebSocket error: {e}"),
+            )
+            # The LCU uses a self-signed certificate.
+            self._ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+            self.connected = False
+            self._stop_event.wait(self.reconnect_delay)
+
+    def _on_open(self, ws):
+        self.connected = True
+        for event in (GAMEFLOW_PHASE_EVENT, CHAMP_SELECT_EVENT):
+            ws.send(json.dumps([WAMP_SUBSCRIBE, event]))
+
+    def _on_close(self, ws, status_code, message):
+        self.connected = False
+
+    def _on_message(self, ws, message):
+        """Dispatches a pushed event to the matching handler."""
+        try:
+            msg_type, event, payload = json.loads(message)
+        except (ValueError, TypeError):
+            return
+        if msg_type != WAMP_EVENT:
+            return
+        data = payload.get("data")
+        if event == GAMEFLOW_PHASE_EVENT:
+            self.phase = data
+            if self.on_phase:
+                self.on_phase(data)
+        elif event == CHAMP_SELECT_EVENT:
+            # The session is deleted when champ select ends; keep the last full one.
+            if payload.get("eventType") == "Delete":
+                return
+            self.champ_select_session = data
+            if self.on_champ_select:
+                self.on_champ_select(data)
@@ -1,12 +1,53 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_LLM_MODEL
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from config import GEMINI_API_KEY, GEMINI_LLM_MODEL, GEMINI_DEADLINES, GEMINI_STREAM_IDLE_TIMEOUT
+from chat_history import ChatHistory
+from rate_limit import gemini_limiter
+from metrics import GEMINI_FIRST_TOKEN_SECONDS, GEMINI_RESPONSE_SECONDS, GEMINI_PROMPT_TOKENS, GEMINI_ERRORS, GEMINI_FALLBACKS
+
+FALLBACK_CAPTION = "Our commentator seems to be having a technical issue. Please stand by."
+
+# A sentence ends with ., ! or ? followed by whitespace.
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Sentences shorter than this are merged with the next one so TTS isn't called for a single word.
+MIN_SENTENCE_CHARS = 20
+
+def split_sentences(buffer):
+    """
+    Splits streamed text into complete sentences and the unfinished remainder.
+    Returns (sentences, remainder).
+    """
+    parts = SENTENCE_END.split(buffer)
+    remainder = parts.pop()
+    sentences = []
+    pending = ""
+    for part in parts:
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= MIN_SENTENCE_CHARS:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        remainder = f"{pending} {remainder}".strip()
+    return sentences, remainder
+
+def _until(started, deadline):
+    """The time.monotonic() value at which a deadline counted from started runs out, or None."""
+    return None if deadline is None else started + deadline
+
+def caption_deadline(priority):
+    """Seconds Gemini gets to answer for a job of this priority, or None for no deadline."""
+    if not GEMINI_DEADLINES:
+        return None
+    deadline = GEMINI_DEADLINES[max(0, min(priority, len(GEMINI_DEADLINES) - 1))]
+    return deadline if deadline > 0 else None
 
 # --- AI Commentator Class (Gemini) ---
 class LeagueCommentator:
     """Handles communication with the Gemini LLM for generating commentary."""
     def __init__(self):
-        # Configure the Gemini API with the provided key.
-        genai.configure(api_key=GEMINI_API_KEY)
         # Define the personality and role of the commentator.
         self.system_prompt = """
             You are a professional League of Legends esports commentator. 
@@ -15,23 +56,181 @@ class LeagueCommentator:
             Keep your commentary concise and impactful. Do not state that you are an AI model.
             Don't use any special caracters like *
         """
-        # Initialize the model with the specified system prompt.
-        self.model = genai.GenerativeModel(
-            model_name=GEMINI_LLM_MODEL,
-            system_instruction=self.system_prompt
-        )
-        # Start a chat session to maintain conversation history.
-        self.chat = self.model.start_chat()
+        # The Gemini model is set up on first use (or by warm_up), so construction is instant.
+        self._model = None
+        self._model_lock = threading.Lock()
+        # Keep a bounded conversation history so prompt size stays flat over a long game.
+        self.history = ChatHistory()
+        # Gemini calls run on these threads, so the caller can stop waiting at a deadline.
+        # A call that missed its deadline keeps its thread until Gemini answers.
+        self._calls = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini")
+        # Captions written by Gemini, and captions it missed its deadline for or failed on.
+        self.stats = {"answered": 0, "deadline": 0, "error": 0}
+
+    @property
+    def model(self):
+        """The Gemini model, configured with the system prompt on first access."""
+        with self._model_lock:
+            if self._model is None:
+                import google.generativeai as genai
+                # Configure the Gemini API with the provided key.
+                genai.configure(api_key=GEMINI_API_KEY)
+                self._model = genai.GenerativeModel(
+                    model_name=GEMINI_LLM_MODEL,
+                    system_instruction=self.system_prompt
+                )
+            return self._model
 
-    def get_caption_from_gemini(self, event_or_context_text):
+    def warm_up(self):
+        """Loads the Gemini SDK and opens its connection with a token count, which costs no generation."""
+        try:
+            self.model.count_tokens("warm up")
+        except Exception as e:
+            print(f"Gemini warm-up failed: {e}")
+
+    @property
+    def prompt_size(self):
+        """Estimated size in tokens of the last prompt sent to Gemini."""
+        return self.history.prompt_size
+
+    def build_prompt(self, event_or_context_text):
+        """Wraps event or context text in the commentary instructions."""
+        return f"The following events just happened in the game:\n{event_or_context_text}\n\nProvide commentary based only on the major events, make it brief."
+
+    def get_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
         """
         Sends event or context text to the Gemini model to get commentary.
+        If Gemini fails or hasn't answered within deadline seconds, fallback is
+        returned instead ("" to say nothing, None for the stand-by line) and
+        a late reply is discarded.
         """
-        user_prompt = f"The following events just happened in the game:\n{event_or_context_text}\n\nProvide commentary based only on the major events, make it brief."
+        user_prompt = self.build_prompt(event_or_context_text)
+        if deadline is not None and deadline <= 0:
+            return self._fall_back(user_prompt, fallback, "deadline")
+        started = time.monotonic()
+        contents = self.history.contents(user_prompt)
+        GEMINI_PROMPT_TOKENS.observe(self.prompt_size)
+        call = self._calls.submit(self._generate, contents, self.prompt_size, started, _until(started, deadline))
         try:
-            # Send the user message to the chat session
-            response = self.chat.send_message(user_prompt)
-            return response.text
+            text = call.result(timeout=deadline)
+        except FutureTimeout:
+            print(f"Gemini missed its {deadline:.1f}s deadline.")
+            return self._fall_back(user_prompt, fallback, "deadline")
         except Exception as e:
+            GEMINI_ERRORS.inc()
             print(f"API call failed: {e}")
-            return "Our commentator seems to be having a technical issue. Please stand by."
\ No newline at end of file
+            return self._fall_back(user_prompt, fallback, "error")
+        self.stats["answered"] += 1
+        self.history.add_turn(user_prompt, text)
+        return text
+
+    def _generate(self, contents, tokens, started, until):
+        """Runs a blocking Gemini call on a worker thread, within the shared rate limits."""
+        response = gemini_limiter.call(self.model.generate_content, contents, units=tokens, deadline=until)
+        GEMINI_RESPONSE_SECONDS.observe(time.monotonic() - started, mode="blocking")
+        return response.text
+
+    def stream_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
+        """
+        Streams commentary from the Gemini model and yields it one sentence at a time,
+        as soon as each sentence is complete. The full reply is added to the chat history.
+        If the first sentence isn't ready within deadline seconds, or Gemini fails
+        before it, fallback is yielded instead and the rest of the reply is discarded.
+        A reply that stalls or fails later ends early, and the history keeps what was said.
+        """
+        user_prompt = self.build_prompt(event_or_context_text)
+        if deadline is not None and deadline <= 0:
+            caption = self._fall_back(user_prompt, fallback, "deadline")
+            if caption:
+                yield caption
+            return
+        started = time.monotonic()
+        contents = self.history.contents(user_prompt)
+        GEMINI_PROMPT_TOKENS.observe(self.prompt_size)
+        sentences = queue.Queue()
+        abandoned = threading.Event()
+        self._calls.submit(self._stream_into, contents, self.prompt_size, started, _until(started, deadline), sentences, abandoned)
+        # Sentences already yielded, kept for the history if the reply breaks off.
+        spoken = []
+        while True:
+            # Waits at most GEMINI_STREAM_IDLE_TIMEOUT for each sentence, and the deadline for the first.
+            timeout = GEMINI_STREAM_IDLE_TIMEOUT
+            if not spoken and deadline is not None:
+                timeout = max(0.0, started + deadline - time.monotonic())
+            try:
+                kind, value = sentences.get(timeout=timeout)
+            except queue.Empty:
+                abandoned.set()
+                if spoken:
+                    print(f"Gemini stream stalled for {timeout:.1f}s, cutting the reply short.")
+                    GEMINI_ERRORS.inc()
+                    self.stats["error"] += 1
+                    self.history.add_turn(user_prompt, " ".join(spoken))
+                    return
+                print(f"Gemini missed its {timeout:.1f}s deadline.")
+                caption = self._fall_back(user_prompt, fallback, "deadline")
+                if caption:
+                    yield caption
+                return
+            if kind == "sentence":
+                spoken.append(value)
+                yield value
+            elif kind == "done":
+                self.stats["answered"] += 1
+                self.history.add_turn(user_prompt, value)
+                return
+            else:
+                GEMINI_ERRORS.inc()
+                print(f"API call failed: {value}")
+                if spoken:
+                    # What was already said stays in the conversation.
+                    self.stats["error"] += 1
+                    self.history.add_turn(user_prompt, " ".join(spoken))
+                else:
+                    caption = self._fall_back(user_prompt, fallback, "error")
+                    if caption:
+                        yield caption
+                return
+
+    def _stream_into(self, contents, tokens, started, until, sentences, abandoned):
+        """
+        Runs a streamed Gemini call on a worker thread, within the shared rate
+        limits, putting ("sentence", text) items on the queue, then ("done", full
+        text) or ("error", exception). Stops reading once the caller has given
+        up on the reply.
+        """
+        response = gemini_limiter.stream(
+            lambda: self.model.generate_content(contents, stream=True), units=tokens, deadline=until)
+        try:
+            buffer = ""
+            full_text = ""
+            for chunk in response:
+                if abandoned.is_set():
+                    response.close()
+                    return
+                if not full_text:
+                    GEMINI_FIRST_TOKEN_SECONDS.observe(time.monotonic() - started)
+                buffer += chunk.text
+                full_text += chunk.text
+                done, buffer = split_sentences(buffer)
+                for sentence in done:
+                    sentences.put(("sentence", sentence))
+            if buffer.strip():
+                sentences.put(("sentence", buffer.strip()))
+            GEMINI_RESPONSE_SECONDS.observe(time.monotonic() - started, mode="stream")
+            sentences.put(("done", full_text))
+        except Exception as e:
+            sentences.put(("error", e))
+
+    def _fall_back(self, user_prompt, fallback, reason):
+        """
+        Counts a caption Gemini didn't write and returns what to say instead.
+        A local caption is added to the history, so the next reply knows it was said.
+        """
+        GEMINI_FALLBACKS.inc(reason=reason)
+        self.stats[reason] += 1
+        if fallback is None:
+            return FALLBACK_CAPTION
+        if fallback:
+            self.history.add_turn(user_prompt, fallback)
+        return fallback
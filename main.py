@@ -1,67 +1,226 @@
-from data_fetcher import get_gameflow_phase, get_player_list, get_active_player
-from llm_commentator import LeagueCommentator
-from audio_player import get_audio_from_elevenlabs
-from utils import LoLContext, event_to_text, process_player_data, process_active_player_data
+import argparse
+import threading
+import time
+# Startup reference for time-to-first-poll and time-to-first-audio.
+STARTED_AT = time.monotonic()
+from concurrent.futures import ThreadPoolExecutor
+import api_client
+from config import USE_LCU_WEBSOCKET
+from data_fetcher import get_gameflow_phase, get_game_snapshot, get_game_stats
+from llm_commentator import LeagueCommentator, FALLBACK_CAPTION, caption_deadline
+from audio_player import (
+    get_audio_from_elevenlabs, synthesize_audio, queue_audio, play_audio, warm_audio_cache, warm_tts_connection, audio_engine,
+)
+from filler import FillerPool
+from pipeline import CommentaryPipeline
+from poll_scheduler import PollScheduler
+from template_captions import TemplateCaptioner, stock_lines
+from event_scheduler import EventScheduler, PRIORITY_LOW, PRIORITY_NORMAL
+from game_state import DeltaTracker
+from metrics import start_metrics_server, record_startup
+from utils import LoLContext, event_to_text
 
-# --- Main Program Loop ---
+INTRO = "Welcome, everyone, to the ultimate battleground where legends are made! I'm your host, bringing you the fastest plays and sharpest calls from today's high-stakes tournament. Get ready for insane strategies and jaw-dropping action as our top contenders prove they're the best in the game."
+
+def _timed(task):
+    """Runs task and returns how long it took, or the error it raised."""
+    started = time.monotonic()
+    try:
+        task()
+    except Exception as e:
+        return f"failed ({e})"
+    return f"{time.monotonic() - started:.2f}s"
+
+def warm_up(commentator, client, broadcast=False):
+    """
+    Opens the audio device, loads Gemini, connects to ElevenLabs and the local
+    APIs all at once in the background, then fills the TTS cache with stock
+    lines. Polling and the intro start right away instead of waiting for it.
+    The intro is cached the first time it plays. A broadcast never uses the
+    speakers, so it leaves the audio device closed.
+    """
+    tasks = {
+        "Gemini": commentator.warm_up,
+        "ElevenLabs": warm_tts_connection,
+        "local APIs": client.warm_up,
+    }
+    if not broadcast:
+        tasks = {"audio device": audio_engine.start, **tasks}
+
+    def run():
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warm-up") as pool:
+            timings = dict(zip(tasks, pool.map(_timed, tasks.values())))
+        details = ", ".join(f"{name} {timing}" for name, timing in timings.items())
+        print(f"🔥 Warm-up finished in {time.monotonic() - started:.2f}s: {details}")
+        warm_audio_cache([FALLBACK_CAPTION] + stock_lines())
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+
+# --- Pipelined Mode (default) ---
+def run_pipeline(broadcast=False):
+    """
+    Runs polling, captioning, synthesis and playback concurrently so that new
+    commentary is prepared while the previous line is still being spoken.
+    With broadcast, lines go to the local broadcast server instead of the speakers.
+    """
+    play = queue_audio
+    if broadcast:
+        from broadcast import Broadcaster
+        broadcaster = Broadcaster()
+        broadcaster.start()
+        play = broadcaster.play
+
+    commentator = LeagueCommentator()
+    warm_up(commentator, api_client.get_default_client(), broadcast=broadcast)
+    listener = None
+    if USE_LCU_WEBSOCKET:
+        from lcu_events import LCUEventListener
+        listener = LCUEventListener()
+        listener.start()
+
+    pipeline = CommentaryPipeline(
+        commentator=commentator,
+        synthesize=synthesize_audio,
+        play=play,
+        intro=INTRO,
+        listener=listener,
+        started_at=STARTED_AT,
+        # Filler gets its own commentator so lines that are never spoken stay out of the conversation.
+        filler=FillerPool(LeagueCommentator(), synthesize_audio),
+    )
+    pipeline.run()
+
+def report_first_audio(stream):
+    """Reports how long after startup the given clip started playing."""
+    if stream.playback_started_at is not None:
+        record_startup("first_audio", stream.playback_started_at - STARTED_AT)
+
+# --- Serial Program Loop ---
 def main_loop():
     """
-    The main control loop that fetches game data and provides commentary.
+    The serial control loop that fetches game data and provides commentary one step at a time.
     """
-    is_first_run = True
-    ctx = LoLContext()
     # Instantiate the LeagueCommentator to handle all LLM interactions.
     lolCommentator = LeagueCommentator()
+    warm_up(lolCommentator, api_client.get_default_client())
+    filler = FillerPool(LeagueCommentator(), synthesize_audio)
+    filler.start()
+    is_first_run = True
+    last_phase = None
+    scheduler = PollScheduler()
+    deltas = DeltaTracker()
+    # Created with the first in-game snapshot, so NumPy is only loaded once a game is on.
+    timeline = None
+    templates = TemplateCaptioner()
+    event_scheduler = EventScheduler()
+    ctx = LoLContext()
     while True:
-        # Handle the initial welcome message on the first run.
+        # Handle the initial welcome message on the first run, without waiting for it to finish.
         if is_first_run:
-            is_first_run = False
-            intro = "Welcome, everyone, to the ultimate battleground where legends are made! I'm your host, bringing you the fastest plays and sharpest calls from today's high-stakes tournament. Get ready for insane strategies and jaw-dropping action as our top contenders prove they're the best in the game."
-            print(intro)
-            get_audio_from_elevenlabs(intro)
+            print(INTRO)
+            intro = synthesize_audio(INTRO)
+            playback = queue_audio(intro)
+            if playback is not None:
+                playback.add_done_callback(lambda f: report_first_audio(intro))
         
         # Get the current game phase.
         phase = get_gameflow_phase()
+        if is_first_run:
+            is_first_run = False
+            record_startup("first_poll", time.monotonic() - STARTED_AT)
+        had_activity = False
+
+        # Leaving a game means the next one starts with fresh event IDs and a new champ select.
+        if isinstance(phase, str):
+            if last_phase == "InProgress" and phase != "InProgress":
+                ctx.reset_game()
+                lolCommentator.history.reset()
+                deltas.reset()
+                if timeline is not None:
+                    timeline.reset()
+                filler.clear()
+            last_phase = phase
         
         # 1. Pregame: Champion Select
         if phase in ["Lobby", "Matchmaking", "ChampSelect"] and not ctx.champ_select_done:
             ctx.update_champ_select()
             if ctx.champ_select_done:
                 text = "Champ select is done. Teams and bans are set."
-                caption = lolCommentator.get_caption_from_gemini(text)
+                caption = lolCommentator.get_caption_from_gemini(text, deadline=caption_deadline(PRIORITY_NORMAL), fallback=text)
                 print(caption)
                 get_audio_from_elevenlabs(caption)
         
         # 2. In-game: Fetching Events and Player Data
         if phase == "InProgress":
-            context = ""
             new_events = ctx.get_new_events()
             
-            # If there are new major events, generate commentary on them.
+            # If there are new major events, generate commentary on them, most important first.
             if new_events:
-                for e in new_events:
-                    text = event_to_text(e)
-                    context = context + text + "\n"
-                
-                caption = lolCommentator.get_caption_from_gemini(context)
-                print(caption)
-                get_audio_from_elevenlabs(caption)
+                had_activity = True
+                filler.set_quiet(False)
+                for priority, events in event_scheduler.plan(new_events, get_game_stats().get("gameTime")):
+                    # Routine batches are captioned from templates; the rest go to Gemini.
+                    caption = templates.route(events)
+                    if not caption:
+                        context = ""
+                        for e in events:
+                            text = event_to_text(e)
+                            context = context + text + "\n"
+                        
+                        # A slow Gemini reply is replaced by a caption built from the events.
+                        caption = lolCommentator.get_caption_from_gemini(
+                            context, deadline=caption_deadline(priority), fallback=templates.fallback(events))
+                    print(caption)
+                    get_audio_from_elevenlabs(caption)
             
-            # If there are no new events, provide a general update based on player data.
+            # If there are no new events, play a ready filler line, or comment on what changed since the last general update.
             else: 
-                # Fetch player data and active player stats.
-                commentary_string_from_player_list = process_player_data(get_player_list())
-                commentary_string_from_active_data = process_active_player_data(get_active_player())
+                snapshot = get_game_snapshot()
+                if timeline is None:
+                    from timeline import GameTimeline
+                    timeline = GameTimeline()
+                timeline.append(snapshot)
+                filler.update(snapshot, ctx.teams_info)
+                line = filler.take()
+                # Changes are only taken when they can be narrated, so those during filler carry over.
+                changes = None if line else deltas.update(snapshot)
                 
-                # Combine the data and send it to the LLM for general commentary.
-                caption = lolCommentator.get_caption_from_gemini(commentary_string_from_player_list + "\n" + commentary_string_from_active_data)
-                print(caption)
-                get_audio_from_elevenlabs(caption)
+                if line:
+                    print(line.text)
+                    lolCommentator.history.add_turn(line.prompt, line.text)
+                    play_audio(line.audio)
+                # Skip the LLM entirely when nothing changed.
+                elif changes:
+                    # Better to stay quiet than to be late with idle commentary.
+                    # Trends from the timeline give the changes some context.
+                    prompt = "\n".join(part for part in (changes, timeline.context()) if part)
+                    caption = lolCommentator.get_caption_from_gemini(prompt, deadline=caption_deadline(PRIORITY_LOW), fallback="")
+                    if caption:
+                        print(caption)
+                        get_audio_from_elevenlabs(caption)
         
-        # Wait for the next poll interval.
-        # time.sleep(int(POLL_INTERVAL))
+        # Filler is prepared in the background while nothing else is being said.
+        filler.set_quiet(not had_activity)
+
+        # Wait for the next poll, backing off while nothing happens or the client is unreachable.
+        reachable = api_client.get_default_client().reachable["live" if phase == "InProgress" else "lcu"]
+        time.sleep(scheduler.next_delay(had_activity, reachable))
 
 # --- Program Entry Point ---
-if __name__ == '__main__':
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI League of Legends commentator")
+    parser.add_argument("--serial", action="store_true", help="run the original one-step-at-a-time loop")
+    parser.add_argument("--broadcast", action="store_true",
+                        help="stream audio and captions to local HTTP clients (e.g. OBS) instead of the speakers")
+    args = parser.parse_args(argv)
+
     print("🚀 Starting AI commentator...")
-    main_loop()
\ No newline at end of file
+    start_metrics_server()
+    if args.serial:
+        main_loop()
+    else:
+        run_pipeline(broadcast=args.broadcast)
+
+if __name__ == '__main__':
+    main()
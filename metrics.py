@@ -0,0 +1,242 @@
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from config import METRICS_HOST, METRICS_PORT, PROFILER_INTERVAL_MS
+
+# Histogram buckets in seconds, from a fast local HTTP call to a slow LLM reply.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric, in the order it is exported.
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# --- Metric Types ---
+class _Metric:
+    """A named metric with optional labels, exported in the Prometheus text format."""
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self):
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {value}" for key, value in self._values.items()]
+
+    def render(self):
+        return "\n".join([f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples())
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. a number of errors."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. a queue depth."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets and keeps their sum, e.g. for latencies."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{self._labels(key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+                lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    return "\n\n".join(metric.render() for metric in _registry) + "\n"
+
+# --- Commentary Metrics ---
+HTTP_REQUEST_SECONDS = Histogram("lol_http_request_seconds", "LCU and Live Client API response time.", ["api", "endpoint"])
+HTTP_ERRORS = Counter("lol_http_errors_total", "Failed LCU and Live Client API requests.", ["api"])
+
+GEMINI_FIRST_TOKEN_SECONDS = Histogram("gemini_first_token_seconds", "Time from sending a streamed prompt to its first text.")
+GEMINI_RESPONSE_SECONDS = Histogram("gemini_response_seconds", "Time from sending a prompt to the complete reply.", ["mode"])
+GEMINI_PROMPT_TOKENS = Histogram("gemini_prompt_tokens", "Estimated prompt size including chat history.",
+                                 buckets=(250, 500, 1000, 2000, 4000, 8000, 16000))
+GEMINI_ERRORS = Counter("gemini_errors_total", "Gemini calls that raised an error.")
+GEMINI_FALLBACKS = Counter("gemini_fallbacks_total", "Captions not written by Gemini because it missed its deadline or failed.", ["reason"])
+CAPTIONS = Counter("captions_total", "Events captioned, by whether a template or the LLM wrote the line.", ["source"])
+
+TTS_FIRST_BYTE_SECONDS = Histogram("tts_first_byte_seconds", "Time from an ElevenLabs request to its first audio chunk.")
+TTS_AUDIO_SECONDS = Histogram("tts_audio_seconds", "Length of synthesized clips.", buckets=(1, 2, 4, 8, 16, 32, 64))
+TTS_REQUESTS = Counter("tts_requests_total", "Lines sent to speech, by where the audio came from.", ["source"])
+TTS_CACHE_LOOKUPS = Counter("tts_cache_lookups_total", "TTS cache lookups, by the level that answered or miss.", ["result"])
+
+AUDIO_PREEMPTED = Counter("audio_preempted_total", "Clips faded out on the speakers for a more important clip.")
+AUDIO_DROPPED = Counter("audio_dropped_total", "Clips dropped before playing for a more important clip.")
+AUDIO_SECONDS_SAVED = Counter("audio_seconds_saved_total", "Seconds of audio skipped by preemption on the speakers.")
+
+RATE_LIMIT_WAIT_SECONDS = Histogram("rate_limit_wait_seconds", "Time a request waited for a free slot and quota.", ["service"])
+RATE_LIMIT_CONCURRENCY = Gauge("rate_limit_concurrency", "Current cap on requests in flight.", ["service"])
+API_RETRIES = Counter("api_retries_total", "Gemini and ElevenLabs requests sent again after an error.", ["service", "reason"])
+
+BROADCAST_LISTENERS = Gauge("broadcast_listeners", "Clients connected to the broadcast, by feed.", ["feed"])
+BROADCAST_DROPPED = Counter("broadcast_dropped_total", "Audio blocks and captions dropped for listeners that fell behind.", ["feed"])
+
+PIPELINE_QUEUE_DEPTH = Gauge("pipeline_queue_depth", "Jobs waiting in each pipeline queue.", ["queue"])
+PIPELINE_IN_FLIGHT = Gauge("pipeline_in_flight", "Jobs accepted by the pipeline that have not finished playing.")
+PIPELINE_STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Time spent in each stage, counted from the previous hand-off.", ["stage"])
+PIPELINE_LATENCY_SECONDS = Histogram("pipeline_latency_seconds", "Time from a job entering the pipeline to its first audio.")
+PLAYBACK_LAG_SECONDS = Histogram("playback_lag_seconds", "Time a clip's first audio waited for the speakers.")
+PIPELINE_DROPPED = Counter("pipeline_jobs_dropped_total", "Jobs dropped before playback.", ["reason"])
+STARTUP_SECONDS = Gauge("startup_seconds", "Time from startup to the first poll and the first audio.", ["milestone"])
+
+def record_startup(milestone, seconds):
+    """Reports how long after startup a milestone such as first_poll was reached."""
+    STARTUP_SECONDS.set(seconds, milestone=milestone)
+    print(f"⏱️ Time to {milestone.replace('_', ' ')}: {seconds:.2f}s")
+
+# --- Sampling Profiler ---
+class SamplingProfiler:
+    """
+    Samples the stack of every thread at a fixed interval and counts identical
+    stacks. Costs nothing until started, so it can be switched on mid-game.
+    Output is in the folded format read by flame graph tools.
+    """
+    def __init__(self, interval=PROFILER_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Tally()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """One "thread;outer;...;inner count" line per distinct stack, most frequent first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + "\n"
+
+def profile(seconds, interval=PROFILER_INTERVAL_MS / 1000):
+    """Profiles the running process for the given number of seconds and returns the folded stacks."""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    time.sleep(seconds)
+    profiler.stop()
+    return profiler.folded()
+
+# --- Metrics Endpoint ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/metrics":
+            self._reply(200, render(), "text/plain; version=0.0.4")
+        elif parts.path == "/profile":
+            query = parse_qs(parts.query)
+            try:
+                seconds = min(float(query.get("seconds", ["10"])[0]), 300.0)
+                interval = float(query.get("interval_ms", [PROFILER_INTERVAL_MS])[0]) / 1000
+            except ValueError:
+                self._reply(400, "seconds and interval_ms must be numbers\n", "text/plain")
+                return
+            self._reply(200, profile(seconds, interval), "text/plain")
+        else:
+            self._reply(404, "Try /metrics or /profile?seconds=10\n", "text/plain")
+
+    def _reply(self, status, text, content_type):
+        payload = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Serves /metrics (Prometheus) and /profile?seconds=N (sampling profiler) in
+    a background thread, once per process. Returns None if disabled (port 0)
+    or the port is taken.
+    """
+    global _server
+    if _server is not None or not port:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Could not start metrics endpoint on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return _server
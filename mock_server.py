@@ -0,0 +1,344 @@
+import argparse
+import base64
+import bisect
+import hashlib
+import json
+import os
+import secrets
+import ssl
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from recorder import load_capture
+
+EVENTDATA_PATH = "/liveclientdata/eventdata"
+# LCU endpoints whose changes are pushed over the WebSocket, by WAMP event name.
+PUSHED_PATHS = {
+    "OnJsonApiEvent_lol-gameflow_v1_gameflow-phase": "/lol-gameflow/v1/gameflow-phase",
+    "OnJsonApiEvent_lol-champ-select_v1_session": "/lol-champ-select/v1/session",
+}
+WAMP_SUBSCRIBE, WAMP_UNSUBSCRIBE, WAMP_EVENT = 5, 6, 8
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# --- Capture Replay ---
+class Replay:
+    """
+    Serves a recorded capture against a clock running at speed times real
+    time. Each endpoint answers with its latest recorded response at or before
+    the current replay time. Event data is rebuilt from every recorded page, so
+    any ?eventID= cursor gets the right events back.
+    """
+    def __init__(self, records, speed=1.0, loop=False):
+        self.speed = speed
+        self.loop = loop
+        self.duration = records[-1]["t"] if records else 0.0
+        # (api, path) -> ([times], [(status, body)])
+        self._responses = {}
+        # Events in the order they were first seen: [times], [(game start time, event)]
+        self._event_times, self._events = [], []
+        self._index(records)
+        self.started_at = None
+
+    def _index(self, records):
+        seen = set()
+        game_started_at = 0.0
+        last_event_time = -1
+        for r in records:
+            path = urlsplit(r["path"]).path
+            if path != EVENTDATA_PATH:
+                times, responses = self._responses.setdefault((r["api"], path), ([], []))
+                times.append(r["t"])
+                responses.append((r["status"], r["body"]))
+                continue
+            for e in (r["body"] or {}).get("Events", []):
+                # A GameStart older than what we have already seen means a new game began.
+                if e.get("EventName") == "GameStart" and e.get("EventTime", 0) < last_event_time:
+                    seen.clear()
+                    game_started_at = r["t"]
+                if e.get("EventID") in seen:
+                    continue
+                seen.add(e.get("EventID"))
+                last_event_time = e.get("EventTime", 0)
+                self._event_times.append(r["t"])
+                self._events.append((game_started_at, e))
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def now(self):
+        """Current position in the capture, in seconds."""
+        elapsed = (time.monotonic() - self.started_at) * self.speed
+        if self.loop and self.duration > 0:
+            return elapsed % self.duration
+        return elapsed
+
+    def respond(self, api, raw_path):
+        """Returns (status, body) for a request made at the current replay time."""
+        now = self.now()
+        parts = urlsplit(raw_path)
+        if parts.path == EVENTDATA_PATH and api == "live":
+            return 200, {"Events": self._events_at(now, parse_qs(parts.query))}
+        times, responses = self._responses.get((api, parts.path), ([], []))
+        i = bisect.bisect_right(times, now)
+        if i == 0:
+            return 404, {"errorCode": "RPC_ERROR", "httpStatus": 404, "message": f"Nothing recorded for {parts.path} yet"}
+        return responses[i - 1]
+
+    def _events_at(self, now, query):
+        try:
+            first_id = int(query.get("eventID", ["0"])[0])
+        except ValueError:
+            first_id = 0
+        end = bisect.bisect_right(self._event_times, now)
+        if end == 0:
+            return []
+        current_game = self._events[end - 1][0]
+        return [
+            e for game, e in self._events[:end]
+            if game == current_game and e.get("EventID", 0) >= first_id
+        ]
+
+# --- LCU WebSocket Stand-In ---
+class _Subscriber:
+    """One WebSocket connection to the LCU stand-in and the WAMP events it subscribed to."""
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.events = set()
+        self._lock = threading.Lock()
+
+    def send(self, opcode, payload=b""):
+        """Writes one unmasked frame, as servers do."""
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x80 | opcode, len(payload))
+        elif len(payload) < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, len(payload))
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, len(payload))
+        with self._lock:
+            self.wfile.write(header + payload)
+            self.wfile.flush()
+
+    def receive(self):
+        """Reads one frame from the client and returns (opcode, payload), or (None, b"") once it is gone."""
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None, b""
+        opcode, length = head[0] & 0x0F, head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+        data = self.rfile.read(length)
+        return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+class LCUPushHub:
+    """
+    WAMP over WebSocket like the LCU's: clients send [5, event] to subscribe
+    and get [8, event, {"data", "eventType", "uri"}] for every publish().
+    """
+    def __init__(self):
+        self.subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribed(self, event):
+        """Number of open connections subscribed to event."""
+        with self._lock:
+            return sum(event in s.events for s in self.subscribers)
+
+    def publish(self, event, data, event_type="Update"):
+        message = json.dumps([WAMP_EVENT, event, {"data": data, "eventType": event_type, "uri": PUSHED_PATHS.get(event, "")}])
+        with self._lock:
+            subscribers = [s for s in self.subscribers if event in s.events]
+        for subscriber in subscribers:
+            try:
+                subscriber.send(0x1, message.encode("utf-8"))
+            except (OSError, ValueError):
+                # Already closed.
+                pass
+
+    def disconnect_all(self):
+        """Closes every connection, as the client does when it restarts."""
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.send(0x8)
+            except (OSError, ValueError):
+                # Already closed.
+                pass
+
+    def serve(self, handler):
+        """Completes the upgrade of a GET request and serves the connection until it closes."""
+        accept = base64.b64encode(hashlib.sha1((handler.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest())
+        handler.send_response(101, "Switching Protocols")
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Sec-WebSocket-Accept", accept.decode())
+        handler.end_headers()
+        handler.wfile.flush()
+        subscriber = _Subscriber(handler.rfile, handler.wfile)
+        with self._lock:
+            self.subscribers.add(subscriber)
+        try:
+            while True:
+                opcode, payload = subscriber.receive()
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    subscriber.send(0xA, payload)
+                elif opcode == 0x1:
+                    self._on_message(subscriber, payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self.subscribers.discard(subscriber)
+            handler.close_connection = True
+
+    def _on_message(self, subscriber, payload):
+        try:
+            msg_type, event = json.loads(payload)[:2]
+        except (ValueError, TypeError):
+            return
+        with self._lock:
+            if msg_type == WAMP_SUBSCRIBE:
+                subscriber.events.add(event)
+            elif msg_type == WAMP_UNSUBSCRIBE:
+                subscriber.events.discard(event)
+
+# --- HTTP(S) Stand-In ---
+def make_handler(replay, api, hub=None):
+    """Request handler answering GETs for one API from the replay, and WebSocket upgrades with hub."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if hub is not None and self.headers.get("Upgrade", "").lower() == "websocket":
+                hub.serve(self)
+                return
+            status, body = replay.respond(api, self.path)
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def self_signed_cert(directory):
+    """Creates a throwaway self-signed certificate with openssl, like the one the game client uses."""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+class MockLeagueServer:
+    """
+    Local stand-in for the LCU and Live Client APIs, replaying a capture on
+    the real endpoint paths. Writes a lockfile that points LeagueClient at it.
+    The LCU port also accepts WebSocket connections, which get gameflow-phase
+    and champ-select changes pushed as the replay reaches them.
+    """
+    def __init__(self, replay, host="127.0.0.1", lcu_port=0, live_port=2999, lockfile="mock_lockfile", use_tls=True,
+                 push_interval=0.1):
+        self.replay = replay
+        self.lockfile = lockfile
+        self.protocol = "https" if use_tls else "http"
+        self.hub = LCUPushHub()
+        self.push_interval = push_interval
+        self._stop_event = threading.Event()
+        self.lcu = ThreadingHTTPServer((host, lcu_port), make_handler(replay, "lcu", self.hub))
+        self.live = ThreadingHTTPServer((host, live_port), make_handler(replay, "live"))
+        if use_tls:
+            with tempfile.TemporaryDirectory() as directory:
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+                context.load_cert_chain(*self_signed_cert(directory))
+            for server in (self.lcu, self.live):
+                server.socket = context.wrap_socket(server.socket, server_side=True)
+
+    @property
+    def lcu_port(self):
+        return self.lcu.server_address[1]
+
+    @property
+    def live_port(self):
+        return self.live.server_address[1]
+
+    def start(self):
+        with open(self.lockfile, "w") as f:
+            f.write(f"LeagueClient:{os.getpid()}:{self.lcu_port}:{secrets.token_urlsafe(16)}:{self.protocol}")
+        self.replay.start()
+        for server in (self.lcu, self.live):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._push_changes, name="lcu-push", daemon=True).start()
+
+    def _push_changes(self):
+        """Publishes the pushed endpoints whenever the replay reaches a different recorded response."""
+        last = {}
+        while not self._stop_event.wait(self.push_interval):
+            for event, path in PUSHED_PATHS.items():
+                status, body = self.replay.respond("lcu", path)
+                current = body if status == 200 else None
+                if current == last.get(event):
+                    continue
+                if current is not None:
+                    self.hub.publish(event, current)
+                elif last.get(event) is not None:
+                    self.hub.publish(event, None, event_type="Delete")
+                last[event] = current
+
+    def stop(self):
+        self._stop_event.set()
+        self.hub.disconnect_all()
+        for server in (self.lcu, self.live):
+            server.shutdown()
+            server.server_close()
+        try:
+            os.remove(self.lockfile)
+        except OSError:
+            pass
+
+# --- Program Entry Point ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a recorded game on local LCU and Live Client endpoints")
+    parser.add_argument("capture", help="capture file written with RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, e.g. 4 for 4x")
+    parser.add_argument("--loop", action="store_true", help="start over at the end of the capture")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--lcu-port", type=int, default=0, help="LCU port (default: any free port)")
+    parser.add_argument("--live-port", type=int, default=2999)
+    parser.add_argument("--lockfile", default="mock_lockfile")
+    parser.add_argument("--http", action="store_true", help="serve plain HTTP instead of HTTPS")
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)
+    if not records:
+        parser.error(f"{args.capture} holds no records")
+    replay = Replay(records, speed=args.speed, loop=args.loop)
+    server = MockLeagueServer(replay, args.host, args.lcu_port, args.live_port, args.lockfile, use_tls=not args.http)
+    server.start()
+
+    print(f"▶️ Replaying {len(records)} responses ({replay.duration:.0f}s) at {args.speed}x. Run the app with:")
+    print(f"   LOL_LOCKFILE_PATH={os.path.abspath(args.lockfile)} LOCAL_API_HOST={args.host} "
+          f"LIVE_CLIENT_PORT={server.live_port} LIVE_CLIENT_PROTOCOL={server.protocol}")
+    try:
+        while args.loop or replay.now() <= replay.duration:
+            time.sleep(1)
+        # Keep answering with the final state, like a client sitting on the end-of-game screen.
+        print("⏹️ End of capture, serving the last responses until interrupted.")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
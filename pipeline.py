@@ -0,0 +1,477 @@
+import heapq
+import inspect
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import api_client
+from config import PIPELINE_QUEUE_SIZE, STREAM_CAPTIONS, EVENT_MAX_LAG, PREEMPT_MIN_PRIORITY
+from data_fetcher import get_gameflow_phase, get_game_snapshot, get_game_stats
+from event_scheduler import EventScheduler, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_CRITICAL
+from game_state import DeltaTracker
+from llm_commentator import caption_deadline
+from metrics import (
+    PIPELINE_QUEUE_DEPTH, PIPELINE_IN_FLIGHT, PIPELINE_STAGE_SECONDS, PIPELINE_LATENCY_SECONDS,
+    PLAYBACK_LAG_SECONDS, PIPELINE_DROPPED, record_startup,
+)
+from poll_scheduler import PollScheduler
+from template_captions import TemplateCaptioner
+from utils import LoLContext, event_to_text
+
+# Number of recent clips kept for latency statistics.
+LATENCY_WINDOW = 200
+
+# --- Pipeline Jobs ---
+class Job:
+    """
+    One unit of work moving through the pipeline. Queues hand out the highest
+    priority first, then the oldest. A job older than max_age seconds is dropped
+    before the next stage works on it. stamps records when each stage handed
+    the job on. fallback is what to say if the LLM misses its deadline for a
+    prompt ("" to say nothing).
+    """
+    __slots__ = ("priority", "seq", "payload", "created_at", "max_age", "stamps", "fallback")
+    _counter = itertools.count()
+
+    def __init__(self, payload, priority=PRIORITY_NORMAL, max_age=None, created_at=None, fallback=""):
+        self.priority = priority
+        self.seq = next(Job._counter)
+        self.payload = payload
+        self.created_at = created_at if created_at is not None else time.monotonic()
+        self.max_age = max_age
+        self.stamps = {}
+        self.fallback = fallback
+
+    def derive(self, payload, stage=None):
+        """A follow-up job for the next stage that keeps this job's priority, age and stamps."""
+        job = Job(payload, self.priority, self.max_age, self.created_at)
+        job.stamps = dict(self.stamps)
+        if stage:
+            job.stamps[stage] = time.monotonic()
+        return job
+
+    def is_stale(self):
+        return self.max_age is not None and time.monotonic() - self.created_at > self.max_age
+
+    def __lt__(self, other):
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+# Marker pushed through the queues to shut the stages down in order, after everything else.
+_STOP = Job(None, priority=-1)
+
+# --- Pipelined Commentary Engine ---
+class CommentaryPipeline:
+    """
+    Runs polling, caption generation, speech synthesis and playback as separate
+    worker threads joined by bounded queues. While one clip is playing, the
+    next caption is already being generated and synthesized.
+
+    play(audio, priority=...) may block until a clip is done or return a Future
+    for it, in which case the next clip is handed over while the current one is
+    still playing.
+
+    With an LCUEventListener, gameflow phase and champ select are taken from
+    pushed updates instead of being polled, and a phase change wakes the poller.
+    """
+    def __init__(self, commentator, synthesize, play, ctx=None, intro=None,
+                 scheduler=None, listener=None, queue_size=PIPELINE_QUEUE_SIZE,
+                 stream_captions=STREAM_CAPTIONS, client=None, started_at=None, filler=None, timeline=None):
+        self.commentator = commentator
+        self.synthesize = synthesize
+        self.play = play
+        # The LeagueClient this pipeline narrates.
+        self.client = client or api_client.get_default_client()
+        self.ctx = ctx or LoLContext(client=self.client)
+        self.intro = intro
+        self.scheduler = scheduler or PollScheduler()
+        self.listener = listener
+        if listener is not None:
+            listener.on_phase = self._on_push
+            listener.on_champ_select = self._on_push
+        # Hand captions to synthesis sentence by sentence while the LLM is still writing.
+        self.stream_captions = stream_captions
+        # Prompts waiting for the LLM, captions waiting for TTS, audio waiting for the speakers.
+        self.caption_queue = queue.PriorityQueue(maxsize=queue_size)
+        self.speech_queue = queue.PriorityQueue(maxsize=queue_size)
+        self.playback_queue = queue.PriorityQueue(maxsize=queue_size)
+        # Number of items accepted by the pipeline that have not finished playing yet.
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Set to cut the wait before the next poll short.
+        self._wake = threading.Event()
+        self._threads = []
+        self._last_phase = None
+        # Idle commentary only covers what changed since the last idle line.
+        self.deltas = DeltaTracker()
+        # Routine event batches are captioned locally and skip the LLM.
+        self.templates = TemplateCaptioner()
+        # Orders, merges and drops events before they are narrated.
+        self.events = EventScheduler()
+        # Optional FillerPool with pre-synthesized lines for quiet stretches.
+        self.filler = filler
+        # GameTimeline of every idle snapshot, whose trends go into idle prompts.
+        # Created with the first snapshot, so NumPy is only loaded once a game is on.
+        self.timeline = timeline
+        # Jobs dropped for being too old, low-priority jobs pushed out of a full queue, and clips played.
+        self.stats = {"dropped_stale": 0, "displaced": 0, "spoken": 0}
+        # Seconds from a job entering the pipeline to its first audio, for the most recent clips.
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        # The same clips broken down by stage, each counted from the previous stage's hand-off.
+        self.stage_latencies = {stage: deque(maxlen=LATENCY_WINDOW) for stage in ("caption", "synthesis", "playback")}
+        # Playback futures of clips handed to an asynchronous player.
+        self._playing = deque()
+        # Startup time, and how long after it the first poll and first audio happened.
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.milestones = {}
+
+    @property
+    def phase(self):
+        """Gameflow phase seen at the last poll, or None before the first one."""
+        return self._last_phase
+
+    def start(self):
+        """Starts all pipeline stages in background threads."""
+        self._stop_event.clear()
+        stages = [
+            ("caption", self.caption_queue, self.speech_queue, self._caption),
+            ("synthesis", self.speech_queue, self.playback_queue, self._synthesize),
+            ("playback", self.playback_queue, None, self._play),
+        ]
+        for name, inbox, outbox, work in stages:
+            thread = threading.Thread(target=self._run_stage, args=(inbox, outbox, work), name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        if self.intro:
+            print(self.intro)
+            self._accept(self.speech_queue, Job(self.intro, PRIORITY_CRITICAL))
+
+        if self.filler is not None:
+            self.filler.start()
+
+        poller = threading.Thread(target=self._run_poller, name="poll", daemon=True)
+        poller.start()
+        self._threads.append(poller)
+
+    def stop(self):
+        """Stops polling and lets the remaining stages shut down in order."""
+        self._stop_event.set()
+        self._wake.set()
+        if self.filler is not None:
+            self.filler.stop()
+        self.caption_queue.put(_STOP)
+
+    def run(self):
+        """Starts the pipeline and blocks until it is interrupted."""
+        self.start()
+        try:
+            while not self._stop_event.is_set():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    # --- Stages ---
+    def _run_poller(self):
+        """Polls the game APIs and feeds new prompts into the caption queue."""
+        while not self._stop_event.is_set():
+            try:
+                had_activity, reachable = self.poll_once()
+            except Exception as e:
+                print(f"Polling failed: {e}")
+                had_activity, reachable = False, True
+            self._milestone("first_poll")
+            self._wake.wait(self.scheduler.next_delay(had_activity, reachable))
+            self._wake.clear()
+
+    def _on_push(self, data):
+        """Wakes the poller as soon as the LCU pushes a change."""
+        self.scheduler.reset()
+        self._wake.set()
+
+    def _pushed(self):
+        """Whether phase and champ select updates are currently arriving over the WebSocket."""
+        return self.listener is not None and self.listener.connected and self.listener.phase is not None
+
+    def poll_once(self):
+        """
+        Runs a single poll and queues any commentary it produces.
+        Returns (had_activity, reachable) for the poll scheduler.
+        """
+        if self.client.port is None:
+            phase = self._live_phase()
+            reachable = self.client.reachable["live"]
+        else:
+            phase = self.listener.phase if self._pushed() else get_gameflow_phase(self.client)
+            reachable = self._pushed() or self.client.reachable["lcu"]
+        had_activity = False
+
+        # Leaving a game means the next one starts with fresh event IDs and a new champ select.
+        if isinstance(phase, str):
+            if self._last_phase == "InProgress" and phase != "InProgress":
+                self.ctx.reset_game()
+                self.commentator.history.reset()
+                self.deltas.reset()
+                if self.filler is not None:
+                    self.filler.clear()
+                    self.filler.commentator.history.reset()
+                if self.timeline is not None:
+                    self.timeline.reset()
+            self._last_phase = phase
+
+        # 1. Pregame: Champion Select
+        if phase in ["Lobby", "Matchmaking", "ChampSelect"] and not self.ctx.champ_select_done:
+            self.ctx.update_champ_select(self.listener.champ_select_session if self._pushed() else None)
+            if self.ctx.champ_select_done:
+                had_activity = True
+                text = "Champ select is done. Teams and bans are set."
+                self._accept(self.caption_queue, Job(text, fallback=text))
+                if self.filler is not None:
+                    self.filler.update(teams_info=self.ctx.teams_info)
+
+        # 2. In-game: Fetching Events and Player Data
+        if phase == "InProgress":
+            new_events = self.ctx.get_new_events()
+            reachable = self.client.reachable["live"]
+            if new_events:
+                had_activity = True
+                game_time = get_game_stats(self.client).get("gameTime")
+                # Most important group first; each group becomes one line.
+                for priority, events in self.events.plan(new_events, game_time):
+                    max_age = None if priority >= PRIORITY_CRITICAL else EVENT_MAX_LAG
+                    caption = self.templates.route(events)
+                    if caption:
+                        print(caption)
+                        self._accept(self.speech_queue, Job(caption, priority, max_age))
+                    else:
+                        context = "".join(event_to_text(e) + "\n" for e in events)
+                        self._accept(self.caption_queue, Job(context, priority, max_age, fallback=self.templates.fallback(events)))
+            # Only fill silence when nothing but the current clip is left in the pipeline.
+            elif self.in_flight <= 1:
+                snapshot = get_game_snapshot(client=self.client)
+                trends = self._trends(snapshot)
+                filler = self._take_filler(snapshot)
+                # A ready filler line plays at once, with no Gemini or ElevenLabs call in between.
+                if filler is not None:
+                    print(filler.text)
+                    self._accept(self.playback_queue, Job(filler.audio, PRIORITY_LOW, EVENT_MAX_LAG))
+                else:
+                    # Changes are only taken when they can be narrated, so those during filler carry over.
+                    changes = self.deltas.update(snapshot)
+                    # Nothing changed since the last idle line: skip the LLM entirely.
+                    if changes:
+                        prompt = "\n".join(part for part in (changes, trends) if part)
+                        self._accept(self.caption_queue, Job(prompt, PRIORITY_LOW, EVENT_MAX_LAG))
+
+        # Filler is only prepared while nothing else is waiting for Gemini or ElevenLabs.
+        if self.filler is not None:
+            self.filler.set_quiet(not had_activity and self.in_flight == 0)
+        return had_activity, reachable
+
+    def _live_phase(self):
+        """
+        The phase of a client without an LCU connection, where only the Live
+        Client API is known: it answers during a game and nowhere else, so an
+        unreachable API means the game ended.
+        """
+        get_game_stats(self.client)
+        return "InProgress" if self.client.reachable["live"] else "None"
+
+    def _trends(self, snapshot):
+        """Adds the snapshot to the game timeline and returns its summary of recent trends."""
+        if self.timeline is None:
+            from timeline import GameTimeline
+            self.timeline = GameTimeline()
+        self.timeline.append(snapshot)
+        return self.timeline.context()
+
+    def _take_filler(self, snapshot):
+        """Refreshes the filler pool from the snapshot and takes a line that is still true, or None."""
+        if self.filler is None:
+            return None
+        self.filler.update(snapshot, self.ctx.teams_info)
+        line = self.filler.take()
+        if line is not None:
+            # The line is about to be said, so it becomes part of the conversation.
+            self.commentator.history.add_turn(line.prompt, line.text)
+        return line
+
+    def _caption(self, job):
+        """
+        Turns a prompt into a caption with the LLM, or into the job's local
+        caption if the LLM misses the deadline for the job's priority.
+        """
+        text = job.payload
+        deadline = self._deadline(job)
+        if self.stream_captions:
+            return self._stream_caption(text, deadline, job.fallback)
+        caption = self.commentator.get_caption_from_gemini(text, deadline=deadline, fallback=job.fallback)
+        if caption:
+            print(caption)
+        return caption
+
+    def _deadline(self, job):
+        """Seconds left for the LLM to answer a job, or None for no deadline."""
+        deadline = caption_deadline(job.priority)
+        if deadline is None:
+            return None
+        # Time already spent waiting in the queue counts against the deadline.
+        return deadline - (time.monotonic() - job.created_at)
+
+    def _stream_caption(self, text, deadline, fallback):
+        """Yields the caption sentence by sentence as the LLM produces it."""
+        for sentence in self.commentator.stream_caption_from_gemini(text, deadline=deadline, fallback=fallback):
+            print(sentence)
+            yield sentence
+
+    def _synthesize(self, job):
+        """Turns a caption into audio."""
+        return self.synthesize(job.payload)
+
+    def _play(self, job):
+        """
+        Hands audio to the player, which may interrupt less important audio for it.
+        At most one clip waits behind the current one, unless a clip that may
+        interrupt is ready, so it reaches the player without delay.
+        """
+        while self._live_clips() >= 2 and not self._stop_event.is_set():
+            if job.priority >= PREEMPT_MIN_PRIORITY or self._head_priority(self.playback_queue) >= PREEMPT_MIN_PRIORITY:
+                break
+            time.sleep(0.02)
+        result = self.play(job.payload, priority=job.priority)
+        if isinstance(result, Future):
+            result.add_done_callback(lambda f: self._record_latency(job))
+        else:
+            self._record_latency(job)
+        return result
+
+    def _record_latency(self, job):
+        """Records how long a job took from entering the pipeline to its first audio."""
+        started = getattr(job.payload, "playback_started_at", None)
+        if started is not None:
+            self._milestone("first_audio", started)
+            self.stats["spoken"] += 1
+            self.latencies.append(started - job.created_at)
+            PIPELINE_LATENCY_SECONDS.observe(started - job.created_at)
+            first_chunk = getattr(job.payload, "first_chunk_at", None)
+            if first_chunk is not None:
+                PLAYBACK_LAG_SECONDS.observe(max(0.0, started - first_chunk))
+            previous = job.created_at
+            # Template captions skip the caption stage.
+            for stage in ("caption", "synthesis"):
+                if stage in job.stamps:
+                    self.stage_latencies[stage].append(job.stamps[stage] - previous)
+                    PIPELINE_STAGE_SECONDS.observe(job.stamps[stage] - previous, stage=stage)
+                    previous = job.stamps[stage]
+            self.stage_latencies["playback"].append(started - previous)
+            PIPELINE_STAGE_SECONDS.observe(started - previous, stage="playback")
+
+    def _milestone(self, name, at=None):
+        """Records the first time name happens, counted from startup."""
+        if name in self.milestones:
+            return
+        self.milestones[name] = (at if at is not None else time.monotonic()) - self.started_at
+        record_startup(name, self.milestones[name])
+
+    def _live_clips(self):
+        """Number of clips handed to the player that have not finished yet."""
+        while self._playing and self._playing[0].done():
+            self._playing.popleft()
+        return sum(1 for future in self._playing if not future.done())
+
+    def _head_priority(self, target_queue):
+        """Priority of the next job in a queue, or -1 if it is empty."""
+        with target_queue.mutex:
+            return target_queue.queue[0].priority if target_queue.queue else -1
+
+    def _run_stage(self, inbox, outbox, work):
+        """Moves jobs from inbox to outbox through work until the stop marker arrives."""
+        while True:
+            job = inbox.get()
+            self._report_queues()
+            if job is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+            # Fresh events have moved on: don't spend time narrating old ones.
+            if job.is_stale():
+                self.stats["dropped_stale"] += 1
+                PIPELINE_DROPPED.inc(reason="stale")
+                self._finish()
+                continue
+            try:
+                result = work(job)
+                if inspect.isgenerator(result):
+                    # One job became several: forward each piece as soon as it is ready.
+                    for piece in result:
+                        with self._lock:
+                            self.in_flight += 1
+                        outbox.put(job.derive(piece, threading.current_thread().name))
+                    result = None
+            except Exception as e:
+                print(f"Pipeline stage {threading.current_thread().name} failed: {e}")
+                result = None
+            if outbox is not None and result:
+                outbox.put(job.derive(result, threading.current_thread().name))
+            elif isinstance(result, Future):
+                self._track_playback(result)
+            else:
+                self._finish()
+
+    def _track_playback(self, future):
+        """Finishes a job when its clip is done, played, interrupted or dropped."""
+        future.add_done_callback(lambda f: self._finish())
+        self._playing.append(future)
+
+    # --- Bookkeeping ---
+    def _accept(self, target_queue, job):
+        """
+        Admits a new job into the pipeline. When the target queue is full, a
+        lower-priority job is pushed out to make room; otherwise it waits.
+        """
+        with self._lock:
+            self.in_flight += 1
+        while not self._stop_event.is_set():
+            if self._displace(target_queue, job):
+                return
+            try:
+                target_queue.put(job, timeout=0.2)
+                self._report_queues()
+                return
+            except queue.Full:
+                continue
+        self._finish()
+
+    def _displace(self, target_queue, job):
+        """Swaps job for the least important queued job if the queue is full and that job ranks lower."""
+        with target_queue.mutex:
+            if target_queue.maxsize <= 0 or len(target_queue.queue) < target_queue.maxsize:
+                return False
+            worst = max(target_queue.queue)
+            if worst is _STOP or worst.priority >= job.priority:
+                return False
+            target_queue.queue.remove(worst)
+            heapq.heapify(target_queue.queue)
+            heapq.heappush(target_queue.queue, job)
+            target_queue.not_empty.notify()
+        self.stats["displaced"] += 1
+        PIPELINE_DROPPED.inc(reason="displaced")
+        self._finish()
+        return True
+
+    def _report_queues(self):
+        """Publishes queue depths and the number of jobs in flight."""
+        for name, target_queue in (("caption", self.caption_queue), ("speech", self.speech_queue), ("playback", self.playback_queue)):
+            PIPELINE_QUEUE_DEPTH.set(target_queue.qsize(), queue=name)
+        PIPELINE_IN_FLIGHT.set(self.in_flight)
+
+    def _finish(self):
+        """Marks one item as done, either played or dropped."""
+        with self._lock:
+            self.in_flight -= 1
+        PIPELINE_IN_FLIGHT.set(self.in_flight)
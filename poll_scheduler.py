@@ -0,0 +1,30 @@
+from config import POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_OFFLINE_INTERVAL
+
+# --- Adaptive Poll Scheduler ---
+class PollScheduler:
+    """
+    Decides how long to wait before the next Live Client poll: the minimum
+    interval right after activity, a growing interval during quiet stretches,
+    and a longer back-off while the client cannot be reached.
+    """
+    def __init__(self, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL,
+                 offline_interval=POLL_OFFLINE_INTERVAL, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.offline_interval = offline_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+    def next_delay(self, had_activity, reachable=True):
+        """Records the outcome of the last poll and returns the delay before the next one."""
+        if not reachable:
+            self.interval = min(max(self.interval, self.max_interval) * 2, self.offline_interval)
+        elif had_activity:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.interval
+
+    def reset(self):
+        """Returns to the fastest polling rate, e.g. after a pushed phase change."""
+        self.interval = self.min_interval
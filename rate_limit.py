@@ -0,0 +1,226 @@
+import random
+import threading
+import time
+from config import (
+    GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_CONCURRENCY,
+    ELEVENLABS_RPM, ELEVENLABS_CHARS_PER_MINUTE, ELEVENLABS_MAX_CONCURRENCY,
+    API_RETRY_ATTEMPTS, API_RETRY_MAX_BACKOFF,
+)
+from metrics import RATE_LIMIT_WAIT_SECONDS, RATE_LIMIT_CONCURRENCY, API_RETRIES
+
+# Seconds of quota a bucket may spend at once after a quiet stretch.
+BURST_SECONDS = 5.0
+# First retry pause in seconds; each further attempt doubles the range the pause is drawn from.
+RETRY_BASE_DELAY = 0.5
+
+class RateLimitTimeout(Exception):
+    """Raised when a request could not be sent within its deadline."""
+
+def _status(error):
+    """HTTP status carried by an SDK exception, if any."""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def is_quota_error(error):
+    """Whether an exception from Gemini or ElevenLabs means a rate limit or quota was hit."""
+    if _status(error) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message or "too many" in message
+
+def is_retryable(error):
+    """Whether a failed request is worth sending again: quota errors, overloaded servers and dropped connections."""
+    if is_quota_error(error):
+        return True
+    if _status(error) in (500, 502, 503, 504):
+        return True
+    return type(error).__name__ in (
+        "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+        "ConnectionError", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+    )
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=API_RETRY_MAX_BACKOFF):
+    """Pause before retry number attempt (from 0), drawn at random so clients don't retry in step."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+# --- Token Bucket ---
+class TokenBucket:
+    """
+    Refills at per_minute / 60 tokens a second up to capacity. Taking tokens
+    waits until enough have built up. per_minute 0 means unlimited.
+    """
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * BURST_SECONDS)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount=1, deadline=None):
+        """
+        Takes amount tokens, waiting for them if needed. Requests larger than the
+        bucket take all of it. Returns False if the deadline would pass first.
+        """
+        if self.rate <= 0:
+            return True
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def refund(self, amount=1):
+        """Gives back tokens taken for a request that was never sent."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def drain(self):
+        """Empties the bucket, e.g. after the server said the quota is used up."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+# --- Rate Limiter ---
+class RateLimiter:
+    """
+    Client-side limits for one API, shared by every caller in the process:
+    a request bucket, a usage bucket (tokens or characters) and a cap on
+    requests in flight. The cap adapts: it halves on a quota error and grows
+    back by one over roughly as many successes as its current size, so it
+    settles just below the level the server accepts.
+    """
+    def __init__(self, name, requests_per_minute=0, units_per_minute=0, max_concurrency=4,
+                 attempts=API_RETRY_ATTEMPTS):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.units = TokenBucket(units_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.attempts = max(1, attempts)
+        self.limit = float(self.max_concurrency)
+        self.active = 0
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "failed": 0}
+        self._cond = threading.Condition()
+        RATE_LIMIT_CONCURRENCY.set(self.limit, service=name)
+
+    def acquire(self, units=1, deadline=None):
+        """Waits for a free slot and quota. Returns False if the deadline passes first."""
+        started = time.monotonic()
+        with self._cond:
+            while self.active >= max(1, int(self.limit)):
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return False
+                self._cond.wait(timeout)
+            self.active += 1
+        if not self.requests.take(1, deadline):
+            self._cancel()
+            return False
+        if not self.units.take(units, deadline):
+            # The request is not sent, so its request token goes back too.
+            self.requests.refund(1)
+            self._cancel()
+            return False
+        with self._cond:
+            self.stats["requests"] += 1
+        RATE_LIMIT_WAIT_SECONDS.observe(time.monotonic() - started, service=self.name)
+        return True
+
+    def _cancel(self):
+        """Frees a slot for a request that was never sent, leaving the cap as it is."""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def release(self, throttled=False):
+        """Frees a slot, shrinking the cap if the request ran into a quota and growing it otherwise."""
+        with self._cond:
+            self.active -= 1
+            if throttled:
+                self.stats["throttled"] += 1
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            RATE_LIMIT_CONCURRENCY.set(self.limit, service=self.name)
+            self._cond.notify_all()
+        if throttled:
+            self.requests.drain()
+
+    def _retry_or_raise(self, error, attempt, deadline):
+        """Sleeps before the next attempt, or re-raises if the error is final or time is up."""
+        delay = backoff_delay(attempt)
+        out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+        if not is_retryable(error) or attempt + 1 >= self.attempts or out_of_time:
+            self.stats["failed"] += 1
+            raise error
+        self.stats["retries"] += 1
+        API_RETRIES.inc(service=self.name, reason="quota" if is_quota_error(error) else "transient")
+        print(f"{self.name} request failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+    def call(self, fn, *args, units=1, deadline=None, **kwargs):
+        """
+        Calls fn within the limits, retrying quota and transient errors with
+        jittered backoff until it succeeds, the attempts run out or the
+        deadline (a time.monotonic() value) would pass.
+        """
+        for attempt in range(self.attempts):
+            if not self.acquire(units, deadline):
+                raise RateLimitTimeout(f"{self.name} quota not available before the deadline")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.release(throttled=is_quota_error(e))
+                self._retry_or_raise(e, attempt, deadline)
+                continue
+            self.release()
+            return result
+
+    def stream(self, open_stream, units=1, deadline=None):
+        """
+        Yields the items of open_stream() within the limits, holding a slot
+        until the stream ends. Errors before the first item are retried like
+        in call(); later ones end the stream.
+        """
+        for attempt in range(self.attempts):
+            if not self.acquire(units, deadline):
+                raise RateLimitTimeout(f"{self.name} quota not available before the deadline")
+            started = False
+            try:
+                for item in open_stream():
+                    started = True
+                    yield item
+            except Exception as e:
+                self.release(throttled=is_quota_error(e))
+                if started:
+                    self.stats["failed"] += 1
+                    raise
+                self._retry_or_raise(e, attempt, deadline)
+                continue
+            except BaseException:
+                # The caller stopped reading early.
+                self.release()
+                raise
+            self.release()
+            return
+
+# Shared by every commentator and session in the process, since quotas are per API key.
+gemini_limiter = RateLimiter("gemini", GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_CONCURRENCY)
+elevenlabs_limiter = RateLimiter("elevenlabs", ELEVENLABS_RPM, ELEVENLABS_CHARS_PER_MINUTE, ELEVENLABS_MAX_CONCURRENCY)
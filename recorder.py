@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+
+# --- Capture Recorder ---
+class Recorder:
+    """
+    Appends every LCU and Live Client API response to a capture file, one JSON
+    object per line: {"t": wall time, "api": "lcu" or "live", "path": endpoint,
+    "status": HTTP status, "body": parsed response}. Captures can be replayed
+    with mock_server.py.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        # Every line is flushed as it is written, so a crash loses at most that line.
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, api, path, status, body):
+        line = json.dumps(
+            {"t": round(time.time(), 3), "api": api, "path": path, "status": status, "body": body},
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def load_capture(path):
+    """Reads a capture file into a list of records sorted by time, with "t" counted from the first record."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash while recording.
+                print(f"Skipping unreadable capture line: {line[:60]}")
+    records.sort(key=lambda r: r["t"])
+    if records:
+        start = records[0]["t"]
+        for r in records:
+            r["t"] -= start
+    return records
@@ -0,0 +1,275 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from api_client import LeagueClient
+from audio_player import synthesize_audio, queue_audio
+from config import (
+    GEMINI_WORKERS, ELEVENLABS_WORKERS, SERVER_REPORT_INTERVAL,
+    LOCAL_API_HOST, LIVE_CLIENT_PORT, USE_LCU_WEBSOCKET,
+)
+from llm_commentator import LeagueCommentator
+from metrics import start_metrics_server
+from pipeline import CommentaryPipeline
+from rate_limit import gemini_limiter, elevenlabs_limiter
+from utils import percentile
+
+# --- Fair Worker Pool ---
+class FairWorkPool:
+    """
+    Bounded pool of worker threads shared by many game sessions. Each session
+    has its own queue of tasks and the workers serve sessions round-robin, so
+    one busy game cannot starve the others.
+    """
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        # session -> deque of (fn, args, future)
+        self._queues = {}
+        # Sessions with waiting tasks, in the order they will be served.
+        self._turns = deque()
+        self._cond = threading.Condition()
+        self.stats = {"completed": 0, "failed": 0, "busy": 0}
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, session, fn, *args):
+        """Queues fn(*args) on behalf of session and returns a Future for its result."""
+        future = Future()
+        with self._cond:
+            tasks = self._queues.setdefault(session, deque())
+            if not tasks:
+                self._turns.append(session)
+            tasks.append((fn, args, future))
+            self._cond.notify()
+        return future
+
+    @property
+    def waiting(self):
+        """Number of tasks waiting for a worker."""
+        with self._cond:
+            return sum(len(tasks) for tasks in self._queues.values())
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._turns:
+                    self._cond.wait()
+                session = self._turns.popleft()
+                tasks = self._queues[session]
+                fn, args, future = tasks.popleft()
+                # The session goes to the back of the line if it has more work.
+                if tasks:
+                    self._turns.append(session)
+                self.stats["busy"] += 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+                self.stats["failed"] += 1
+            finally:
+                with self._cond:
+                    self.stats["busy"] -= 1
+                    self.stats["completed"] += 1
+
+# --- Pool Adapters ---
+def _remaining(deadline, since):
+    """What is left of a deadline after waiting since the given time for a pool worker."""
+    return None if deadline is None else deadline - (time.monotonic() - since)
+
+class PooledCommentator:
+    """Runs one session's LeagueCommentator calls on the shared Gemini pool."""
+    def __init__(self, commentator, pool, session):
+        self.commentator = commentator
+        self.pool = pool
+        self.session = session
+        self.history = commentator.history
+
+    def get_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
+        submitted = time.monotonic()
+
+        def run():
+            return self.commentator.get_caption_from_gemini(
+                event_or_context_text, deadline=_remaining(deadline, submitted), fallback=fallback)
+        return self.pool.submit(self.session, run).result()
+
+    def stream_caption_from_gemini(self, event_or_context_text, deadline=None, fallback=None):
+        """Streams sentences from a pool worker back to the caller as they are produced."""
+        sentences = queue.Queue()
+        submitted = time.monotonic()
+
+        def run():
+            try:
+                for sentence in self.commentator.stream_caption_from_gemini(
+                        event_or_context_text, deadline=_remaining(deadline, submitted), fallback=fallback):
+                    sentences.put(sentence)
+            finally:
+                sentences.put(None)
+
+        self.pool.submit(self.session, run)
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                return
+            yield sentence
+
+def pooled_synthesize(pool, session):
+    """
+    Returns a synthesize function for one session that runs on the shared
+    ElevenLabs pool. The worker stays busy until the whole clip has arrived,
+    while the caller gets the stream as soon as it starts.
+    """
+    def synthesize(text):
+        ready = Future()
+
+        def run():
+            try:
+                stream = synthesize_audio(text)
+            except Exception as e:
+                ready.set_exception(e)
+                return
+            ready.set_result(stream)
+            if stream is not None:
+                stream.wait()
+
+        pool.submit(session, run)
+        return ready.result()
+    return synthesize
+
+def drain_audio(stream, priority=0):
+    """Headless player: receives a clip without playing it and marks when its first audio arrived."""
+    if not stream:
+        return
+    for _ in stream:
+        if stream.playback_started_at is None:
+            stream.playback_started_at = time.monotonic()
+
+# --- Game Sessions ---
+class GameSession:
+    """One narrated game: its own client connection, context, chat history and pipeline."""
+    def __init__(self, name, gemini_pool, tts_pool, lockfile=None, host=LOCAL_API_HOST,
+                 live_port=LIVE_CLIENT_PORT, play=drain_audio):
+        self.name = name
+        self.client = LeagueClient(lockfile, host, live_port)
+        self.listener = None
+        if USE_LCU_WEBSOCKET and self.client.port:
+            from lcu_events import LCUEventListener
+            self.listener = LCUEventListener(self.client)
+        self.pipeline = CommentaryPipeline(
+            commentator=PooledCommentator(LeagueCommentator(), gemini_pool, name),
+            synthesize=pooled_synthesize(tts_pool, name),
+            play=play,
+            listener=self.listener,
+            client=self.client,
+        )
+
+    def start(self):
+        if self.listener is not None:
+            self.listener.start()
+        self.pipeline.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+        self.pipeline.stop()
+
+# --- Commentary Server ---
+class CommentaryServer:
+    """Runs many game sessions in one process, sharing bounded Gemini and ElevenLabs pools."""
+    def __init__(self, sessions, gemini_workers=GEMINI_WORKERS, tts_workers=ELEVENLABS_WORKERS, speakers=None):
+        self.gemini_pool = FairWorkPool("gemini", gemini_workers)
+        self.tts_pool = FairWorkPool("elevenlabs", tts_workers)
+        self.sessions = [
+            GameSession(
+                s["name"], self.gemini_pool, self.tts_pool,
+                lockfile=s.get("lockfile"),
+                host=s.get("host", LOCAL_API_HOST),
+                live_port=int(s.get("live_port", LIVE_CLIENT_PORT)),
+                # Only one session can own the speakers; the others run headless.
+                play=queue_audio if s["name"] == speakers else drain_audio,
+            )
+            for s in sessions
+        ]
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        for session in self.sessions:
+            session.start()
+
+    def stop(self):
+        for session in self.sessions:
+            session.stop()
+
+    def report(self):
+        """Returns a text report of throughput, pool load and per-session latency."""
+        minutes = max((time.monotonic() - self.started_at) / 60, 1e-9)
+        spoken = sum(s.pipeline.stats["spoken"] for s in self.sessions)
+        lines = [f"Throughput: {spoken / minutes:.1f} lines/min over {len(self.sessions)} sessions"]
+        for pool in (self.gemini_pool, self.tts_pool):
+            lines.append(
+                f"  pool {pool.name}: {pool.stats['busy']}/{pool.workers} busy, {pool.waiting} waiting, "
+                f"{pool.stats['completed']} done, {pool.stats['failed']} failed"
+            )
+        for limiter in (gemini_limiter, elevenlabs_limiter):
+            lines.append(
+                f"  quota {limiter.name}: {limiter.active}/{int(limiter.limit)} in flight, "
+                f"{limiter.stats['throttled']} throttled, {limiter.stats['retries']} retried, {limiter.stats['failed']} failed"
+            )
+        for s in self.sessions:
+            latencies = list(s.pipeline.latencies)
+            gemini = s.pipeline.commentator.commentator.stats
+            lines.append(
+                f"  {s.name}: phase={s.pipeline.phase} spoken={s.pipeline.stats['spoken']} "
+                f"in_flight={s.pipeline.in_flight} p50={percentile(latencies, 0.5):.2f}s p95={percentile(latencies, 0.95):.2f}s "
+                f"fallbacks={gemini['deadline']} late/{gemini['error']} failed"
+            )
+        return "\n".join(lines)
+
+    def run(self, report_interval=SERVER_REPORT_INTERVAL):
+        """Starts every session and prints a report periodically until interrupted."""
+        self.start()
+        try:
+            while True:
+                time.sleep(report_interval)
+                print(self.report())
+        except KeyboardInterrupt:
+            self.stop()
+
+def parse_game(spec):
+    """Parses NAME=LOCKFILE[@HOST:PORT] into a session description."""
+    name, _, rest = spec.partition("=")
+    session = {"name": name}
+    lockfile, _, endpoint = rest.partition("@")
+    if lockfile:
+        session["lockfile"] = lockfile
+    if endpoint:
+        host, _, live_port = endpoint.rpartition(":")
+        session["host"] = host or LOCAL_API_HOST
+        session["live_port"] = int(live_port)
+    return session
+
+# --- Program Entry Point ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Narrate several League games at once")
+    parser.add_argument("--game", action="append", default=[], metavar="NAME=LOCKFILE[@HOST:PORT]",
+                        help="a game session; the lockfile or the endpoint may be left out")
+    parser.add_argument("--sessions", help="JSON file with a list of {name, lockfile, host, live_port}")
+    parser.add_argument("--speakers", metavar="NAME", help="session to play on the local speakers")
+    args = parser.parse_args()
+
+    sessions = [parse_game(spec) for spec in args.game]
+    if args.sessions:
+        with open(args.sessions) as f:
+            sessions += json.load(f)
+    if not sessions:
+        parser.error("no game sessions given")
+
+    print(f"🚀 Starting commentary server for {len(sessions)} games...")
+    start_metrics_server()
+    CommentaryServer(sessions, speakers=args.speakers).run()
@@ -0,0 +1,139 @@
+import threading
+from config import TEMPLATE_EVENT_TYPES, TEMPLATE_MAX_BATCH
+from metrics import CAPTIONS
+from utils import describe_event
+
+# --- Caption Templates ---
+# Several lines per event type, used in rotation so repeated events don't sound canned.
+TEMPLATES = {
+    "GameStart": [
+        "And we are live! The game has officially begun!",
+        "Here we go, the battle for the Rift starts now!",
+        "The gates are open and the game is underway!",
+    ],
+    "MinionsSpawning": [
+        "Minions have spawned, the lanes are about to heat up!",
+        "The first waves are marching down the lanes!",
+        "Minions are out, time to see who wins the early trades!",
+    ],
+    "FirstBrick": [
+        "{KillerName} breaks the first brick of the game!",
+        "First turret plating is gone, courtesy of {KillerName}!",
+    ],
+    "TurretKilled": [
+        "{KillerName} takes down the {turret}!",
+        "Down goes the {turret}, great work from {KillerName}!",
+        "The {turret} falls, and {KillerName} opens up the map!",
+    ],
+    "InhibKilled": [
+        "{KillerName} destroys an inhibitor, super minions are coming!",
+        "The inhibitor is down, {KillerName} cracks the base wide open!",
+    ],
+    "InhibRespawningSoon": [
+        "An inhibitor is about to respawn.",
+    ],
+    "InhibRespawned": [
+        "The inhibitor is back up, the pressure eases off.",
+        "The inhibitor has respawned.",
+    ],
+    "HeraldKill": [
+        "{KillerName} secures the Rift Herald!",
+        "The Herald is taken by {KillerName}, expect a tower to fall soon!",
+    ],
+    "DragonKill": [
+        "{KillerName} secures the {DragonType} dragon!",
+        "The {DragonType} dragon falls to {KillerName}!",
+    ],
+    "BaronKill": [
+        "{KillerName} secures Baron Nashor, a huge swing!",
+        "Baron Nashor falls to {KillerName}, and the push is on!",
+    ],
+    "ChampionKill": [
+        "{KillerName} takes down {VictimName}!",
+        "{VictimName} goes down to {KillerName}!",
+        "What a play, {KillerName} eliminates {VictimName}!",
+    ],
+}
+
+def stock_lines():
+    """Template lines without fields, which always sound the same and can be synthesized ahead of time."""
+    return [line for options in TEMPLATES.values() for line in options if "{" not in line]
+
+LANES = {"L": "top", "C": "mid", "R": "bot"}
+TIERS = {"03": "outer", "02": "inner", "01": "inhibitor"}
+SIDES = {"T1": "blue side", "T2": "red side"}
+
+def describe_turret(turret_id):
+    """Turns an id like 'Turret_T1_L_03_A' into 'blue side top outer turret'."""
+    parts = str(turret_id).split("_")
+    if len(parts) < 4:
+        return "turret"
+    side = SIDES.get(parts[1], "")
+    lane = LANES.get(parts[2], "")
+    tier = TIERS.get(parts[3], "nexus")
+    return " ".join(word for word in (side, lane, tier, "turret") if word)
+
+class _Fields(dict):
+    """Template fields that read missing keys as '?' instead of raising."""
+    def __missing__(self, key):
+        return "?"
+
+# --- Rule-Driven Caption Engine ---
+class TemplateCaptioner:
+    """
+    Answers routine event batches locally from rotating template lines and
+    leaves batches that need real narration to the LLM. Counts how many
+    events took each path.
+    """
+    def __init__(self, event_types=TEMPLATE_EVENT_TYPES, max_batch=TEMPLATE_MAX_BATCH):
+        # Event types that may be captioned from templates, and the largest batch handled locally.
+        self.event_types = set(event_types)
+        self.max_batch = max_batch
+        self.stats = {"template": 0, "llm": 0}
+        self._next_line = {}
+        self._lock = threading.Lock()
+
+    def can_handle(self, events):
+        """Whether every event in the batch is routine enough for a template."""
+        return (
+            0 < len(events) <= self.max_batch
+            and all(e.get("EventName") in self.event_types and e.get("EventName") in TEMPLATES for e in events)
+        )
+
+    def caption(self, events):
+        """Builds a caption for the batch from the next template line of each event type."""
+        lines = []
+        with self._lock:
+            for e in events:
+                etype = e["EventName"]
+                options = TEMPLATES[etype]
+                index = self._next_line.get(etype, 0)
+                self._next_line[etype] = (index + 1) % len(options)
+                fields = _Fields(e)
+                fields["turret"] = describe_turret(e.get("TurretKilled"))
+                lines.append(options[index].format_map(fields))
+        return " ".join(lines)
+
+    def fallback(self, events):
+        """
+        Builds a caption for any batch, for when the LLM can't answer in time:
+        template lines where there are some, the event description otherwise.
+        """
+        lines = []
+        for e in events:
+            if e.get("EventName") in TEMPLATES and "Summary" not in e:
+                lines.append(self.caption([e]))
+            else:
+                desc = describe_event(e).rstrip(".!")
+                lines.append(f"{desc[:1].upper()}{desc[1:]}!")
+        return " ".join(lines)
+
+    def route(self, events):
+        """Returns a template caption for a routine batch, or None if it should go to the LLM."""
+        if self.can_handle(events):
+            self.stats["template"] += len(events)
+            CAPTIONS.inc(len(events), source="template")
+            return self.caption(events)
+        self.stats["llm"] += len(events)
+        CAPTIONS.inc(len(events), source="llm")
+        return None
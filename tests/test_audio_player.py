@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from audio_player import AudioEngine, AudioStream
+from metrics import AUDIO_PREEMPTED, AUDIO_DROPPED, AUDIO_SECONDS_SAVED
+
+class FakeChannel:
+    """Stands in for the pygame channel; idle as soon as it is faded out."""
+    def fadeout(self, ms):
+        pass
+
+    def get_busy(self):
+        return False
+
+    def stop(self):
+        pass
+
+def _clip(seconds):
+    return AudioStream.from_bytes(b"\x00\x00" * int(22050 * seconds))
+
+def _counts():
+    return AUDIO_PREEMPTED._values.get((), 0), AUDIO_DROPPED._values.get((), 0), AUDIO_SECONDS_SAVED._values.get((), 0.0)
+
+def test_preemption_is_exported_as_metrics():
+    before = _counts()
+    engine = AudioEngine(preempt_min_priority=3, fade_ms=0)
+    engine._channel = FakeChannel()
+    playing, waiting = _clip(4.0), _clip(2.0)
+    playing.playback_started_at = time.monotonic() - 1.0
+    engine._pending = [(object(), Future(), playing, 1)]
+    dropped = Future()
+    engine._clips.put((-1, 0, waiting, dropped))
+    engine._preempt(3)
+    assert playing.interrupted and dropped.cancelled()
+    preempted, dropped_clips, saved = (after - b for after, b in zip(_counts(), before))
+    assert (preempted, dropped_clips) == (1, 1)
+    assert 4.5 < saved <= 5.0
+    assert engine.stats["seconds_saved"] == pytest.approx(saved)
@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(*args):
+    return subprocess.run([sys.executable, "benchmark.py", *args], cwd=ROOT, capture_output=True, text=True, timeout=60)
+
+def test_unknown_scenarios_are_rejected():
+    result = _run("latency", "nope")
+    assert result.returncode == 2
+    assert "unknown scenarios: nope" in result.stderr
@@ -0,0 +1,35 @@
+from audio_player import AudioStream
+from broadcast import Broadcaster, BLOCK_BYTES
+
+def _clip(seconds, text):
+    return AudioStream.from_bytes(b"\x01\x00" * int(22050 * seconds), text=text)
+
+def _pump(broadcaster, blocks):
+    for _ in range(blocks):
+        broadcaster._next_block()
+
+def test_critical_clip_drops_stale_waiting_clips():
+    broadcaster = Broadcaster(port=0)
+    playing = broadcaster.play(_clip(1.0, "Long kill line"), priority=1)
+    _pump(broadcaster, 2)
+    stale = broadcaster.play(_clip(0.5, "Old kill"), priority=1)
+    filler = broadcaster.play(_clip(0.5, "Filler"), priority=0)
+    baron = broadcaster.play(_clip(0.2, "Baron!"), priority=3)
+    _pump(broadcaster, 1)
+    assert playing.result(0).interrupted
+    for future in (stale, filler):
+        assert future.done() and future.result().interrupted
+    assert broadcaster._current[0].text == "Baron!"
+    assert broadcaster._clips.empty()
+    _pump(broadcaster, 5)
+    assert baron.done() and not baron.result().interrupted
+    assert broadcaster.stats["dropped"] == 2
+
+def test_clips_play_in_full_without_preemption():
+    broadcaster = Broadcaster(port=0)
+    first = broadcaster.play(_clip(0.25, "First"), priority=1)
+    second = broadcaster.play(_clip(0.25, "Second"), priority=1)
+    _pump(broadcaster, 8)
+    assert not first.result(0).interrupted and not second.result(0).interrupted
+    assert broadcaster.stats["dropped"] == 0
+    assert len(broadcaster._next_block()) == BLOCK_BYTES
@@ -0,0 +1,17 @@
+import threading
+
+from chat_history import ChatHistory
+
+def test_concurrent_turns_are_neither_lost_nor_duplicated():
+    history = ChatHistory(max_tokens=10**9, max_turns=5, summary_max_chars=10**9)
+    threads = [
+        threading.Thread(target=lambda t=t: [history.add_turn(f"prompt {t}-{i}", f"Line {t}-{i}.") for i in range(300)])
+        for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    said = history.summary_lines + [model for _, model in history.turns]
+    assert len(history.turns) == 5
+    assert sorted(said) == sorted(f"Line {t}-{i}." for t in range(8) for i in range(300))
@@ -0,0 +1,15 @@
+from event_scheduler import EventScheduler, PRIORITY_CRITICAL, PRIORITY_HIGH
+
+def _event(name, time, **fields):
+    return dict(EventName=name, EventID=int(time), EventTime=time, **fields)
+
+def test_late_critical_events_are_kept_within_their_own_bound():
+    scheduler = EventScheduler(max_lag=20, max_lag_critical=60)
+    plan = scheduler.plan([_event("BaronKill", 950.0), _event("DragonKill", 950.0)], game_time=1000.0)
+    assert plan == [(PRIORITY_CRITICAL, [_event("BaronKill", 950.0)])]
+
+def test_critical_events_from_long_ago_are_dropped():
+    scheduler = EventScheduler(max_lag=20, max_lag_critical=60)
+    events = [_event("BaronKill", 900.0), _event("DragonKill", 900.0, DragonType="Elder"), _event("TurretKilled", 995.0)]
+    assert scheduler.plan(events, game_time=1000.0) == [(PRIORITY_HIGH, [_event("TurretKilled", 995.0)])]
+    assert scheduler.stats["dropped_stale"] == 2
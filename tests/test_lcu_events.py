@@ -0,0 +1,79 @@
+import time
+import types
+
+import pytest
+
+from lcu_events import LCUEventListener, GAMEFLOW_PHASE_EVENT, CHAMP_SELECT_EVENT
+from mock_server import MockLeagueServer, Replay
+
+SESSION = {"myTeam": [{"cellId": 0, "championId": 266}], "theirTeam": [{"cellId": 5, "championId": 103}]}
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+@pytest.fixture
+def lcu(tmp_path):
+    """The mock LCU over plain HTTP, with nothing recorded, so only published events are pushed."""
+    server = MockLeagueServer(Replay([]), live_port=0, lockfile=str(tmp_path / "lockfile"), use_tls=False)
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def listener(lcu):
+    client = types.SimpleNamespace(lcu_websocket_url=lambda: f"ws://127.0.0.1:{lcu.lcu_port}/", password="secret")
+    listener = LCUEventListener(client=client, reconnect_delay=0.05)
+    listener.start()
+    _wait_for(lambda: lcu.hub.subscribed(GAMEFLOW_PHASE_EVENT) and lcu.hub.subscribed(CHAMP_SELECT_EVENT))
+    yield listener
+    listener.stop()
+
+def test_pushes_update_phase_and_champ_select(lcu, listener):
+    phases = []
+    listener.on_phase = phases.append
+    lcu.hub.publish(GAMEFLOW_PHASE_EVENT, "ChampSelect")
+    _wait_for(lambda: listener.phase == "ChampSelect")
+    assert phases == ["ChampSelect"]
+    assert listener.connected
+
+    lcu.hub.publish(CHAMP_SELECT_EVENT, SESSION)
+    _wait_for(lambda: listener.champ_select_session == SESSION)
+
+    # The end of champ select deletes the session; the last full one is kept.
+    lcu.hub.publish(CHAMP_SELECT_EVENT, None, event_type="Delete")
+    lcu.hub.publish(GAMEFLOW_PHASE_EVENT, "InProgress")
+    _wait_for(lambda: listener.phase == "InProgress")
+    assert listener.champ_select_session == SESSION
+
+def test_reconnects_and_subscribes_again(lcu, listener):
+    lcu.hub.disconnect_all()
+    _wait_for(lambda: not listener.connected or lcu.hub.subscribed(GAMEFLOW_PHASE_EVENT) == 0)
+    _wait_for(lambda: listener.connected and lcu.hub.subscribed(GAMEFLOW_PHASE_EVENT) == 1)
+    lcu.hub.publish(GAMEFLOW_PHASE_EVENT, "EndOfGame")
+    _wait_for(lambda: listener.phase == "EndOfGame")
+
+def test_replay_changes_are_pushed(tmp_path):
+    # Recorded after the listener has had time to subscribe.
+    records = [
+        {"t": 0.5, "api": "lcu", "path": "/lol-gameflow/v1/gameflow-phase", "status": 200, "body": "ChampSelect"},
+        {"t": 0.5, "api": "lcu", "path": "/lol-champ-select/v1/session", "status": 200, "body": SESSION},
+        {"t": 0.8, "api": "lcu", "path": "/lol-gameflow/v1/gameflow-phase", "status": 200, "body": "InProgress"},
+    ]
+    server = MockLeagueServer(Replay(records), live_port=0, lockfile=str(tmp_path / "lockfile"), use_tls=False, push_interval=0.02)
+    server.start()
+    client = types.SimpleNamespace(lcu_websocket_url=lambda: f"ws://127.0.0.1:{server.lcu_port}/", password="secret")
+    listener = LCUEventListener(client=client, reconnect_delay=0.05)
+    phases = []
+    listener.on_phase = phases.append
+    listener.start()
+    try:
+        _wait_for(lambda: listener.phase == "InProgress")
+        assert phases == ["ChampSelect", "InProgress"]
+        assert listener.champ_select_session == SESSION
+    finally:
+        listener.stop()
+        server.stop()
@@ -0,0 +1,41 @@
+import threading
+import types
+
+import pytest
+
+import llm_commentator
+from llm_commentator import LeagueCommentator, FALLBACK_CAPTION
+
+class StallingModel:
+    """Streams the given chunks, then hangs until released, like a stalled connection."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.release = threading.Event()
+
+    def generate_content(self, contents, stream=False):
+        for text in self.chunks:
+            yield types.SimpleNamespace(text=text)
+        self.release.wait()
+
+@pytest.fixture
+def stalling(monkeypatch):
+    monkeypatch.setattr(llm_commentator, "GEMINI_STREAM_IDLE_TIMEOUT", 0.2)
+    models = []
+
+    def commentator(chunks):
+        c = LeagueCommentator()
+        c._model = StallingModel(chunks)
+        models.append(c._model)
+        return c
+    yield commentator
+    for model in models:
+        model.release.set()
+
+def test_stream_that_stalls_after_a_sentence_ends_and_keeps_it(stalling):
+    c = stalling(["What a play by the jungler there! ", "And now"])
+    assert list(c.stream_caption_from_gemini("Baron taken")) == ["What a play by the jungler there!"]
+    assert c.history.turns[-1][1] == "What a play by the jungler there!"
+
+def test_stream_that_stalls_before_a_sentence_falls_back(stalling):
+    c = stalling([])
+    assert list(c.stream_caption_from_gemini("Baron taken")) == [FALLBACK_CAPTION]
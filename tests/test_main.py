@@ -0,0 +1,70 @@
+import threading
+import types
+
+import broadcast
+import main
+
+class FakeBroadcaster:
+    built = []
+
+    def __init__(self):
+        self.started = False
+        FakeBroadcaster.built.append(self)
+
+    def start(self):
+        self.started = True
+
+    def play(self, stream, priority=0):
+        return None
+
+class FakePipeline:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        FakePipeline.last = self
+
+    def run(self):
+        pass
+
+warmed = []
+
+def _stub_pipeline(monkeypatch):
+    FakeBroadcaster.built = []
+    warmed.clear()
+    monkeypatch.setattr(broadcast, "Broadcaster", FakeBroadcaster)
+    monkeypatch.setattr(main, "CommentaryPipeline", FakePipeline)
+    monkeypatch.setattr(main, "LeagueCommentator", lambda: object())
+    monkeypatch.setattr(main, "FillerPool", lambda *args: object())
+    monkeypatch.setattr(main, "warm_up", lambda commentator, client, broadcast=False: warmed.append(broadcast))
+    monkeypatch.setattr(main, "start_metrics_server", lambda: None)
+    monkeypatch.setattr(main, "USE_LCU_WEBSOCKET", False)
+
+def test_broadcast_flag_builds_broadcaster(monkeypatch):
+    _stub_pipeline(monkeypatch)
+    main.main(["--broadcast"])
+    assert len(FakeBroadcaster.built) == 1
+    broadcaster = FakeBroadcaster.built[0]
+    assert broadcaster.started
+    assert FakePipeline.last.kwargs["play"] == broadcaster.play
+    assert warmed == [True]
+
+def test_default_plays_on_speakers(monkeypatch):
+    _stub_pipeline(monkeypatch)
+    main.main([])
+    assert FakeBroadcaster.built == []
+    assert FakePipeline.last.kwargs["play"] is main.queue_audio
+    assert warmed == [False]
+
+def _warm_up(monkeypatch, broadcast):
+    opened = []
+    done = threading.Event()
+    monkeypatch.setattr(main, "audio_engine", types.SimpleNamespace(start=lambda: opened.append(True)))
+    monkeypatch.setattr(main, "warm_tts_connection", lambda: None)
+    monkeypatch.setattr(main, "warm_audio_cache", lambda lines: done.set())
+    noop = types.SimpleNamespace(warm_up=lambda: None)
+    main.warm_up(noop, noop, broadcast=broadcast)
+    assert done.wait(5)
+    return opened
+
+def test_broadcast_warm_up_leaves_the_audio_device_closed(monkeypatch):
+    assert _warm_up(monkeypatch, broadcast=True) == []
+    assert _warm_up(monkeypatch, broadcast=False) == [True]
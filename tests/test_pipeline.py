@@ -0,0 +1,100 @@
+import types
+
+import pipeline
+from pipeline import CommentaryPipeline
+
+class FakeLiveOnlyClient:
+    """A client without an LCU connection whose Live Client API answers only while in_game."""
+    port = None
+
+    def __init__(self):
+        self.in_game = True
+        self.reachable = {"lcu": False, "live": False}
+
+    def game_stats(self, client=None):
+        self.reachable["live"] = self.in_game
+        return {"gameTime": 100.0} if self.in_game else {}
+
+class FakeContext:
+    teams_info = {}
+    champ_select_done = True
+
+    def __init__(self):
+        self.resets = 0
+
+    def reset_game(self):
+        self.resets += 1
+
+    def get_new_events(self):
+        return []
+
+def _pipeline(monkeypatch, client):
+    monkeypatch.setattr(pipeline, "get_game_stats", client.game_stats)
+    monkeypatch.setattr(pipeline, "get_game_snapshot", lambda client=None: None)
+    history = types.SimpleNamespace(resets=0)
+    history.reset = lambda: setattr(history, "resets", history.resets + 1)
+    commentator = types.SimpleNamespace(history=history)
+    return CommentaryPipeline(commentator, synthesize=None, play=None, ctx=FakeContext(), client=client,
+                              timeline=types.SimpleNamespace(reset=lambda: None, append=lambda s: None, context=lambda: ""))
+
+def test_live_only_client_resets_between_games(monkeypatch):
+    client = FakeLiveOnlyClient()
+    p = _pipeline(monkeypatch, client)
+    assert p.poll_once() == (False, True)
+    assert p.phase == "InProgress"
+
+    client.in_game = False
+    assert p.poll_once() == (False, False)
+    assert p.phase == "None"
+    assert p.ctx.resets == 1
+    assert p.commentator.history.resets == 1
+
+    client.in_game = True
+    p.poll_once()
+    assert p.phase == "InProgress"
+    assert p.ctx.resets == 1
+
+class FakeDeltas:
+    def __init__(self):
+        self.updates = 0
+
+    def update(self, snapshot):
+        self.updates += 1
+        return "Gold swing of 1500 for ORDER."
+
+    def reset(self):
+        pass
+
+class FakeFiller:
+    commentator = None
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def update(self, snapshot=None, teams_info=None):
+        pass
+
+    def take(self):
+        return self.lines.pop(0) if self.lines else None
+
+    def set_quiet(self, quiet):
+        pass
+
+def test_changes_during_filler_are_narrated_afterwards(monkeypatch):
+    client = FakeLiveOnlyClient()
+    p = _pipeline(monkeypatch, client)
+    p.commentator.history.add_turn = lambda prompt, text: None
+    p.deltas = FakeDeltas()
+    line = types.SimpleNamespace(prompt="filler", text="What a quiet game.", audio=b"pcm")
+    p.filler = FakeFiller([line])
+
+    p.poll_once()
+    # The filler line plays and the changes stay for the next idle line.
+    assert p.deltas.updates == 0
+    assert p.playback_queue.get_nowait().payload == b"pcm"
+    assert p.caption_queue.empty()
+
+    p.in_flight = 0
+    p.poll_once()
+    assert p.deltas.updates == 1
+    assert "Gold swing" in p.caption_queue.get_nowait().payload
@@ -0,0 +1,21 @@
+import time
+
+from rate_limit import RateLimiter
+
+def test_missed_quota_returns_the_request_token_and_keeps_the_cap():
+    limiter = RateLimiter("test", requests_per_minute=60, units_per_minute=60, max_concurrency=4)
+    limiter.limit = 2.0
+    limiter.units.drain()
+    tokens = limiter.requests._tokens
+    assert not limiter.acquire(units=10, deadline=time.monotonic() + 0.05)
+    assert limiter.active == 0
+    assert limiter.limit == 2.0
+    assert limiter.requests._tokens >= tokens
+    assert limiter.stats["requests"] == 0
+
+def test_sent_request_grows_the_cap():
+    limiter = RateLimiter("test", max_concurrency=4)
+    limiter.limit = 2.0
+    assert limiter.call(lambda: "ok") == "ok"
+    assert limiter.active == 0
+    assert limiter.limit == 2.5
@@ -0,0 +1,13 @@
+from metrics import CAPTIONS
+from template_captions import TemplateCaptioner
+
+def _captions():
+    return {source: CAPTIONS._values.get((source,), 0) for source in ("template", "llm")}
+
+def test_routing_is_counted_by_source():
+    before = _captions()
+    captioner = TemplateCaptioner(event_types=["GameStart"], max_batch=2)
+    assert captioner.route([{"EventName": "GameStart"}])
+    assert captioner.route([{"EventName": "ChampionKill"}, {"EventName": "ChampionKill"}]) is None
+    after = _captions()
+    assert {source: after[source] - before[source] for source in after} == {"template": 1, "llm": 2}
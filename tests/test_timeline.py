@@ -0,0 +1,29 @@
+from data_fetcher import GameSnapshot
+from timeline import GameTimeline
+
+def _player(name, team, kills=0, gold=0):
+    return {"riotIdGameName": name, "championName": name.title(), "team": team,
+            "scores": {"kills": kills}, "items": [{"price": gold, "count": 1}]}
+
+def _snapshot(time, players, events=()):
+    return GameSnapshot({}, players, list(events), {"gameTime": time})
+
+def test_ring_buffer_keeps_the_last_ticks_and_counts_objectives_once():
+    timeline = GameTimeline(capacity=4)
+    dragon = {"EventID": 1, "EventName": "DragonKill", "KillerName": "blue"}
+    for tick in range(6):
+        players = [_player("blue", "ORDER", gold=1000 * tick), _player("red", "CHAOS")]
+        timeline.append(_snapshot(30.0 * tick, players, [dragon]))
+    assert len(timeline) == 4
+    times, diff = timeline.team_gold_diff()
+    assert times.tolist() == [60.0, 90.0, 120.0, 150.0]
+    assert diff.tolist() == [2000, 3000, 4000, 5000]
+    assert timeline.objective_control()["ORDER"]["dragons"] == 1
+    assert "Objectives so far: ORDER 1 dragon." in timeline.context()
+
+def test_clock_running_backwards_starts_a_new_game():
+    timeline = GameTimeline(capacity=4)
+    timeline.append(_snapshot(600.0, [_player("blue", "ORDER", kills=5)]))
+    timeline.append(_snapshot(10.0, [_player("red", "CHAOS")]))
+    assert len(timeline) == 1
+    assert list(timeline.slots) == ["red"]
@@ -0,0 +1,15 @@
+from metrics import TTS_CACHE_LOOKUPS
+from tts_cache import AudioCache
+
+def _lookups():
+    return {result: TTS_CACHE_LOOKUPS._values.get((result,), 0) for result in ("memory", "disk", "miss")}
+
+def test_lookups_are_counted_by_level(tmp_path):
+    before = _lookups()
+    cache = AudioCache(directory=str(tmp_path), memory_bytes=1024, disk_bytes=4096)
+    assert cache.get("line") is None
+    cache.put("line", b"pcm")
+    assert cache.get("line") == b"pcm"
+    assert AudioCache(directory=str(tmp_path)).get("line") == b"pcm"
+    after = _lookups()
+    assert {result: after[result] - before[result] for result in after} == {"memory": 1, "disk": 1, "miss": 1}
@@ -0,0 +1,78 @@
+import utils
+from utils import LoLContext
+
+class FakeLiveClient:
+    """Serves one game's events through the eventID cursor, like the Live Client API."""
+    def __init__(self, events):
+        self.events = events
+        self.online = True
+
+    def event_data(self, event_id=None, client=None):
+        if not self.online:
+            return {}
+        return {"Events": [e for e in self.events if e["EventID"] >= (event_id or 0)]}
+
+def _game(count, start=0.0):
+    return [{"EventID": i, "EventName": "ChampionKill", "EventTime": start + 10.0 * i} for i in range(count)]
+
+def _serve(monkeypatch, live):
+    monkeypatch.setattr(utils, "get_event_data", live.event_data)
+
+def test_incremental_returns_only_new_events(monkeypatch):
+    live = FakeLiveClient(_game(3))
+    _serve(monkeypatch, live)
+    ctx = LoLContext()
+    assert [e["EventID"] for e in ctx.get_new_events()] == [0, 1, 2]
+    assert ctx.get_new_events() == []
+    live.events = _game(5)
+    assert [e["EventID"] for e in ctx.get_new_events()] == [3, 4]
+
+def test_new_game_with_fewer_events_is_read_from_the_start(monkeypatch):
+    live = FakeLiveClient(_game(6))
+    _serve(monkeypatch, live)
+    ctx = LoLContext()
+    ctx.get_new_events()
+    # The next game has only reached EventID 2, below the old cursor.
+    live.events = _game(3, start=1.0)
+    assert [e["EventID"] for e in ctx.get_new_events()] == [0, 1, 2]
+
+def test_new_game_with_more_events_is_read_from_the_start(monkeypatch):
+    live = FakeLiveClient(_game(3))
+    _serve(monkeypatch, live)
+    ctx = LoLContext()
+    ctx.get_new_events()
+    live.events = _game(5, start=0.5)
+    assert [e["EventID"] for e in ctx.get_new_events()] == [0, 1, 2, 3, 4]
+
+def test_failed_request_keeps_the_cursor(monkeypatch):
+    live = FakeLiveClient(_game(3))
+    _serve(monkeypatch, live)
+    ctx = LoLContext()
+    ctx.get_new_events()
+    live.online = False
+    assert ctx.get_new_events() == []
+    live.online = True
+    live.events = _game(4)
+    assert [e["EventID"] for e in ctx.get_new_events()] == [3]
+
+SUMMARY = [{"id": 266, "name": "Aatrox"}, {"id": 103, "name": "Ahri"}]
+
+def test_champ_select_picks_get_champion_names(monkeypatch):
+    fetches = []
+    monkeypatch.setattr(utils, "get_champion_summary", lambda client=None: fetches.append(1) or SUMMARY)
+    ctx = LoLContext()
+    ctx.update_champ_select({"myTeam": [{"championId": 266, "assignedPosition": "top"}],
+                             "theirTeam": [{"championId": 103, "assignedPosition": "middle"}, {"championId": 0}]})
+    assert ctx.teams_info["myTeam"][0]["championName"] == "Aatrox"
+    assert ctx.teams_info["theirTeam"][0]["championName"] == "Ahri"
+    assert "championName" not in ctx.teams_info["theirTeam"][1]
+    ctx.update_champ_select({"myTeam": [{"championId": 266}], "theirTeam": []})
+    assert len(fetches) == 1
+
+def test_champ_select_filler_waits_for_names():
+    from filler import filler_topics
+    named = {"myTeam": [{"championId": 266, "championName": "Aatrox", "assignedPosition": "top"}]}
+    topic = filler_topics(teams_info=named)["champselect:myTeam"]
+    assert "top: Aatrox" in topic[1] and "#" not in topic[1]
+    unnamed = {"myTeam": [{"championId": 266, "assignedPosition": "top"}]}
+    assert "champselect:myTeam" not in filler_topics(teams_info=unnamed)
@@ -0,0 +1,200 @@
+import numpy as np
+from config import TIMELINE_CAPACITY, TIMELINE_SPILL_PATH
+
+# --- Timeline Columns ---
+# Per-player stats stored every tick, in column order.
+STATS = ("level", "kills", "deaths", "assists", "creep_score", "item_gold")
+LEVEL, KILLS, DEATHS, ASSISTS, CREEP_SCORE, ITEM_GOLD = range(len(STATS))
+# Objectives counted per team from the event feed, in column order.
+OBJECTIVES = ("dragons", "barons", "heralds", "turrets", "inhibitors")
+OBJECTIVE_EVENTS = {"DragonKill": 0, "BaronKill": 1, "HeraldKill": 2, "TurretKilled": 3, "InhibKilled": 4}
+TEAMS = ("ORDER", "CHAOS")
+MAX_PLAYERS = 10
+
+def _player_row(player):
+    """The STATS values of one allPlayers entry."""
+    scores = player.get("scores", {})
+    item_gold = sum(item.get("price", 0) * item.get("count", 1) for item in player.get("items", []))
+    return (
+        player.get("level", 0), scores.get("kills", 0), scores.get("deaths", 0),
+        scores.get("assists", 0), scores.get("creepScore", 0), item_gold,
+    )
+
+def _amount(count, objective):
+    """'1 dragon', '2 dragons'."""
+    return f"{count} {objective[:-1] if count == 1 else objective}"
+
+# --- Game Timeline ---
+class GameTimeline:
+    """
+    Columnar history of the current game: one row per tick holding the game
+    clock, every player's STATS and each team's objective count, in a ring
+    buffer of fixed capacity. Appending costs the same at minute 1 and minute
+    60, and queries work on whole columns with NumPy instead of raw JSON.
+
+    With spill_path the columns live in a memory-mapped file instead of RAM,
+    so a capacity covering a whole game costs little resident memory.
+    """
+    def __init__(self, capacity=TIMELINE_CAPACITY, spill_path=TIMELINE_SPILL_PATH):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.times = self._column("times", (capacity,), np.float64)
+        self.stats = self._column("stats", (capacity, MAX_PLAYERS, len(STATS)), np.int32)
+        self.objectives = self._column("objectives", (capacity, len(TEAMS), len(OBJECTIVES)), np.int16)
+        self.reset()
+
+    def _column(self, name, shape, dtype):
+        if not self.spill_path:
+            return np.zeros(shape, dtype)
+        return np.memmap(f"{self.spill_path}.{name}", dtype=dtype, mode="w+", shape=shape)
+
+    def reset(self):
+        """Forgets the game, e.g. when a new one starts."""
+        # Rows appended so far; the newest row is at (count - 1) % capacity.
+        self.count = 0
+        # Player name -> column, and each column's team (0 ORDER, 1 CHAOS).
+        self.slots = {}
+        self.labels = [""] * MAX_PLAYERS
+        self.teams = np.zeros(MAX_PLAYERS, np.int8)
+        self._objective_totals = np.zeros((len(TEAMS), len(OBJECTIVES)), np.int16)
+        self._last_event_id = -1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # --- Appending ---
+    def append(self, snapshot):
+        """Adds one tick from a GameSnapshot. A clock running backwards means a new game started."""
+        if not snapshot:
+            return
+        if self.count and snapshot.game_time < self.times[(self.count - 1) % self.capacity]:
+            self.reset()
+        row = self.count % self.capacity
+        self.times[row] = snapshot.game_time
+        # Players who left keep their last values rather than dropping to zero.
+        if self.count:
+            self.stats[row] = self.stats[(self.count - 1) % self.capacity]
+        for player in snapshot.players:
+            slot = self._slot(player)
+            if slot is not None:
+                self.stats[row, slot] = _player_row(player)
+        # After the players, so a killer seen for the first time has a team.
+        self._count_objectives(snapshot.events)
+        self.objectives[row] = self._objective_totals
+        self.count += 1
+
+    def _slot(self, player):
+        name = player.get("riotIdGameName") or player.get("summonerName", "Unknown Summoner")
+        slot = self.slots.get(name)
+        if slot is None and len(self.slots) < MAX_PLAYERS:
+            slot = self.slots[name] = len(self.slots)
+            self.labels[slot] = f"{name} ({player.get('championName', 'Unknown Champion')})"
+            self.teams[slot] = 1 if player.get("team") == TEAMS[1] else 0
+        return slot
+
+    def _count_objectives(self, events):
+        """Adds objectives from events not seen before to the running team totals."""
+        for event in events:
+            event_id = event.get("EventID", -1)
+            if event_id <= self._last_event_id:
+                continue
+            self._last_event_id = event_id
+            column = OBJECTIVE_EVENTS.get(event.get("EventName"))
+            team = self._objective_team(event)
+            if column is not None and team is not None:
+                self._objective_totals[team, column] += 1
+
+    def _objective_team(self, event):
+        """Index of the team that took an objective, or None if it can't be told."""
+        # Structures are named after their owner, e.g. Turret_T1_L_03_A is ORDER's, so CHAOS took it.
+        structure = str(event.get("TurretKilled") or event.get("InhibKilled") or "")
+        if "_T1_" in structure:
+            return 1
+        if "_T2_" in structure:
+            return 0
+        slot = self.slots.get(event.get("KillerName"))
+        return None if slot is None else int(self.teams[slot])
+
+    # --- Queries ---
+    def _rows(self, seconds=None):
+        """Ring indices of the stored rows in time order, limited to the last seconds of game time."""
+        n = len(self)
+        rows = (np.arange(self.count - n, self.count)) % self.capacity
+        if seconds is not None and n:
+            rows = rows[self.times[rows] >= self.times[rows[-1]] - seconds]
+        return rows
+
+    def team_gold_diff(self, seconds=None):
+        """(times, ORDER item gold minus CHAOS item gold) for each stored tick."""
+        rows = self._rows(seconds)
+        sign = np.where(self.teams == 0, 1, -1)
+        sign[len(self.slots):] = 0
+        return self.times[rows], (self.stats[rows, :, ITEM_GOLD] * sign).sum(axis=1)
+
+    def gold_momentum(self, seconds=60):
+        """Change in ORDER's gold lead per minute over the window, from a least-squares fit."""
+        times, diff = self.team_gold_diff(seconds)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        slope = np.polyfit(times, diff.astype(np.float64), 1)[0]
+        return float(slope * 60)
+
+    def kda_trend(self, seconds=60):
+        """Kills, deaths and assists gained by each player over the window, as a (players, 3) array."""
+        rows = self._rows(seconds)
+        if not len(rows):
+            return np.zeros((len(self.slots), 3), np.int32)
+        window = self.stats[rows][:, :len(self.slots), KILLS:ASSISTS + 1]
+        return window[-1] - window[0]
+
+    def objective_control(self):
+        """Objectives taken so far, as {team: {objective: count}}."""
+        totals = self.objectives[(self.count - 1) % self.capacity] if self.count else self._objective_totals
+        return {team: dict(zip(OBJECTIVES, totals[i].tolist())) for i, team in enumerate(TEAMS)}
+
+    def changes(self, seconds=60):
+        """Lines describing what changed over the last seconds of game time, most telling first."""
+        rows = self._rows(seconds)
+        if len(rows) < 2:
+            return []
+        first, last = rows[0], rows[-1]
+        span = int(self.times[last] - self.times[first])
+        lines = []
+
+        times, diff = self.team_gold_diff(seconds)
+        swing = int(diff[-1] - diff[0])
+        if swing:
+            leader = TEAMS[0] if diff[-1] >= 0 else TEAMS[1]
+            lines.append(f"Team {leader} leads by {abs(int(diff[-1]))} item gold, a {swing:+d} swing for ORDER in the last {span}s.")
+
+        taken = self.objectives[last] - self.objectives[first]
+        for team, objective in zip(*np.nonzero(taken)):
+            lines.append(f"Team {TEAMS[team]} took {_amount(taken[team, objective], OBJECTIVES[objective])} in the last {span}s.")
+
+        players = len(self.slots)
+        delta = self.stats[last, :players] - self.stats[first, :players]
+        # Players who got at least two kills or deaths in the window, biggest movers first.
+        involvement = delta[:, KILLS] + delta[:, DEATHS]
+        for slot in np.argsort(-involvement):
+            if involvement[slot] < 2:
+                break
+            k, d, a = delta[slot, KILLS:ASSISTS + 1]
+            lines.append(f"{self.labels[slot]} went +{k}/+{d}/+{a} in the last {span}s.")
+        return lines
+
+    def context(self, seconds=60):
+        """A short summary of the game so far and the last seconds of it, for the LLM prompt."""
+        if not self.count:
+            return ""
+        control = self.objective_control()
+        objectives = "; ".join(
+            f"{team} " + ", ".join(_amount(count, name) for name, count in taken.items() if count)
+            for team, taken in control.items() if any(taken.values())
+        )
+        lines = []
+        if objectives:
+            lines.append(f"Objectives so far: {objectives}.")
+        momentum = self.gold_momentum(seconds)
+        if abs(momentum) >= 100:
+            lines.append(f"Gold momentum: {TEAMS[0] if momentum > 0 else TEAMS[1]} gaining {abs(int(momentum))} gold a minute.")
+        return "\n".join(lines + self.changes(seconds))
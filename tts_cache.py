@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from config import TTS_CACHE_DIR, TTS_CACHE_MEMORY_BYTES, TTS_CACHE_DISK_BYTES
+from metrics import TTS_CACHE_LOOKUPS
+
+def cache_key(text, voice_id, model_id, output_format):
+    """Content address of a synthesized line: any change to text, voice, model or format is a new entry."""
+    raw = "\x1f".join(str(part) for part in (text, voice_id, model_id, output_format))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# --- Content-Addressed TTS Cache ---
+class AudioCache:
+    """
+    Two-level cache of synthesized audio: a size-bounded in-memory LRU in front
+    of a size-bounded directory on disk. Both levels evict least recently used
+    entries first.
+    """
+    def __init__(self, directory=TTS_CACHE_DIR, memory_bytes=TTS_CACHE_MEMORY_BYTES, disk_bytes=TTS_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached audio for key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                TTS_CACHE_LOOKUPS.inc(result="memory")
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.stats["misses"] += 1
+                TTS_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self.stats["disk_hits"] += 1
+            TTS_CACHE_LOOKUPS.inc(result="disk")
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        """Stores audio under key in memory and on disk."""
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    # --- Memory Level ---
+    def _remember(self, key, data):
+        """Adds an entry to the in-memory LRU and evicts the oldest entries over budget. Caller holds the lock."""
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_used -= len(old)
+
+    # --- Disk Level ---
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # The modification time doubles as the last-used time for disk eviction.
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            # Created on first write, so an unused cache leaves no trace.
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Could not write TTS cache entry: {e}")
+
+    def _evict_disk(self):
+        """Deletes the least recently used files until the directory fits its budget."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pcm"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                used -= size
+            except OSError:
+                pass
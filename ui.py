@@ -1,10 +1,11 @@
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import os
-import subprocess
-import threading
 import logging
 
+from config import UI_SCROLLBACK_LINES, UI_REFRESH_MS, UI_MAX_LINES_PER_REFRESH
+from dashboard import CommentatorProcess, MetricsPoller, MAIN_PATH
+
 # Set up logging for debugging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -57,8 +58,23 @@ def toggle_api_key_visibility(entry, button):
     entry.configure(show="" if current_show == "*" else "*")
     button.configure(text="Hide" if current_show == "*" else "Show")
 
+def append_output(lines):
+    """Adds lines to the log box, keeping at most UI_SCROLLBACK_LINES and following the end unless scrolled up."""
+    following = output_text.yview()[1] >= 0.999
+    output_text.configure(state="normal")
+    output_text.insert(ctk.END, "\n".join(lines) + "\n")
+    excess = int(output_text.index("end-1c").split(".")[0]) - 1 - UI_SCROLLBACK_LINES
+    if excess > 0:
+        output_text.delete("1.0", f"{excess + 1}.0")
+    output_text.configure(state="disabled")
+    if following:
+        output_text.see(ctk.END)
+
 def write_env_and_run():
-    """Write .env file and run main.py in a separate thread to keep UI responsive."""
+    """Write .env file and start main.py as a child process whose output streams into the log box."""
+    if commentator.running:
+        return
+
     # Collect values
     gemini_api_key = entry_gemini_api_key.get()
     gemini_llm_model = entry_gemini_llm_model.get()
@@ -83,65 +99,78 @@ ELEVENLABS_API_KEY={elevenlabs_api_key}
 LOL_LOCKFILE_PATH="{lol_lockfile_path}"
 VOICE_ID={voice_id}
 """
-    logging.debug(f".env content to write:\n{env_content}")
+    try:
+        with open(env_path, 'w') as env_file:
+            env_file.write(env_content)
+    except OSError as e:
+        logging.error(f"Failed to write .env file: {str(e)}")
+        messagebox.showerror("Error", f"Failed to write .env file: {str(e)}")
+        return
+    logging.debug(f".env file written successfully at: {env_path}")
+    append_output([f".env file written at: {env_path}"])
 
-    # Disable button and show loading
-    run_button.configure(state="disabled", text="Launching...")
+    # Start main.py without waiting for it; refresh() picks up its output and metrics.
+    global poller
+    try:
+        logging.debug(f"Starting main.py at: {MAIN_PATH}")
+        commentator.start()
+    except OSError as e:
+        logging.error(f"Failed to run main.py: {str(e)}")
+        messagebox.showerror("Error", f"Failed to run main.py: {str(e)}")
+        return
+    poller = MetricsPoller()
+    poller.start()
+    run_button.configure(state="disabled", text="Running...")
+    stop_button.configure(state="normal")
     progress_bar.start()
-    output_text.delete("1.0", ctk.END)  # Clear previous output
-
-    def run_task():
-        try:
-            # Check write permissions
-            if not os.access(os.path.dirname(env_path), os.W_OK):
-                logging.error(f"No write permission for directory: {os.path.dirname(env_path)}")
-                messagebox.showerror("Error", f"No write permission for directory: {os.path.dirname(env_path)}")
-                return
-
-            # Write .env file
-            with open(env_path, 'w') as env_file:
-                env_file.write(env_content)
-            
-            # Verify file was written
-            if os.path.exists(env_path):
-                with open(env_path, 'r') as env_file:
-                    written_content = env_file.read()
-                logging.debug(f".env file written successfully at: {env_path}\nContent:\n{written_content}")
-                root.after(0, lambda: output_text.insert("1.0", f".env file written at: {env_path}\nContent:\n{written_content}"))
-                messagebox.showinfo("Success", f".env file written successfully at {env_path}!")
-            else:
-                logging.error("Failed to confirm .env file creation")
-                messagebox.showerror("Error", "Failed to confirm .env file creation.")
-                return
-
-            # Execute main.py
-            try:
-                main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
-                logging.debug(f"Executing main.py at: {main_path}")
-                subprocess.run(["python", main_path], check=True)
-                root.after(0, lambda: output_text.insert(ctk.END, "\nmain.py executed successfully!"))
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Failed to run main.py: {str(e)}")
-                messagebox.showerror("Error", f"Failed to run main.py: {str(e)}")
-            except FileNotFoundError:
-                logging.error("main.py not found in the current directory")
-                messagebox.showerror("Error", "main.py not found in the current directory.")
-        except Exception as e:
-            logging.error(f"Failed to write .env file: {str(e)}")
-            messagebox.showerror("Error", f"Failed to write .env file: {str(e)}")
-        finally:
-            # Re-enable button and stop loading
-            root.after(0, lambda: run_button.configure(state="normal", text="Launch System"))
-            root.after(0, lambda: progress_bar.stop())
-            root.after(0, lambda: progress_bar.set(0))
-
-    # Run in a separate thread to avoid freezing the UI
-    threading.Thread(target=run_task, daemon=True).start()
+
+def stop_commentator():
+    """Stops main.py without blocking the window; refresh() resets the controls once it has exited."""
+    stop_button.configure(state="disabled", text="Stopping...")
+    commentator.stop()
+
+def refresh():
+    """
+    Moves new output and the latest metrics into the window, then schedules
+    itself again after UI_REFRESH_MS. Never waits on main.py: the output and
+    metrics are collected on background threads.
+    """
+    global shown_lines, shown_metrics, poller
+    lines, shown_lines = commentator.new_lines(shown_lines, UI_MAX_LINES_PER_REFRESH)
+    if lines:
+        append_output(lines)
+
+    if poller is not None and (poller.version, poller.error) != shown_metrics:
+        shown_metrics = (poller.version, poller.error)
+        summary = poller.summary or {}
+        for name, panel in panels.items():
+            panel.configure(text=summary.get(name, poller.error or "waiting for metrics"))
+
+    # main.py exited, by itself or through Stop.
+    if poller is not None and not commentator.running and not lines:
+        poller.stop()
+        poller = None
+        run_button.configure(state="normal", text="Launch System")
+        stop_button.configure(state="disabled", text="Stop")
+        progress_bar.stop()
+        progress_bar.set(0)
+    root.after(UI_REFRESH_MS, refresh)
+
+def on_close():
+    commentator.stop()
+    root.destroy()
+
+# --- Commentator Process ---
+commentator = CommentatorProcess()
+poller = None
+# Output lines and metrics version already shown.
+shown_lines = 0
+shown_metrics = None
 
 # Create the main window
 root = ctk.CTk()
 root.title("LoL AI Commentator Setup - Hyprland Edition")
-root.geometry("900x700")
+root.geometry("1000x950")
 root.resizable(True, True)
 root.attributes('-alpha', 0.95)
 
@@ -179,9 +208,13 @@ ctk.CTkLabel(
     wraplength=600
 ).pack(pady=10)
 
+# Start and stop controls
+controls_frame = ctk.CTkFrame(main_frame, fg_color=bg_color)
+controls_frame.pack(pady=30)
+
 # Run button with animation
 run_button = ctk.CTkButton(
-    main_frame,
+    controls_frame,
     text="Launch System",
     font=button_font,
     fg_color=button_bg,
@@ -192,7 +225,22 @@ run_button = ctk.CTkButton(
     height=50,
     corner_radius=10
 )
-run_button.pack(pady=30)
+run_button.grid(row=0, column=0, padx=10)
+
+stop_button = ctk.CTkButton(
+    controls_frame,
+    text="Stop",
+    font=button_font,
+    fg_color=button_bg,
+    hover_color=button_active_bg,
+    text_color=fg_color,
+    command=stop_commentator,
+    width=120,
+    height=50,
+    corner_radius=10,
+    state="disabled"
+)
+stop_button.grid(row=0, column=1, padx=10)
 
 # Progress bar for launching
 progress_bar = ctk.CTkProgressBar(main_frame, mode="indeterminate", width=300, fg_color=entry_bg, progress_color=accent_color)
@@ -254,17 +302,37 @@ browse_button = ctk.CTkButton(
 )
 browse_button.grid(row=3, column=2, padx=5, pady=10)
 
-# Output text box for verification
+# Live panels fed by the commentator's metrics
+panels_frame = ctk.CTkFrame(main_frame, fg_color=bg_color)
+panels_frame.pack(pady=10, fill="x", padx=20)
+panels = {}
+for column, (name, title) in enumerate([("latency", "Stage Latency"), ("queues", "Queue Depth"), ("cache", "TTS Cache")]):
+    panels_frame.grid_columnconfigure(column, weight=1)
+    ctk.CTkLabel(panels_frame, text=title, font=label_font, text_color=fg_color).grid(row=0, column=column, padx=5, sticky="w")
+    panels[name] = ctk.CTkLabel(
+        panels_frame,
+        text="not running",
+        font=("Courier New", 12),
+        text_color="#ffffff",
+        fg_color=entry_bg,
+        corner_radius=8,
+        justify="left",
+        anchor="nw",
+        height=110
+    )
+    panels[name].grid(row=1, column=column, padx=5, pady=5, sticky="nsew")
+
+# Output text box with the commentator's log
 output_text = ctk.CTkTextbox(
     main_frame,
     font=("Courier New", 12),
     text_color=fg_color,
     fg_color=entry_bg,
-    height=100,
+    height=200,
     wrap="word",
     state="disabled"
 )
-output_text.pack(pady=10, fill="x", padx=20)
+output_text.pack(pady=10, fill="both", expand=True, padx=20)
 
 
 # Keyboard binding for Enter key
@@ -273,5 +341,9 @@ root.bind('<Return>', lambda e: write_env_and_run())
 # Load existing .env
 load_env()
 
+# Stop main.py along with the window, and start refreshing the log and panels
+root.protocol("WM_DELETE_WINDOW", on_close)
+root.after(UI_REFRESH_MS, refresh)
+
 # Start the GUI loop
 root.mainloop()
\ No newline at end of file
@@ -1,48 +1,126 @@
-from data_fetcher import get_champselect_session, get_event_data
+from data_fetcher import get_champselect_session, get_champion_summary, get_event_data
 
 # --- Game Context Management ---
 class LoLContext:
     """Stores and manages game state information, such as events and player data."""
-    def __init__(self):
-        # A set to track seen event IDs to prevent duplicate commentary.
+    def __init__(self, incremental=True, client=None):
+        # The LeagueClient to read from; None means the default client from .env.
+        self.client = client
+        # In incremental mode only events past the high-water EventID cursor are fetched.
+        # Otherwise the full event list is fetched and filtered against seen_event_ids.
+        self.incremental = incremental
+        self.last_event_id = -1
+        # (EventID, EventName, EventTime) of the newest event seen, to tell when a new game restarted the IDs.
+        self.last_event_key = None
+        # A set to track seen event IDs to prevent duplicate commentary (full-scan mode only).
         self.seen_event_ids = set()
+        # Number of events fetched and number of new events on the last poll.
+        self.last_poll_stats = {"fetched": 0, "new": 0}
+        self.champ_select_done = False
+        self.players_info = []
+        self.teams_info = {}
+        # Champion id -> name from the LCU game data, fetched once champ select shows an unknown id.
+        self.champion_names = {}
+
+    def reset_game(self):
+        """Forgets all per-game state so the next game starts from a clean slate."""
+        self.last_event_id = -1
+        self.last_event_key = None
+        self.seen_event_ids.clear()
+        self.last_poll_stats = {"fetched": 0, "new": 0}
         self.champ_select_done = False
         self.players_info = []
         self.teams_info = {}
     
-    def update_champ_select(self):
-        """Updates the stored player and team info after champion select."""
+    def update_champ_select(self, session=None):
+        """
+        Updates the stored player and team info after champion select.
+        A session pushed by the LCU WebSocket can be passed in instead of fetching it.
+        """
         try:
-            session = get_champselect_session()
-            self.players_info = session.get("myTeam", [])
+            if session is None:
+                session = get_champselect_session(self.client)
             self.teams_info = {
-                "myTeam": session.get("myTeam", []),
-                "theirTeam": session.get("theirTeam", [])
+                "myTeam": self._with_champion_names(session.get("myTeam", [])),
+                "theirTeam": self._with_champion_names(session.get("theirTeam", []))
             }
+            self.players_info = self.teams_info["myTeam"]
             if self.players_info:
                 self.champ_select_done = True
         except:
             pass
 
+    def _with_champion_names(self, members):
+        """Copies of champ select members with a championName next to each picked championId."""
+        picked = {m.get("championId", 0) for m in members} - {0}
+        if picked - self.champion_names.keys():
+            summary = get_champion_summary(self.client)
+            if isinstance(summary, list):
+                self.champion_names.update({c["id"]: c["name"] for c in summary if "id" in c and "name" in c})
+        return [
+            dict(m, championName=self.champion_names[m["championId"]]) if m.get("championId") in self.champion_names else m
+            for m in members
+        ]
+
     def get_new_events(self):
         """Fetches and returns only the new events that haven't been seen yet."""
+        if self.incremental:
+            return self._get_new_events_incremental()
+
         events = []
+        fetched = 0
         try:
-            all_events = get_event_data().get("Events", [])
+            all_events = get_event_data(client=self.client).get("Events", [])
+            fetched = len(all_events)
             for e in all_events:
                 if e["EventID"] not in self.seen_event_ids:
                     self.seen_event_ids.add(e["EventID"])
                     events.append(e)
         except:
             pass
+        self.last_poll_stats = {"fetched": fetched, "new": len(events)}
+        return events
+
+    def _get_new_events_incremental(self):
+        """
+        Fetches the events from the EventID cursor on and advances it. The page
+        starts with the newest event already seen; if that event is missing or
+        different, the event IDs restarted with a new game, which is then read
+        from the beginning.
+        """
+        events = []
+        fetched = 0
+        try:
+            data = get_event_data(max(self.last_event_id, 0), self.client)
+            page = data.get("Events")
+            if page is None:
+                # The request failed; try again on the next poll.
+                page = []
+            elif self.last_event_id >= 0 and (not page or self._event_key(page[0]) != self.last_event_key):
+                self.last_event_id = -1
+                page = get_event_data(0, self.client).get("Events", [])
+            fetched = len(page)
+            for e in page:
+                if e["EventID"] > self.last_event_id:
+                    events.append(e)
+            if events:
+                newest = max(events, key=lambda e: e["EventID"])
+                self.last_event_id = newest["EventID"]
+                self.last_event_key = self._event_key(newest)
+        except:
+            pass
+        self.last_poll_stats = {"fetched": fetched, "new": len(events)}
         return events
 
+    @staticmethod
+    def _event_key(event):
+        """What identifies an event across polls of the same game."""
+        return event.get("EventID"), event.get("EventName"), event.get("EventTime")
+
 # --- Event to Text Conversion ---
-def event_to_text(event):
-    """Converts a raw game event object into a human-readable text string."""
+def describe_event(event):
+    """Describes a raw game event object in a few words, without its timestamp."""
     etype = event["EventName"]
-    t = int(event.get("EventTime",0))
-    mm, ss = divmod(t, 60)
 
     if etype == "GameStart":
         desc = "The game has started!"
@@ -56,10 +134,23 @@ def event_to_text(event):
         desc = f'{event.get("KillerName","?")} killed a {event.get("DragonType","dragon")} dragon'
     elif etype == "BaronKill":
         desc = f'{event.get("KillerName","?")} killed Baron Nashor'
+    elif "Summary" in event:
+        # Events merged by the event scheduler carry their own description.
+        desc = event["Summary"]
+    elif etype == "Multikill":
+        desc = f'{event.get("KillerName","?")} got a {event.get("KillStreak","multi")}-kill streak'
+    elif etype == "Ace":
+        desc = f'{event.get("Acer","?")} aced the enemy team'
     else:
         desc = etype
 
-    return f"[{mm:02d}:{ss:02d}] {desc}"
+    return desc
+
+def event_to_text(event):
+    """Converts a raw game event object into a human-readable text string."""
+    t = int(event.get("EventTime",0))
+    mm, ss = divmod(t, 60)
+    return f"[{mm:02d}:{ss:02d}] {describe_event(event)}"
 
 # --- Data Processing Functions (from previous responses) ---
 def process_player_data(player_data):
@@ -147,4 +238,13 @@ def process_active_player_data(active_player_data):
         f" - E: {e_ability}\n"
         f" - R: {r_ability}\n"
     )
-    return player_summary
\ No newline at end of file
+    return player_summary
+
+# --- Statistics ---
+def percentile(values, fraction):
+    """Returns the value below which the given fraction (0-1) of values fall, or 0 for no values."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]